@@ -13,9 +13,13 @@
 :- abolish(h_arrow/1).      % arrow available?
 :- abolish(h_score/1).      % hunter score
 :- abolish(a_costs/3).      % cells costs
-:- abolish(a_visited/2).    % visited cells
-:- abolish(a_stench_at/2).  % stench cells
-:- abolish(a_breeze_at/2).  % breeze cells
+:- abolish(a_board/2).      % agent knowledge bitboards (Name, Bits)
+:- abolish(w_board/2).      % world layout bitboards (Name, Bits)
+:- abolish(w_size/2).       % world size (Width, Height) without walls
+:- abolish(w_path_field/2). % next-hop fields (TargetIndex, Field), see PATHFINDING
+:- abolish(a_last_action/1). % last action chosen by the agent (runloop)
+:- abolish(metric_sample/2). % metrics noted during the turn (Name, Value), see METRICS
+:- abolish(metric_game_ended/0). % end of this game already reported to the metrics
 :- abolish(no_logs/1).      % show/hide logs
 
 % ============================================================================
@@ -32,9 +36,17 @@
 :- abolish(player_stunned/1).   % player stun turns remaining
 :- abolish(fog_revealed/2).     % fog of war - revealed cells
 :- abolish(fog_visible/2).      % fog of war - currently visible cells
-
-% Create dynamic data to store info later.
-:- dynamic ([
+:- abolish(fog_board/2).        % fog of war bitboards (revealed/visible, Bits)
+:- abolish(decision_cache_entry/4).    % agent decisions (Hash, Key, Action, Effect)
+:- abolish(decision_cache_capacity/1). % decision cache size (enabled if present)
+:- abolish(saved_game/2).              % saved game sessions (ID, Facts)
+:- abolish(agent_param_value/2).       % tuned heuristic constants (Name, Value)
+:- abolish(game_pool/3).               % game thread pool (Jobs, Results, Workers)
+
+% Create dynamic data to store info later. The game state is thread_local:
+% every Prolog thread plays its own game (see GAME THREADS), the main
+% thread included, with the code loaded once.
+:- thread_local ([
     w_wall/2, 
     w_hunter/3, 
     w_wumpus/2, 
@@ -45,9 +57,13 @@
     h_score/1, 
     h_arrow/1,
     a_costs/3,
-    a_visited/2,
-    a_stench_at/2,
-    a_breeze_at/2,
+    a_board/2,
+    w_board/2,
+    w_size/2,
+    w_path_field/2,
+    a_last_action/1,
+    metric_sample/2,
+    metric_game_ended/0,
     no_logs/1,
     % NEW: Enhanced features
     sound_event/4,
@@ -60,7 +76,21 @@
     chest_opened/1,
     player_stunned/1,
     fog_revealed/2,
-    fog_visible/2
+    fog_visible/2,
+    fog_board/2
+]).
+
+% Tables shared by all the threads
+:- dynamic ([
+    % Decision cache (kept across games, not cleared by clearWorld)
+    decision_cache_entry/4,
+    decision_cache_capacity/1,
+    % Saved game sessions (kept across games, not cleared by clearWorld)
+    saved_game/2,
+    % Heuristic parameters (kept across games, not cleared by clearWorld)
+    agent_param_value/2,
+    % Game thread pool (message queues and worker threads)
+    game_pool/3
 ]).
 
 clearWorld :-
@@ -78,9 +108,13 @@ clearWorld :-
     retractall(h_score(_)),
     retractall(w_cells(_)),
     retractall(a_costs(_,_,_)),
-    retractall(a_visited(_,_)),
-    retractall(a_stench_at(_,_)),
-    retractall(a_breeze_at(_,_)),
+    retractall(a_board(_,_)),
+    retractall(w_board(_,_)),
+    retractall(w_size(_,_)),
+    retractall(w_path_field(_,_)),
+    retractall(a_last_action(_)),
+    retractall(metric_sample(_,_)),
+    retractall(metric_game_ended),
     retractall(no_logs(_)),
     % NEW: Clear enhanced features
     retractall(sound_event(_,_,_,_)),
@@ -93,32 +127,28 @@ clearWorld :-
     retractall(chest_opened(_)),
     retractall(player_stunned(_)),
     retractall(fog_revealed(_,_)),
-    retractall(fog_visible(_,_)). 
+    retractall(fog_visible(_,_)),
+    retractall(fog_board(_,_)). 
 
 buildWalls :-
     /**
         @descr Build the world 4x4 structure by setting the walls.
     */
-    assert(w_wall(0,0)),
-    assert(w_wall(0,1)),
-    assert(w_wall(0,2)),
-    assert(w_wall(0,3)),
-    assert(w_wall(0,4)),
-    assert(w_wall(0,5)),
-    assert(w_wall(1,5)),
-    assert(w_wall(2,5)),
-    assert(w_wall(3,5)),
-    assert(w_wall(4,5)),
-    assert(w_wall(5,5)),
-    assert(w_wall(5,4)),
-    assert(w_wall(5,3)),
-    assert(w_wall(5,2)),
-    assert(w_wall(5,1)),
-    assert(w_wall(5,0)),
-    assert(w_wall(4,0)),
-    assert(w_wall(3,0)),
-    assert(w_wall(2,0)),
-    assert(w_wall(1,0)).
+    buildWalls(4, 4).
+
+buildWalls(W, H) :-
+    /**
+        @descr Build a WxH world structure by setting the walls
+        around it.
+        @params W,H world size without the walls.
+    */
+    assert(w_size(W, H)),
+    MX is W + 1, MY is H + 1,
+    forall(
+        (between(0, MX, X), between(0, MY, Y),
+            (X =:= 0; Y =:= 0; X =:= MX; Y =:= MY)),
+        assert(w_wall(X, Y))
+    ).
 
 selectCell(X,Y) :-
     /**
@@ -184,7 +214,9 @@ createWorld :-
     generate_chests,
     init_wumpus_ai,
     init_fog,
-    update_fog.
+    update_fog,
+    init_boards,
+    init_paths.
 
 createTWorld :-
     /**
@@ -210,7 +242,40 @@ createTWorld :-
     generate_chests,
     init_wumpus_ai,
     init_fog,
-    update_fog.
+    update_fog,
+    init_boards,
+    init_paths.
+
+createCave(W, H) :-
+    /**
+        @descr Create a large WxH cave with the elements of the 4x4
+        world. Pits keep the 4x4 density (3 in 16 cells) and the cells
+        next to the entrance stay free.
+        @params W,H cave size without the walls.
+    */
+    W >= 4, H >= 4,
+    findall([X,Y], (between(1, W, X), between(1, H, Y), X + Y > 3), CELLS),
+    partition(cave_pit, CELLS, PITS, FREE),
+    forall(member([X,Y], PITS), assert(w_pit(X,Y))),
+    assert(w_cells(FREE)),
+    buildWalls(W, H),
+    selectCell(GX, GY),
+    assert(w_gold(GX, GY)),
+    buildWumpus,
+    assert(w_hunter(1,1,right)),
+    assert(h_arrow(1)),
+    assert(w_goal(0)),
+    assert(h_score(0)),
+    init_rocks,
+    generate_rock_pickups,
+    generate_chests,
+    init_wumpus_ai,
+    init_fog,
+    update_fog,
+    init_boards,
+    init_paths.
+
+cave_pit(_) :- random(R), R < 0.1875.
 
 welcome :-
     /**
@@ -550,16 +615,13 @@ getStep(HX, HY, up, [NX, NY], ACTION) :-
     NX is HX, NY is HY + 1, ACTION = move, !.
 getStep(HX, HY, up, [NX, NY], ACTION) :- 
     NX is HX, NY is HY - 1, ACTION = right, 
-    retract(a_costs(HX,HY,COST)), 
-    NC is COST-25, assert(a_costs(HX,HY,NC)), !.
+    turn_cost(HX, HY), !.
 getStep(HX, HY, up, [NX, NY], ACTION) :- 
     NX is HX - 1, NY is HY, ACTION = left, 
-    retract(a_costs(HX,HY,COST)), NC is COST-25, 
-    assert(a_costs(HX,HY,NC)), !.
+    turn_cost(HX, HY), !.
 getStep(HX, HY, up, [NX, NY], ACTION) :- 
     NX is HX + 1, NY is HY, ACTION = right, 
-    retract(a_costs(HX,HY,COST)), NC is COST-25, 
-    assert(a_costs(HX,HY,NC)), !.
+    turn_cost(HX, HY), !.
 
 getStep(HX, HY, right, [NX, NY], ACTION) :-  
     /**
@@ -572,16 +634,13 @@ getStep(HX, HY, right, [NX, NY], ACTION) :-
     NX is HX + 1, NY is HY, ACTION = move, !.
 getStep(HX, HY, right, [NX, NY], ACTION) :- 
     NX is HX, NY is HY - 1, ACTION = right, 
-    retract(a_costs(HX,HY,COST)), NC is COST-25, 
-    assert(a_costs(HX,HY,NC)), !.
+    turn_cost(HX, HY), !.
 getStep(HX, HY, right, [NX, NY], ACTION) :- 
     NX is HX, NY is HY + 1, ACTION = left, 
-    retract(a_costs(HX,HY,COST)), NC is COST-25, 
-    assert(a_costs(HX,HY,NC)), !.
+    turn_cost(HX, HY), !.
 getStep(HX, HY, right, [NX, NY], ACTION) :- 
     NX is HX - 1, NY is HY, ACTION = right, 
-    retract(a_costs(HX,HY,COST)), NC is COST-25, 
-    assert(a_costs(HX,HY,NC)), !.
+    turn_cost(HX, HY), !.
 
 getStep(HX, HY, down, [NX, NY], ACTION) :-  
     /**
@@ -594,16 +653,13 @@ getStep(HX, HY, down, [NX, NY], ACTION) :-
     NX is HX, NY is HY -1, ACTION = move, !.
 getStep(HX, HY, down, [NX, NY], ACTION) :- 
     NX is HX, NY is HY + 1, ACTION = right, 
-    retract(a_costs(HX,HY,COST)), NC is COST-25, 
-    assert(a_costs(HX,HY,NC)), !.
+    turn_cost(HX, HY), !.
 getStep(HX, HY, down, [NX, NY], ACTION) :- 
     NX is HX + 1, NY is HY, ACTION = left, 
-    retract(a_costs(HX,HY,COST)), NC is COST-25, 
-    assert(a_costs(HX,HY,NC)), !.
+    turn_cost(HX, HY), !.
 getStep(HX, HY, down, [NX, NY], ACTION) :- 
     NX is HX - 1, NY is HY, ACTION = right, 
-    retract(a_costs(HX,HY,COST)), NC is COST-25, 
-    assert(a_costs(HX,HY,NC)), !.
+    turn_cost(HX, HY), !.
 
 getStep(HX, HY, left, [NX, NY], ACTION) :- 
     /**
@@ -616,16 +672,13 @@ getStep(HX, HY, left, [NX, NY], ACTION) :-
     NX is HX - 1, NY is HY, ACTION = move, !.
 getStep(HX, HY, left, [NX, NY], ACTION) :- 
     NX is HX, NY is HY + 1, ACTION = right, 
-    retract(a_costs(HX,HY,COST)), NC is COST-25, 
-    assert(a_costs(HX,HY,NC)), !.
+    turn_cost(HX, HY), !.
 getStep(HX, HY, left, [NX, NY], ACTION) :- 
     NX is HX, NY is HY - 1, ACTION = left, 
-    retract(a_costs(HX,HY,COST)), NC is COST-25, 
-    assert(a_costs(HX,HY,NC)), !.
+    turn_cost(HX, HY), !.
 getStep(HX, HY, left, [NX, NY], ACTION) :- 
     NX is HX + 1, NY is HY, ACTION = right, 
-    retract(a_costs(HX,HY,COST)), NC is COST-25, 
-    assert(a_costs(HX,HY,NC)), !.
+    turn_cost(HX, HY), !.
 
 cellsCost(X,Y, up, 0, COST) :- 
     /**
@@ -723,94 +776,72 @@ nextMove(ACTION, GOAL) :-
     % get the action needed to go the wanted cell
     getStep(X,Y, FACING, CELL, ACTION).
 
-has_pit(X, Y, 1000) :-
+has_pit(X, Y, COST) :-
     /**
-        @descr return specific cost if the cell has a pit.
+        @descr return specific cost if the cell has a pit (two or
+        more adjacent breezes).
         @params cell position.
         @return COST.
     */
-    E is X + 1, N is Y + 1, a_breeze_at(E, Y), a_breeze_at(X, N), !;
-    N is Y + 1, W is X - 1, a_breeze_at(X, N), a_breeze_at(W, Y), !;
-    W is X - 1, S is Y - 1, a_breeze_at(W, Y), a_breeze_at(X, S), !;
-    S is Y - 1, E is X + 1, a_breeze_at(X, S), a_breeze_at(E, Y), !;
-    N is Y + 1, S is Y - 1, a_breeze_at(X, N), a_breeze_at(X, S), !;
-    E is X + 1, W is Y + 1, a_breeze_at(E, Y), a_breeze_at(W, Y), !.
-has_pit(X, Y, 150) :-
+    neighbour_mask(X, Y, MASK), a_board(breeze, BREEZE),
+    popcount(BREEZE /\ MASK) >= 2, !,
+    agent_param(pit_sure, COST).
+has_pit(X, Y, COST) :-
     /**
         @descr return specific cost if the cell maybe has a pit.
         @params cell position.
         @return COST.
     */
-    E is X + 1, a_breeze_at(E, Y), !;
-    N is Y + 1, a_breeze_at(X, N), !;
-    W is X - 1, a_breeze_at(W, Y), !;
-    S is Y - 1, a_breeze_at(X, S), !.
+    neighbour_mask(X, Y, MASK), a_board(breeze, BREEZE),
+    BREEZE /\ MASK =\= 0, !,
+    agent_param(pit_maybe, COST).
 
-has_wumpus(X, Y, 1100) :-
+has_wumpus(X, Y, COST) :-
     /**
-        @descr return specific cost if the cell has a wumpus.
+        @descr return specific cost if the cell has a wumpus (two or
+        more adjacent stenches).
         @params cell position.
         @return COST.
     */
-    E is X + 1, N is Y + 1, a_stench_at(E, Y), a_stench_at(X, N), !;
-    N is Y + 1, W is X - 1, a_stench_at(X, N), a_stench_at(W, Y), !;
-    W is X - 1, S is Y - 1, a_stench_at(W, Y), a_stench_at(X, S), !;
-    S is Y - 1, E is X + 1, a_stench_at(X, S), a_stench_at(E, Y), !;
-    N is Y + 1, S is Y - 1, a_stench_at(X, N), a_stench_at(X, S), !;
-    E is X + 1, W is Y + 1, a_stench_at(E, Y), a_stench_at(W, Y), !.
-has_wumpus(X, Y, 100) :-
+    neighbour_mask(X, Y, MASK), a_board(stench, STENCH),
+    popcount(STENCH /\ MASK) >= 2, !,
+    agent_param(wumpus_sure, COST).
+has_wumpus(X, Y, COST) :-
     /**
         @descr return specific cost if the cell maybe has a wumpus.
         @params cell position.
         @return COST.
     */
-    E is X + 1, a_stench_at(E, Y), !;
-    N is Y + 1, a_stench_at(X, N), !;
-    W is X - 1, a_stench_at(W, Y), !;
-    S is Y - 1, a_stench_at(X, S), !.
+    neighbour_mask(X, Y, MASK), a_board(stench, STENCH),
+    STENCH /\ MASK =\= 0, !,
+    agent_param(wumpus_maybe, COST).
 
-has_none(X, Y, 10) :- 
+has_none(X, Y, COST) :- 
     /**
-        @descr return specific cost if the cell probably has nothing.
+        @descr return specific cost if the cell probably has nothing
+        (a breeze and a stench on two different adjacent cells).
         @params cell position.
         @return COST.
     */
-    E is X + 1, N is Y + 1, a_breeze_at(E, Y), a_stench_at(X, N), !;
-    N is Y + 1, W is X - 1, a_breeze_at(X, N), a_stench_at(W, Y), !;
-    W is X - 1, S is Y - 1, a_breeze_at(W, Y), a_stench_at(X, S), !;
-    S is Y - 1, E is X + 1, a_breeze_at(X, S), a_stench_at(E, Y), !;
-    N is Y + 1, S is Y - 1, a_breeze_at(X, N), a_stench_at(X, S), !;
-    E is X + 1, W is Y + 1, a_breeze_at(E, Y), a_stench_at(W, Y), !;
-    E is X + 1, N is Y + 1, a_stench_at(E, Y), a_breeze_at(X, N), !;
-    N is Y + 1, W is X - 1, a_stench_at(X, N), a_breeze_at(W, Y), !;
-    W is X - 1, S is Y - 1, a_stench_at(W, Y), a_breeze_at(X, S), !;
-    S is Y - 1, E is X + 1, a_stench_at(X, S), a_breeze_at(E, Y), !;
-    N is Y + 1, S is Y - 1, a_stench_at(X, N), a_breeze_at(X, S), !;
-    E is X + 1, W is Y + 1, a_stench_at(E, Y), a_breeze_at(W, Y), !.
+    neighbour_mask(X, Y, MASK),
+    a_board(breeze, BREEZE), a_board(stench, STENCH),
+    N_BREEZE is BREEZE /\ MASK, N_STENCH is STENCH /\ MASK,
+    N_BREEZE =\= 0, N_STENCH =\= 0,
+    \+ (N_BREEZE =:= N_STENCH, popcount(N_BREEZE) =:= 1), !,
+    agent_param(none, COST).
 
 refreshCells(X,Y) :-
     /**
         @descr update knowledge cost agent database.
         @params cell position.
     */
-    (
-        a_costs(_,_,0) -> 
-            (
-                a_costs(X,Y,_) -> 
-                    retract(a_costs(X,Y,_)); 
-                true
-                ), assert(a_costs(X,Y,5000)), !, fail
-        ; true
-        ),
-    (
-        has_none(X,Y, COST) -> 
-            (
-                a_costs(X,Y,_) -> 
-                    retract(a_costs(X,Y,_)); 
-                true
-                ), assert(a_costs(X,Y,COST)), !, fail; 
-        true
-        ), 
+    a_board(zero, ZERO), ZERO =\= 0, !,
+    agent_param(unsafe_sentinel, COST),
+    set_cost(X, Y, COST), fail.
+refreshCells(X,Y) :-
+    has_none(X, Y, COST), !,
+    set_cost(X, Y, COST), fail.
+refreshCells(X,Y) :-
     (
         has_wumpus(X,Y, COST) -> 
             AUX1 is COST; 
@@ -822,63 +853,23 @@ refreshCells(X,Y) :-
         AUX2 is 0
         ), 
     AUX is AUX1 + AUX2, 
-    (
-        a_costs(X,Y,_) -> 
-            retract(a_costs(X,Y,_)); 
-        true
-        ), assert(a_costs(X,Y,AUX)), !.
+    set_cost(X, Y, AUX), !.
     
-knowledge(X, Y, stench) :- 
+knowledge(X, Y, safe) :- 
     /**
         @descr update cell cost in the knowledge agent database.
         @params cell position.
         @params type of danger.
     */
-    L is X - 1, \+w_wall(L,Y), \+a_visited(L,Y), refreshCells(L,Y), fail.
-knowledge(X, Y, stench) :- 
-    U is Y + 1, \+w_wall(X,U), \+a_visited(X,U), refreshCells(X,U), fail.
-knowledge(X, Y, stench) :- 
-    R is X + 1, \+w_wall(R,Y), \+a_visited(R,Y), refreshCells(R,Y), fail.
-knowledge(X, Y, stench) :- 
-    D is Y - 1, \+w_wall(X,D), \+a_visited(X,D), refreshCells(X,D), fail; true.
-
-knowledge(X, Y, breeze) :- 
-    L is X - 1, \+w_wall(L,Y), \+a_visited(L,Y), refreshCells(L,Y), fail.
-knowledge(X, Y, breeze) :- 
-    U is Y + 1, \+w_wall(X,U), \+a_visited(X,U), refreshCells(X,U), fail.
-knowledge(X, Y, breeze) :- 
-    R is X + 1, \+w_wall(R,Y), \+a_visited(R,Y), refreshCells(R,Y), fail.
-knowledge(X, Y, breeze) :- 
-    D is Y - 1, \+w_wall(X,D), \+a_visited(X,D), refreshCells(X,D), fail; true.
-
-knowledge(X, Y, safe) :- 
-    L is X - 1, \+w_wall(L,Y), \+a_visited(L,Y), 
-    (
-        a_costs(L,Y,_) -> 
-            retract(a_costs(L,Y,_)); 
-        true
-        ), assert(a_costs(L,Y,0)), fail.
-knowledge(X, Y, safe) :- 
-    U is Y + 1, \+w_wall(X,U), \+a_visited(X,U), 
-    (
-        a_costs(X,U,_) -> 
-            retract(a_costs(X,U,_)); 
-        true
-        ), assert(a_costs(X,U,0)), fail.
-knowledge(X, Y, safe) :- 
-    R is X + 1, \+w_wall(R,Y), \+a_visited(R,Y), 
-    (
-        a_costs(R,Y,_) -> 
-            retract(a_costs(R,Y,_)); 
-        true
-        ), assert(a_costs(R,Y,0)), fail.
-knowledge(X, Y, safe) :- 
-    D is Y - 1, \+w_wall(X,D), \+a_visited(X,D), 
-    (
-        a_costs(X,D,_) -> 
-            retract(a_costs(X,D,_)); 
-        true
-        ), assert(a_costs(X,D,0)), fail; true.
+    forall(
+        (side_cell(X, Y, NX, NY), unexplored(NX, NY)),
+        (set_cost(NX, NY, 0), mark_board(safe, NX, NY))
+    ), !.
+knowledge(X, Y, _) :- 
+    forall(
+        (side_cell(X, Y, NX, NY), unexplored(NX, NY)),
+        ignore(refreshCells(NX, NY))
+    ).
 
 
 heuristic(_,_) :- 
@@ -887,44 +878,32 @@ heuristic(_,_) :-
         @params sensors perception.
         @return Action to be executed next.
     */
-    w_hunter(X,Y,_), w_goal(0), 
+    w_hunter(X,Y,_), w_goal(0), agent_param(visit_penalty, P),
     (
         a_costs(X,Y,COST) -> 
-            retract(a_costs(X,Y,COST)), 
-            N_COST is COST + 25, 
-            assert(a_costs(X,Y,N_COST)); 
-        assert(a_costs(X,Y,25))
-        ), fail.
+            N_COST is COST + P; 
+        N_COST is P
+        ), set_cost(X, Y, N_COST), fail.
 heuristic(_,_) :- 
-    w_hunter(X,Y,_), w_goal(1), 
+    w_hunter(X,Y,_), w_goal(1), agent_param(visit_penalty, P),
     (
         a_costs(X,Y,COST) -> 
-            retract(a_costs(X,Y,COST)), 
-            N_COST is COST - 25, 
-            assert(a_costs(X,Y,N_COST)); 
-        assert(a_costs(X,Y,25))
-        ), fail.
+            N_COST is COST - P; 
+        N_COST is P
+        ), set_cost(X, Y, N_COST), fail.
 heuristic(_,_) :- 
-    w_hunter(X,Y,_), \+a_visited(X,Y), assert(a_visited(X,Y)), fail.
+    w_hunter(X,Y,_), mark_board(visited, X, Y), fail.
 heuristic([_,_,_], climb) :- w_hunter(1,1,_), w_gold(0,0), !.
 heuristic([_,_,1], grab) :- !.
 heuristic([_,_,_], shoot) :- fail, !.
 heuristic([1,_,_], OPTION) :- 
     w_hunter(X,Y,_), 
-    (
-        \+a_stench_at(X,Y) -> 
-            assert(a_stench_at(X,Y)); 
-        true
-        ), 
+    mark_board(stench, X, Y), 
         knowledge(X, Y, stench), 
         w_goal(GOAL), nextMove(OPTION, GOAL), !.
 heuristic([_,1,_], OPTION) :- 
     w_hunter(X,Y,_), 
-    (
-        \+a_breeze_at(X,Y) -> 
-            assert(a_breeze_at(X,Y)); 
-        true
-        ), 
+    mark_board(breeze, X, Y), 
         knowledge(X, Y, breeze), 
         w_goal(GOAL), nextMove(OPTION, GOAL), !.
 heuristic([_,_,_], OPTION) :- 
@@ -976,13 +955,15 @@ runloop(STEP) :-
     */
     getColisions(GOAL),            % get colisions 
     getSensors(SENSORES),          % get sensors perception       
-    heuristic(SENSORES, OPTION),   % gets the best action to be executed
+    cached_heuristic(SENSORES, OPTION), % gets the best action to be executed
     (no_logs(NL), NL \= 1 -> printHunterPosition; true),
     (no_logs(NL), NL \= 1 -> printRange; true),
     (no_logs(NL), NL \= 1 -> printInfo(SENSORES); true),
     (no_logs(NL), NL \= 1 -> printScore; true),
     (no_logs(NL), NL \= 1 -> write('Next action: '); true),
     (no_logs(NL), NL \= 1 -> format('~p.~n', [OPTION]); true),
+    retractall(a_last_action(_)),
+    assert(a_last_action(OPTION)),
     action(OPTION, GOAL),           % execute the action
     STEP \= -1, N_STEP is STEP + 1, % break loop in pygame
     runloop(N_STEP).                % run the process again
@@ -991,6 +972,8 @@ runloop(STEP) :-
 run(pygame) :- clearWorld, assert(no_logs(1)), createWorld, !.
 % run the agent through the pygame command on the traditional map
 run(pygameMap) :- clearWorld, assert(no_logs(1)), createTWorld, !.
+% run the agent through the pygame command on a large WxH cave
+run(pygameCave(W, H)) :- clearWorld, assert(no_logs(1)), createCave(W, H), !.
 % play the game using CLI
 run(user) :- clearWorld, assert(no_logs(0)), createWorld, welcome, init, menu, !.
 % run the agent from prolog on the traditional Wumpus world map
@@ -998,6 +981,190 @@ run(map) :- clearWorld, assert(no_logs(0)), createTWorld, runloop(0), !.
 % run the agent from prolog on a random map
 run :- clearWorld, assert(no_logs(0)), createWorld, runloop(0). 
 
+% ============================================================================
+% AGENT PARAMETERS - Tunable heuristic cost constants
+% ============================================================================
+
+% Defaults are the hand-picked constants of the agent. A tuned setting is
+% supplied with set_agent_params/1 and kept across games.
+default_agent_param(pit_sure, 1000).        % 2+ breezes around the cell
+default_agent_param(pit_maybe, 150).        % 1 breeze around the cell
+default_agent_param(wumpus_sure, 1100).     % 2+ stenches around the cell
+default_agent_param(wumpus_maybe, 100).     % 1 stench around the cell
+default_agent_param(none, 10).              % breeze and stench from 2 cells
+default_agent_param(unsafe_sentinel, 5000). % danger while a safe cell is known
+default_agent_param(visit_penalty, 25).     % per visit (- on the way back)
+default_agent_param(turn_discount, 25).     % cost removed when turning
+
+% Current value of a parameter
+agent_param(NAME, VALUE) :-
+    agent_param_value(NAME, VALUE), !.
+agent_param(NAME, VALUE) :-
+    default_agent_param(NAME, VALUE).
+
+% All parameters as NAME=VALUE pairs
+agent_params(PARAMS) :-
+    findall(NAME=VALUE,
+        (default_agent_param(NAME, _), agent_param(NAME, VALUE)),
+        PARAMS).
+
+% Supply a setting (NAME=VALUE list, missing names keep their default)
+set_agent_params(PARAMS) :-
+    forall(member(NAME=VALUE, PARAMS),
+        (default_agent_param(NAME, _), number(VALUE))),
+    reset_agent_params,
+    forall(member(NAME=VALUE, PARAMS),
+        assert(agent_param_value(NAME, VALUE))),
+    decision_cache_clear.  % cached decisions used the previous setting
+
+% Back to the default setting
+reset_agent_params :-
+    retractall(agent_param_value(_, _)).
+
+% Turning makes the current cell cheaper to come back through
+turn_cost(X, Y) :-
+    agent_param(turn_discount, DISCOUNT),
+    DELTA is -DISCOUNT,
+    add_cost(X, Y, DELTA).
+
+% ============================================================================
+% BITBOARDS - Integer encoding of the world layout and agent knowledge
+% ============================================================================
+
+% Cell (X,Y) maps to bit Y*(W+2)+X, walls included, so the 4 neighbours of
+% a cell are one shift away (+-1 horizontally, +-(W+2) vertically).
+% Integers are unbounded, so the same layout works on any map size.
+%
+% World boards:  walls, pits, inside (all non-wall cells), passable (inside
+%                and not a pit)
+% Agent boards:  visited, breeze, stench, safe (inferred safe), zero (cells
+%                with cost 0); the frontier is derived with agent_frontier/1
+
+% Index of the bit of a cell
+cell_index(X, Y, INDEX) :-
+    X >= 0, Y >= 0,
+    w_size(W, _),
+    INDEX is Y * (W + 2) + X.
+
+% Cell of a bit index
+index_cell(INDEX, X, Y) :-
+    w_size(W, _),
+    Y is INDEX // (W + 2),
+    X is INDEX mod (W + 2).
+
+% Bit of a cell
+cell_bit(X, Y, BIT) :-
+    cell_index(X, Y, INDEX),
+    BIT is 1 << INDEX.
+
+% Indexes of the bits set on a board (ascending)
+board_indices(0, []) :- !.
+board_indices(BITS, [INDEX|INDICES]) :-
+    INDEX is lsb(BITS),
+    REST is BITS /\ \ (1 << INDEX),
+    board_indices(REST, INDICES).
+
+% Board with the bits of all cells matching a goal
+cells_board(X-Y, GOAL, BITS) :-
+    findall(BIT, (call(GOAL), cell_bit(X, Y, BIT)), L),
+    sort(L, SET),
+    sum_list(SET, BITS).
+
+% 4-neighbourhood of every cell on a board
+board_neighbours(BITS, NEIGHBOURS) :-
+    w_size(W, _),
+    S is W + 2,
+    NEIGHBOURS is (BITS << 1) \/ (BITS >> 1) \/ (BITS << S) \/ (BITS >> S).
+
+% 4-neighbourhood of a single cell
+neighbour_mask(X, Y, MASK) :-
+    cell_bit(X, Y, BIT),
+    board_neighbours(BIT, MASK).
+
+% Create the world and agent boards (after the world is built)
+init_boards :-
+    retractall(w_board(_,_)),
+    retractall(a_board(_,_)),
+    cells_board(X1-Y1, w_wall(X1, Y1), WALLS),
+    cells_board(X2-Y2, w_pit(X2, Y2), PITS),
+    w_size(W, H),
+    cells_board(X3-Y3, (between(1, W, X3), between(1, H, Y3)), INSIDE),
+    assert(w_board(walls, WALLS)),
+    assert(w_board(pits, PITS)),
+    assert(w_board(inside, INSIDE)),
+    PASSABLE is INSIDE /\ \ PITS,
+    assert(w_board(passable, PASSABLE)),
+    forall(
+        member(NAME, [visited, breeze, stench, safe, zero]),
+        assert(a_board(NAME, 0))
+    ).
+
+% Check if a cell is set on an agent board
+board_has(NAME, X, Y) :-
+    cell_bit(X, Y, BIT),
+    a_board(NAME, BITS),
+    BITS /\ BIT =\= 0.
+
+% Set a cell on an agent board
+mark_board(NAME, X, Y) :-
+    board_has(NAME, X, Y), !.
+mark_board(NAME, X, Y) :-
+    cell_bit(X, Y, BIT),
+    retract(a_board(NAME, BITS)),
+    NEW_BITS is BITS \/ BIT,
+    assert(a_board(NAME, NEW_BITS)).
+
+% Agent knowledge queries on top of the boards
+a_visited(X, Y) :- board_has(visited, X, Y).
+a_breeze_at(X, Y) :- board_has(breeze, X, Y).
+a_stench_at(X, Y) :- board_has(stench, X, Y).
+
+% Cell is neither a wall nor a pit (monsters can walk on it)
+passable_cell(X, Y) :-
+    cell_bit(X, Y, BIT),
+    w_board(passable, PASSABLE),
+    PASSABLE /\ BIT =\= 0.
+
+% Cell is neither a wall nor visited
+unexplored(X, Y) :-
+    cell_bit(X, Y, BIT),
+    w_board(walls, WALLS),
+    a_board(visited, VISITED),
+    (WALLS \/ VISITED) /\ BIT =:= 0.
+
+% Unvisited cells next to a visited one
+agent_frontier(FRONTIER) :-
+    a_board(visited, VISITED),
+    w_board(inside, INSIDE),
+    board_neighbours(VISITED, NEIGHBOURS),
+    FRONTIER is NEIGHBOURS /\ INSIDE /\ \ VISITED.
+
+% Adjacent cells in the agent scan order (left, up, right, down)
+side_cell(X, Y, L, Y) :- L is X - 1.
+side_cell(X, Y, X, U) :- U is Y + 1.
+side_cell(X, Y, R, Y) :- R is X + 1.
+side_cell(X, Y, X, D) :- D is Y - 1.
+
+% Set the cost of a cell (keeps the zero cost board in sync)
+set_cost(X, Y, COST) :-
+    retractall(a_costs(X, Y, _)),
+    assert(a_costs(X, Y, COST)),
+    cell_bit(X, Y, BIT),
+    retract(a_board(zero, ZERO)),
+    (
+        COST =:= 0 ->
+            NEW_ZERO is ZERO \/ BIT
+        ;
+            NEW_ZERO is ZERO /\ \ BIT
+    ),
+    assert(a_board(zero, NEW_ZERO)).
+
+% Add to the cost of a cell (fails if the cell has no cost yet)
+add_cost(X, Y, DELTA) :-
+    a_costs(X, Y, COST),
+    NEW_COST is COST + DELTA,
+    set_cost(X, Y, NEW_COST).
+
 % ============================================================================
 % SOUND SYSTEM - Enhanced Stealth Gameplay
 % ============================================================================
@@ -1097,9 +1264,9 @@ wumpus_behavior(investigating) :-
     move_toward(WX, WY, TX, TY, NX, NY),
     retract(w_wumpus(WX, WY)),
     assert(w_wumpus(NX, NY)),
-    % Check if reached target
+    % Check if reached target (or no path leads closer to it)
     (
-        (NX = TX, NY = TY) ->
+        ((NX = TX, NY = TY) ; (NX = WX, NY = WY)) ->
             (
                 retract(wumpus_state(1, _)),
                 assert(wumpus_state(1, alert)),
@@ -1163,32 +1330,23 @@ wumpus_behavior(chasing) :-
 % UTILITY PREDICATES
 % ============================================================================
 
-% Helper: Move one cell toward target
+% Helper: Move one cell toward target along a shortest path (see
+% PATHFINDING), stay in place if no passable path leads closer
 move_toward(FromX, FromY, ToX, ToY, NewX, NewY) :-
-    DX is ToX - FromX,
-    DY is ToY - FromY,
-    (
-        (abs(DX) > abs(DY), DX > 0) -> (TestX is FromX + 1, TestY is FromY);
-        (abs(DX) > abs(DY), DX < 0) -> (TestX is FromX - 1, TestY is FromY);
-        (DY > 0) -> (TestX is FromX, TestY is FromY + 1);
-        (DY < 0) -> (TestX is FromX, TestY is FromY - 1);
-        (TestX is FromX, TestY is FromY)
-    ),
-    % Validate move (not wall, not pit)
-    (
-        (\+ w_wall(TestX, TestY), \+ w_pit(TestX, TestY)) ->
-            (NewX is TestX, NewY is TestY)
-        ;
-            (NewX is FromX, NewY is FromY)  % Can't move, stay in place
-    ).
+    inside_cell(ToX, ToY),
+    cell_index(FromX, FromY, FROM),
+    cell_index(ToX, ToY, TO),
+    next_hop(FROM, TO, NEXT),
+    !,
+    index_cell(NEXT, NewX, NewY).
+move_toward(FromX, FromY, _, _, FromX, FromY).
 
 % Helper: Random adjacent safe cell
 random_adjacent_safe_cell(X, Y, NX, NY) :-
     findall([AX, AY], 
         (
             adjacent_cell(X, Y, AX, AY),
-            \+ w_wall(AX, AY),
-            \+ w_pit(AX, AY)
+            passable_cell(AX, AY)
         ), 
         SafeCells
     ),
@@ -1211,6 +1369,96 @@ grid_distance(X1, Y1, X2, Y2, Dist) :-
     DY is abs(Y2 - Y1),
     Dist is DX + DY.
 
+% Helper: Cell on the board (not a wall, not outside)
+inside_cell(X, Y) :-
+    w_size(W, H),
+    X >= 1, X =< W,
+    Y >= 1, Y =< H.
+
+% ============================================================================
+% PATHFINDING - Next-hop table for monster movement
+% ============================================================================
+
+% Walls and pits never change after the world is created, so shortest
+% paths are computed once. The field of a target cell is a compound term
+% with one argument per cell index: the index of the next cell on a
+% shortest path to the target (the cell itself when the target cannot be
+% reached). One breadth-first search from the target builds a field, a
+% move is then one arg/3 lookup.
+%
+% Small maps build every field with the world, large maps build the field
+% of a target the first time a monster heads for it and keep it.
+
+path_eager_limit(400).  % passable cells up to which all fields are built
+
+% Build the fields of every passable cell (small maps) or none (large maps)
+init_paths :-
+    w_board(passable, PASSABLE),
+    board_indices(PASSABLE, CELLS),
+    length(CELLS, COUNT),
+    path_eager_limit(LIMIT),
+    (COUNT =< LIMIT -> init_paths(eager) ; init_paths(lazy)).
+
+init_paths(lazy) :-
+    retractall(w_path_field(_, _)).
+init_paths(eager) :-
+    init_paths(lazy),
+    w_board(passable, PASSABLE),
+    board_indices(PASSABLE, CELLS),
+    forall(member(TO, CELLS), path_field(TO, _)).
+
+% Field of a target cell index (built and cached on first use)
+path_field(TO, FIELD) :-
+    w_path_field(TO, FIELD), !.
+path_field(TO, FIELD) :-
+    build_path_field(TO, FIELD),
+    assertz(w_path_field(TO, FIELD)).
+
+% Next cell index from a cell towards a target (fails if blocked)
+next_hop(FROM, TO, NEXT) :-
+    path_field(TO, FIELD),
+    ARG is FROM + 1,
+    arg(ARG, FIELD, NEXT),
+    NEXT =\= FROM,
+    w_board(passable, PASSABLE),
+    PASSABLE >> NEXT /\ 1 =:= 1.  % a pit target is approached, not entered
+
+% Breadth-first search from the target over the passable cells
+build_path_field(TO, FIELD) :-
+    w_size(W, H),
+    SIZE is (W + 2) * (H + 2),
+    w_board(passable, PASSABLE),
+    START is 1 << TO,
+    path_layers(START, PASSABLE, START, [], HOPS),
+    list_to_assoc(HOPS, ASSOC),
+    LAST is SIZE - 1,
+    numlist(0, LAST, CELLS),
+    maplist(field_hop(ASSOC), CELLS, NEXTS),
+    FIELD =.. [field|NEXTS].
+
+% Expand the search one layer (a board) at a time
+path_layers(0, _, _, HOPS, HOPS) :- !.
+path_layers(LAYER, PASSABLE, SEEN, HOPS0, HOPS) :-
+    board_neighbours(LAYER, NEIGHBOURS),
+    NEXT is NEIGHBOURS /\ PASSABLE /\ \ SEEN,
+    board_indices(NEXT, CELLS),
+    foldl(layer_hop(LAYER), CELLS, HOPS0, HOPS1),
+    NEW_SEEN is SEEN \/ NEXT,
+    path_layers(NEXT, PASSABLE, NEW_SEEN, HOPS1, HOPS).
+
+% A newly reached cell steps to a neighbour in the previous layer
+layer_hop(LAYER, CELL, HOPS, [CELL-NEXT|HOPS]) :-
+    w_size(W, _),
+    S is W + 2,
+    member(D, [-1, 1, S, -S]),
+    NEXT is CELL + D,
+    LAYER >> NEXT /\ 1 =:= 1,
+    !.
+
+field_hop(ASSOC, CELL, NEXT) :-
+    get_assoc(CELL, ASSOC, NEXT), !.
+field_hop(_, CELL, CELL).
+
 % ============================================================================
 % ROCK THROWING SYSTEM
 % ============================================================================
@@ -1330,6 +1578,7 @@ handle_chest_open(_ChestID, treasure, X, Y) :-
 handle_chest_open(_ChestID, mimic, X, Y) :-
     % Mimic attack!
     assert(player_stunned(2)),
+    metrics_note(stun, 1),
     % Create VERY loud sound
     add_sound(X, Y, 5, 4),
     % Wumpus switches to chasing!
@@ -1369,26 +1618,47 @@ is_player_stunned :-
 % Initialize fog (all cells hidden)
 init_fog :-
     retractall(fog_revealed(_,_)),
-    retractall(fog_visible(_,_)).
+    retractall(fog_visible(_,_)),
+    retractall(fog_board(_,_)),
+    assert(fog_board(revealed, 0)),
+    assert(fog_board(visible, 0)).
 
 % Update fog based on player position
 update_fog :-
     retractall(fog_visible(_,_)),
     w_hunter(HX, HY, _),
+    w_size(W, H),
     VisionRange = 2,
+    MinX is max(1, HX - VisionRange), MaxX is min(W, HX + VisionRange),
+    MinY is max(1, HY - VisionRange), MaxY is min(H, HY + VisionRange),
     % Mark visible cells
     forall(
         (
-            between(1, 4, X),
-            between(1, 4, Y),
+            between(MinX, MaxX, X),
+            between(MinY, MaxY, Y),
             grid_distance(HX, HY, X, Y, Dist),
             Dist =< VisionRange
         ),
         (
             assert(fog_visible(X, Y)),
-            assert(fog_revealed(X, Y))
+            (fog_revealed(X, Y) -> true; assert(fog_revealed(X, Y)))
         )
-    ).
+    ),
+    update_fog_boards.
+
+% Mirror the fog in two bitboards (see BITBOARDS)
+update_fog_boards :-
+    cells_board(X-Y, fog_visible(X, Y), Visible),
+    retract(fog_board(revealed, Old)),
+    Revealed is Old \/ Visible,
+    retract(fog_board(visible, _)),
+    assert(fog_board(revealed, Revealed)),
+    assert(fog_board(visible, Visible)).
+
+% Fog bitboards (revealed and currently visible cells)
+fog_boards(Revealed, Visible) :-
+    fog_board(revealed, Revealed),
+    fog_board(visible, Visible).
 
 % Check if cell is visible
 is_visible(X, Y) :-
@@ -1441,4 +1711,541 @@ process_environment_turn :-
     % Wumpus AI
     wumpus_detect_sound,
     wumpus_see_player,
-    wumpus_turn. 
\ No newline at end of file
+    wumpus_turn.
+
+% ============================================================================
+% DECISION CACHE - Transposition table for agent decisions
+% ============================================================================
+
+% The heuristic only reads the hunter pose, the goal, the current perception
+% and the agent knowledge within two cells of the hunter, and only writes
+% inside that window. Once such a local state has been evaluated, the action
+% and the knowledge it wrote are replayed instead. Entries are kept in LRU
+% order in the clause database: a hit is moved to the end, the first clause
+% is always the least recently used one. The table is shared by the game
+% threads, so it is only changed under the decision_cache mutex.
+
+% Enable the cache with a maximum number of entries
+decision_cache_enable(Capacity) :-
+    integer(Capacity),
+    Capacity > 0,
+    retractall(decision_cache_capacity(_)),
+    assert(decision_cache_capacity(Capacity)),
+    decision_cache_clear.
+
+% Disable the cache (entries and counters are dropped)
+decision_cache_disable :-
+    retractall(decision_cache_capacity(_)),
+    decision_cache_clear.
+
+% Drop all entries and reset the counters
+decision_cache_clear :-
+    with_mutex(decision_cache, (
+        retractall(decision_cache_entry(_,_,_,_)),
+        flag(decision_cache_size, _, 0),
+        flag(decision_cache_hits, _, 0),
+        flag(decision_cache_misses, _, 0),
+        flag(decision_cache_evictions, _, 0)
+    )).
+
+% Cache counters
+decision_cache_stats(Hits, Misses, Evictions, Size) :-
+    flag(decision_cache_hits, Hits, Hits),
+    flag(decision_cache_misses, Misses, Misses),
+    flag(decision_cache_evictions, Evictions, Evictions),
+    flag(decision_cache_size, Size, Size).
+
+% Cells within two steps of the hunter: the heuristic reads the costs of
+% the hunter cell and its neighbours, and the boards around them
+decision_window(X, Y, WINDOW) :-
+    cell_bit(X, Y, BIT),
+    board_neighbours(BIT, NEAR),
+    board_neighbours(NEAR, FAR),
+    WINDOW is BIT \/ NEAR \/ FAR.
+
+% Costs of the hunter cell and its neighbours (none if not set)
+decision_costs(X, Y, COSTS) :-
+    findall(
+        COST,
+        (
+            (NX = X, NY = Y; side_cell(X, Y, NX, NY)),
+            (a_costs(NX, NY, C) -> COST = C; COST = none)
+        ),
+        COSTS
+    ).
+
+% Agent boards read or written by the heuristic
+decision_board(visited).
+decision_board(breeze).
+decision_board(stench).
+decision_board(safe).
+decision_board(zero).
+
+% Window bits of the agent boards, NAME-BITS pairs
+decision_boards(WINDOW, BOARDS) :-
+    findall(
+        NAME-BITS,
+        (decision_board(NAME), a_board(NAME, ALL), BITS is ALL /\ WINDOW),
+        BOARDS
+    ).
+
+% Everything the heuristic decision depends on: the hunter, the goal, the
+% map size and the knowledge inside the window. ZERO_OUT tells whether a
+% cell outside the window has a zero cost (see refreshCells/2)
+agent_state_key(SENSORS, WINDOW, state(SENSORS, X, Y, FACING, GOAL, GOLD, W, H,
+                                      WALLS, ZERO_OUT, COSTS, BOARDS)) :-
+    w_hunter(X, Y, FACING),
+    w_goal(GOAL),
+    (w_gold(0, 0) -> GOLD = 1; GOLD = 0),
+    w_size(W, H),
+    decision_window(X, Y, WINDOW),
+    w_board(walls, ALL_WALLS),
+    WALLS is ALL_WALLS /\ WINDOW,
+    a_board(zero, ZERO),
+    (ZERO /\ \ WINDOW =:= 0 -> ZERO_OUT = 0; ZERO_OUT = 1),
+    decision_costs(X, Y, COSTS),
+    decision_boards(WINDOW, BOARDS).
+
+% What the heuristic changed: the costs set around the hunter and the
+% window bits of the boards
+decision_effect(WINDOW, effect(COSTS, BOARDS)) :-
+    w_hunter(X, Y, _),
+    findall(
+        NX-NY-COST,
+        ((NX = X, NY = Y; side_cell(X, Y, NX, NY)), a_costs(NX, NY, COST)),
+        COSTS
+    ),
+    decision_boards(WINDOW, BOARDS).
+
+% Replay a cached effect (costs first: set_cost/3 also updates zero)
+apply_decision_effect(WINDOW, effect(COSTS, BOARDS)) :-
+    forall(member(X-Y-COST, COSTS), set_cost(X, Y, COST)),
+    forall(
+        member(NAME-BITS, BOARDS),
+        (
+            retract(a_board(NAME, OLD)),
+            NEW is (OLD /\ \ WINDOW) \/ BITS,
+            assert(a_board(NAME, NEW))
+        )
+    ).
+
+% Find an entry and move it to the end (most recently used)
+decision_cache_lookup(Hash, Key, Option, Effect) :-
+    with_mutex(decision_cache, (
+        retract(decision_cache_entry(Hash, Key, Option, Effect)),
+        assertz(decision_cache_entry(Hash, Key, Option, Effect))
+    )).
+
+% Store a new entry, evicting the least recently used one when full. The
+% pool threads share the cache: the size test and update are one step
+decision_cache_store(Hash, Key, Option, Effect) :-
+    with_mutex(decision_cache, (
+        decision_cache_capacity(Capacity),
+        (
+            decision_cache_entry(Hash, Key, _, _) ->
+                true  % stored meanwhile by another thread
+            ;
+                flag(decision_cache_size, Size, Size),
+                (
+                    Size >= Capacity ->
+                        (
+                            retract(decision_cache_entry(_,_,_,_)) ->
+                                flag(decision_cache_evictions, E, E + 1)
+                            ;
+                                true
+                        )
+                    ;
+                        flag(decision_cache_size, S, S + 1)
+                ),
+                assertz(decision_cache_entry(Hash, Key, Option, Effect))
+        )
+    )).
+
+% Heuristic with the decision cache in front of it (if enabled)
+cached_heuristic(SENSORS, OPTION) :-
+    \+ decision_cache_capacity(_), !,
+    heuristic(SENSORS, OPTION).
+cached_heuristic(SENSORS, OPTION) :-
+    agent_state_key(SENSORS, Window, Key),
+    term_hash(Key, Hash),
+    (
+        decision_cache_lookup(Hash, Key, CachedOption, Effect) ->
+            (
+                flag(decision_cache_hits, H, H + 1),
+                apply_decision_effect(Window, Effect),
+                OPTION = CachedOption
+            )
+        ;
+            (
+                flag(decision_cache_misses, M, M + 1),
+                heuristic(SENSORS, NewOption),
+                decision_effect(Window, NewEffect),
+                decision_cache_store(Hash, Key, NewOption, NewEffect),
+                OPTION = NewOption
+            )
+    ).
+
+% ============================================================================
+% GAME SESSION API - Headless turns, observations and saved games
+% ============================================================================
+
+% Game outcome: won, lost (by wumpus or pit) or still playing
+game_status(lost, wumpus) :- w_hunter(X, Y, _), w_wumpus(X, Y), !.
+game_status(lost, pit) :- w_hunter(X, Y, _), w_pit(X, Y), !.
+game_status(won, none) :- w_hunter(1, 1, _), w_goal(1), !.
+game_status(playing, none).
+
+% Cell in front of the hunter
+facing_cell(X, Y, up, X, NY) :- NY is Y + 1.
+facing_cell(X, Y, down, X, NY) :- NY is Y - 1.
+facing_cell(X, Y, left, NX, Y) :- NX is X - 1.
+facing_cell(X, Y, right, NX, Y) :- NX is X + 1.
+
+% Player turn with the same rules as the pygame user controller
+player_turn(_) :-
+    game_status(Status, _),
+    Status \= playing, !.
+player_turn(_) :-
+    % Stunned: the action is lost but the environment still plays
+    is_player_stunned, !,
+    environment_turn.
+player_turn(move) :-
+    % Walking into a wall is refused and does not spend the turn
+    w_hunter(X, Y, FACING),
+    facing_cell(X, Y, FACING, NX, NY),
+    w_wall(NX, NY), !.
+player_turn(move) :- !, move, environment_turn.
+player_turn(left) :- !, left, environment_turn.
+player_turn(right) :- !, right, environment_turn.
+player_turn(shoot) :- !, shoot, environment_turn.
+player_turn(grab) :- !,
+    w_hunter(X, Y, _),
+    (
+        chest(_, X, Y, _) ->
+            ignore(open_chest)
+        ;
+        (w_gold(X, Y), w_goal(0)) ->
+            grab(0)
+        ;
+            true
+    ),
+    environment_turn.
+player_turn(collect) :- !,
+    % Collect a rock and climb out if standing on the exit with the gold
+    ignore(collect_rock),
+    (w_hunter(1, 1, _), w_goal(1) -> climb(1); true).
+player_turn(throw(X, Y)) :- !,
+    ignore(throw_rock(X, Y)),
+    environment_turn.
+player_turn(wait) :- !,
+    environment_turn.
+
+% Agent turn (one runloop step, as in the pygame agent mode)
+agent_turn :-
+    game_status(playing, _), !,
+    retractall(a_last_action(_)),
+    ignore(runloop(-1)).
+agent_turn.
+
+% Everything a client needs to render or decide the next action
+observation(X, Y, FACING, SENSORS, SCORE, ARROWS, ROCKS, GOAL, STATUS, CAUSE, STUNNED) :-
+    w_hunter(X, Y, FACING),
+    getSensors(SENSORS),
+    h_score(SCORE),
+    h_arrow(ARROWS),
+    h_rocks(ROCKS),
+    w_goal(GOAL),
+    game_status(STATUS, CAUSE),
+    (is_player_stunned -> STUNNED = 1; STUNNED = 0).
+
+% Whole board in one query (spectators see through the fog)
+board_state(HUNTER, WUMPUS, GOLD, PITS, CHESTS, ROCKS, SCORE, STATUS) :-
+    w_hunter(HX, HY, HF),
+    HUNTER = [HX, HY, HF],
+    (w_wumpus(WX, WY) -> WUMPUS = [WX, WY]; WUMPUS = []),
+    (w_goal(0), w_gold(GX, GY), GX > 0 -> GOLD = [GX, GY]; GOLD = []),
+    findall([PX, PY], w_pit(PX, PY), PITS),
+    findall(
+        [ID, CX, CY, TYPE, OPENED],
+        (chest(ID, CX, CY, TYPE), (chest_opened(ID) -> OPENED = 1; OPENED = 0)),
+        CHESTS
+    ),
+    findall([RX, RY], rock_pickup(RX, RY), ROCKS),
+    h_score(SCORE),
+    game_status(STATUS, _).
+
+% Dynamic facts that make up a game (everything clearWorld deletes)
+game_fact(w_wall(_,_)).
+game_fact(w_hunter(_,_,_)).
+game_fact(w_wumpus(_,_)).
+game_fact(w_pit(_,_)).
+game_fact(w_gold(_,_)).
+game_fact(w_goal(_)).
+game_fact(w_cells(_)).
+game_fact(h_score(_)).
+game_fact(h_arrow(_)).
+game_fact(a_costs(_,_,_)).
+game_fact(a_board(_,_)).
+game_fact(w_board(_,_)).
+game_fact(w_size(_,_)).
+game_fact(a_last_action(_)).
+game_fact(metric_game_ended).
+game_fact(no_logs(_)).
+game_fact(sound_event(_,_,_,_)).
+game_fact(wumpus_state(_,_)).
+game_fact(wumpus_target(_,_,_)).
+game_fact(wumpus_alert_turns(_,_)).
+game_fact(h_rocks(_)).
+game_fact(rock_pickup(_,_)).
+game_fact(chest(_,_,_,_)).
+game_fact(chest_opened(_)).
+game_fact(player_stunned(_)).
+game_fact(fog_revealed(_,_)).
+game_fact(fog_visible(_,_)).
+game_fact(fog_board(_,_)).
+
+% Save the current game under an ID so the engine can host other games
+game_save(ID) :-
+    findall(FACT, (game_fact(FACT), call(FACT)), FACTS),
+    retractall(saved_game(ID, _)),
+    assert(saved_game(ID, FACTS)).
+
+% Restore a saved game (it stays saved until dropped)
+game_load(ID) :-
+    saved_game(ID, FACTS),
+    clearWorld,
+    forall(member(FACT, FACTS), assertz(FACT)).
+
+% Forget a saved game
+game_drop(ID) :-
+    retractall(saved_game(ID, _)).
+
+% ============================================================================
+% METRICS - Samples for the optional metrics registry (metrics.py)
+% ============================================================================
+
+% Disabled by default, the hooks then cost one flag test. When enabled the
+% environment turns are timed and the mimic stuns noted as samples of the
+% calling thread, drained after each turn by metrics_collect/3.
+
+metrics_enable :- flag(metrics_enabled, _, 1).
+
+metrics_disable :-
+    flag(metrics_enabled, _, 0),
+    retractall(metric_sample(_,_)).
+
+metrics_enabled :- flag(metrics_enabled, 1, 1).
+
+% Note a sample (if enabled)
+metrics_note(NAME, VALUE) :-
+    (metrics_enabled -> assertz(metric_sample(NAME, VALUE)); true).
+
+% Environment turn of a player turn, timed if metrics are enabled
+environment_turn :-
+    metrics_enabled, !,
+    get_time(START),
+    ignore(process_environment_turn),
+    get_time(END),
+    SECONDS is END - START,
+    assertz(metric_sample(environment_turn, SECONDS)).
+environment_turn :-
+    ignore(process_environment_turn).
+
+% Dynamic predicates reported as fact count gauges
+metric_fact(fog_revealed/2).
+metric_fact(fog_visible/2).
+metric_fact(sound_event/4).
+metric_fact(a_costs/3).
+metric_fact(a_board/2).
+metric_fact(w_path_field/2).
+metric_fact(decision_cache_entry/4).
+metric_fact(saved_game/2).
+
+% Drain the samples, count the facts, and report the end of the game once
+% (ENDED = [STATUS, CAUSE] the first time it is seen over, [] otherwise)
+metrics_collect(SAMPLES, FACTS, ENDED) :-
+    findall([NAME, VALUE], retract(metric_sample(NAME, VALUE)), SAMPLES),
+    findall(
+        [NAME, COUNT],
+        (
+            metric_fact(NAME/ARITY),
+            functor(HEAD, NAME, ARITY),
+            (predicate_property(HEAD, number_of_clauses(COUNT)) -> true; COUNT = 0)
+        ),
+        FACTS
+    ),
+    (
+        game_status(STATUS, CAUSE), STATUS \== playing, \+ metric_game_ended ->
+            assert(metric_game_ended),
+            ENDED = [STATUS, CAUSE]
+        ;
+            ENDED = []
+    ).
+
+% ============================================================================
+% ACTION SCRIPTS - Many turns in one call
+% ============================================================================
+
+% Play a list of turns (player_turn/1 actions or agent) in one call, for
+% replays and scripted games. One compact observation per played turn:
+% [X, Y, FACING, SENSORS, SCORE_DELTA, STATUS, CAUSE]. Stops after the turn
+% that ends the game (the remaining actions are not played).
+play_script(ACTIONS, STEPS, SCORE) :-
+    (game_status(playing, _) -> script_steps(ACTIONS, STEPS); STEPS = []),
+    h_score(SCORE).
+
+script_steps([], []).
+script_steps([ACTION|ACTIONS], [[X, Y, FACING, SENSORS, DELTA, STATUS, CAUSE]|STEPS]) :-
+    h_score(BEFORE),
+    script_turn(ACTION),
+    h_score(AFTER),
+    DELTA is AFTER - BEFORE,
+    w_hunter(X, Y, FACING),
+    getSensors(SENSORS),
+    game_status(STATUS, CAUSE),
+    (STATUS == playing -> script_steps(ACTIONS, STEPS); STEPS = []).
+
+script_turn(agent) :- !, agent_turn.
+script_turn(ACTION) :- ignore(player_turn(ACTION)).
+
+% ============================================================================
+% GAME THREADS - Many games in one engine on a pool of Prolog threads
+% ============================================================================
+
+% The world and agent facts are thread_local, so every worker thread below
+% has its own game while the code, the decision cache, the saved games and
+% the agent parameters are shared. A game saved by one thread can be loaded
+% by another. Jobs and results go through two message queues.
+
+% Play an agent game to the end (or MAX steps) in the calling thread.
+% MAP is an argument of run/1: pygame, pygameMap or pygameCave(W, H)
+play_game(SEED, MAP, MAX, STATUS, CAUSE, SCORE, STEPS) :-
+    set_random(seed(SEED)),
+    run(MAP),
+    agent_steps(0, MAX, STEPS),
+    game_status(STATUS, CAUSE),
+    h_score(SCORE),
+    clearWorld.
+
+agent_steps(N, MAX, N) :-
+    (N >= MAX ; \+ game_status(playing, _)), !.
+agent_steps(N, MAX, STEPS) :-
+    agent_turn,
+    N1 is N + 1,
+    agent_steps(N1, MAX, STEPS).
+
+% Start THREADS worker threads (a running pool is stopped first)
+game_pool_start(THREADS) :-
+    integer(THREADS),
+    THREADS > 0,
+    game_pool_stop,
+    message_queue_create(Jobs),
+    message_queue_create(Results),
+    findall(
+        Worker,
+        (between(1, THREADS, _), thread_create(game_worker(Jobs, Results), Worker, [])),
+        Workers
+    ),
+    assert(game_pool(Jobs, Results, Workers)).
+
+% Let the workers finish the queued games, then join them
+game_pool_stop :-
+    retract(game_pool(Jobs, Results, Workers)), !,
+    forall(member(_, Workers), thread_send_message(Jobs, stop)),
+    forall(member(Worker, Workers), thread_join(Worker, _)),
+    message_queue_destroy(Jobs),
+    message_queue_destroy(Results).
+game_pool_stop.
+
+% Worker loop: one game per job until a stop message
+game_worker(Jobs, Results) :-
+    thread_get_message(Jobs, JOB),
+    (
+        JOB = game(ID, SEED, MAP, MAX) ->
+            (
+                catch(play_game(SEED, MAP, MAX, STATUS, CAUSE, SCORE, STEPS), E,
+                      (term_to_atom(E, CAUSE), STATUS = error, SCORE = 0, STEPS = 0)) ->
+                    true
+                ;
+                    STATUS = error, CAUSE = failed, SCORE = 0, STEPS = 0
+            ),
+            thread_send_message(Results, done(ID, STATUS, CAUSE, SCORE, STEPS)),
+            game_worker(Jobs, Results)
+        ;
+            true
+    ).
+
+% Queue a game for the pool
+game_pool_submit(ID, SEED, MAP, MAX) :-
+    game_pool(Jobs, _, _),
+    thread_send_message(Jobs, game(ID, SEED, MAP, MAX)).
+
+% Wait for the result of a game (the next finished one if ID is unbound)
+game_pool_result(ID, STATUS, CAUSE, SCORE, STEPS) :-
+    game_pool(_, Results, _),
+    thread_get_message(Results, done(ID, STATUS, CAUSE, SCORE, STEPS)).
+
+% ============================================================================
+% PROFILING - Predicate-level profile of batches of games
+% ============================================================================
+
+% A batch of games runs under the SWI-Prolog profiler in the calling thread
+% and is reported as plain lists for prolog_profile.py: the totals
+% [SECONDS, TICKS, INFERENCES] and one node per predicate,
+% [PREDICATE, CALLS, REDOS, TICKS_SELF, TICKS_CHILDREN, CALLERS] with
+% CALLERS a list of [CALLER, CALLS, TICKS]. The profiler only records
+% caller/callee pairs, not whole stacks.
+
+% Profile a workload (TIME: cpu or wall), the profiler is reset after
+profile_workload(WORKLOAD, TIME, [SECONDS, TICKS, INFERENCES], NODES) :-
+    statistics(inferences, START),
+    with_output_to(string(_), profile(profile_run(WORKLOAD), [time(TIME), top(0)])),
+    statistics(inferences, END),
+    INFERENCES is END - START,
+    profile_data(DATA),
+    get_dict(summary, DATA, SUMMARY),
+    get_dict(time, SUMMARY, SECONDS),
+    get_dict(ticks, SUMMARY, TICKS),
+    get_dict(nodes, DATA, ALL),
+    findall(NODE, (member(ENTRY, ALL), profile_node(ENTRY, NODE)), NODES),
+    reset_profiler.
+
+% Agent games, one per seed (MAP: see play_game/7)
+profile_run(agent(SEEDS, MAP, MAX)) :-
+    forall(member(SEED, SEEDS), play_game(SEED, MAP, MAX, _, _, _, _)).
+% Scripted games, [SEED, ACTIONS] pairs (see play_script/3)
+profile_run(scripts(GAMES, MAP)) :-
+    forall(
+        member([SEED, ACTIONS], GAMES),
+        (
+            set_random(seed(SEED)),
+            run(MAP),
+            play_script(ACTIONS, _, _),
+            clearWorld
+        )
+    ).
+
+profile_node(ENTRY, [NAME, CALLS, REDOS, SELF, CHILDREN, CALLERS]) :-
+    get_dict(predicate, ENTRY, PREDICATE),
+    profile_name(PREDICATE, NAME),
+    get_dict(call, ENTRY, CALLS),
+    get_dict(redo, ENTRY, REDOS),
+    get_dict(ticks_self, ENTRY, SELF),
+    get_dict(ticks_siblings, ENTRY, CHILDREN),
+    get_dict(callers, ENTRY, PARENTS),
+    findall(
+        [CALLER, N, T],
+        (
+            member(PARENT, PARENTS),    % node(Pred, Cycle, Ticks, TicksSiblings, Calls, ...)
+            arg(1, PARENT, P),
+            arg(3, PARENT, T),
+            arg(5, PARENT, N),
+            profile_name(P, CALLER)
+        ),
+        CALLERS
+    ).
+
+% Predicate indicator as text (user: dropped), <spontaneous> and the like kept
+profile_name(NAME, NAME) :- atom(NAME), !.
+profile_name(user:PI, NAME) :- !, format(atom(NAME), '~q', [PI]).
+profile_name(PI, NAME) :- format(atom(NAME), '~q', [PI]).
@@ -0,0 +1,50 @@
+"""
+Action logs: JSON-lines record of a game that can be replayed exactly
+First line is the header {"seed": ..., "map": ..., "size": [W, H]} (size
+only for generated caves), then one action per line
+"""
+
+import json
+
+
+class ActionLog:
+    """Append the actions of one game to a JSON-lines file"""
+
+    def __init__(self, path, seed, traditional=False, size=None):
+        """
+        Open the log and write its header
+
+        Args:
+            path: Output file
+            seed: Random seed the game was started with
+            traditional: Game runs on the traditional map
+            size: (W, H) of a generated cave (see game_session.world_goal)
+        """
+        self.file = open(path, 'w')
+        header = {'seed': seed, 'map': 'traditional' if traditional else 'random'}
+        if size:
+            header['size'] = list(size)
+        self.file.write(json.dumps(header) + '\n')
+
+    def write(self, action, target=None):
+        """Record one action (see GameSession.ACTIONS)"""
+        entry = {'action': action}
+        if target:
+            entry['target'] = list(target)
+        self.file.write(json.dumps(entry) + '\n')
+        self.file.flush()
+
+    def close(self):
+        """Close the log file"""
+        if not self.file.closed:
+            self.file.close()
+
+
+def read_action_log(path):
+    """Read a log, returns (header, [(action, target), ...])"""
+    with open(path) as file:
+        lines = [json.loads(line) for line in file if line.strip()]
+
+    header, entries = lines[0], lines[1:]
+    actions = [(entry['action'], entry.get('target')) for entry in entries]
+    return header, actions
@@ -0,0 +1,63 @@
+"""
+Bitboard layout shared with the Prolog knowledge base
+Cell (x, y) is bit y * (width + 2) + x, walls included
+"""
+
+
+class Bitboard:
+    """Integer bitboard helpers mirroring the BITBOARDS section of main.pl"""
+
+    def __init__(self, width=4, height=4):
+        """
+        Initialize the board layout
+
+        Args:
+            width: Map width without walls
+            height: Map height without walls
+        """
+        self.width = width
+        self.height = height
+        self.stride = width + 2
+        self.inside = self.from_cells(
+            (x, y)
+            for x in range(1, width + 1)
+            for y in range(1, height + 1)
+        )
+
+    def bit(self, x, y):
+        """Bit of a single cell"""
+        return 1 << (y * self.stride + x)
+
+    def has(self, board, x, y):
+        """Check if a cell is set on a board"""
+        return (board >> (y * self.stride + x)) & 1 == 1
+
+    def from_cells(self, cells):
+        """Build a board from (x, y) cells"""
+        board = 0
+        for x, y in cells:
+            board |= self.bit(x, y)
+        return board
+
+    def cells(self, board):
+        """Iterate over the (x, y) cells set on a board"""
+        while board:
+            low = board & -board
+            index = low.bit_length() - 1
+            yield index % self.stride, index // self.stride
+            board ^= low
+
+    def count(self, board):
+        """Number of cells set on a board"""
+        return bin(board).count('1')
+
+    def neighbours(self, board):
+        """4-neighbourhood of every cell on a board (inside cells only)"""
+        stride = self.stride
+        return (
+            (board << 1) | (board >> 1) | (board << stride) | (board >> stride)
+        ) & self.inside
+
+    def frontier(self, visited):
+        """Unvisited cells next to a visited one"""
+        return self.neighbours(visited) & ~visited
@@ -0,0 +1,197 @@
+"""
+Prepared queries for the pyswip bridge
+A goal is built from its functor and argument term refs created once and
+reused by every call, instead of parsing query text on each call
+"""
+
+from ctypes import byref, c_char_p, c_long
+
+_prepared = {}  # (name, arity) -> PreparedQuery
+_swipl = None   # pyswip modules, imported with the engine
+
+
+class Compound:
+    """Compound term argument, e.g. Compound('throw', 2, 3) for throw(2, 3)"""
+
+    __slots__ = ('name', 'args')
+
+    def __init__(self, name, *args):
+        self.name = name
+        self.args = args
+
+
+def _pyswip():
+    """pyswip core/easy/prolog modules (the engine is created first)"""
+    global _swipl
+    if _swipl is None:
+        from engine import get_engine
+
+        get_engine()  # initialises SWI-Prolog and loads main.pl
+        from pyswip import core, easy, prolog
+        _swipl = (core, easy, prolog)
+    return _swipl
+
+
+def to_python(value):
+    """Convert a pyswip value: atoms to str, compounds to text, lists deeply"""
+    core, easy, _ = _pyswip()
+    if isinstance(value, easy.Atom):
+        return value.value
+    if isinstance(value, bytes):
+        return value.decode()
+    if isinstance(value, list):
+        return [to_python(item) for item in value]
+    if isinstance(value, easy.Variable):
+        return None
+    if isinstance(value, easy.Functor):
+        return str(value)
+    return value
+
+
+def get_value(ref):
+    """Typed value of a term ref: None for unbound, str for atoms, int..."""
+    core, easy, _ = _pyswip()
+    kind = core.PL_term_type(ref)
+    if kind == core.PL_INTEGER:
+        number = c_long()
+        if core.PL_get_long(ref, byref(number)):
+            return number.value
+        text = c_char_p()  # does not fit in a long
+        core.PL_get_chars(ref, byref(text), core.CVT_INTEGER)
+        return int(text.value)
+    if kind == core.PL_ATOM:
+        return easy.getAtomChars(ref).decode()
+    if kind == core.PL_VARIABLE:
+        return None
+    return to_python(easy.getTerm(ref))
+
+
+def put_value(ref, value):
+    """Put a Python value in a term ref (None puts a fresh variable)"""
+    core, easy, _ = _pyswip()
+    if value is None:
+        core.PL_put_variable(ref)
+    elif isinstance(value, bool):
+        core.PL_put_integer(ref, int(value))
+    elif isinstance(value, int):
+        core.PL_put_integer(ref, value)
+    elif isinstance(value, str):
+        core.PL_put_atom_chars(ref, value)
+    elif isinstance(value, Compound):
+        args = core.PL_new_term_refs(len(value.args))
+        for i, arg in enumerate(value.args):
+            put_value(args + i, arg)
+        functor = core.PL_new_functor(
+            core.PL_new_atom(value.name), len(value.args))
+        core.PL_cons_functor_v(ref, functor, args)
+    elif isinstance(value, (list, tuple)):
+        core.PL_put_nil(ref)
+        for item in reversed(value):
+            head = core.PL_new_term_ref()
+            put_value(head, item)
+            core.PL_cons_list(ref, head, ref)
+    else:
+        raise TypeError(f"Cannot pass {type(value).__name__} to Prolog")
+
+
+class PreparedQuery:
+    """Call to one predicate, predicate handle and argument refs built once"""
+
+    FLAGS = 0x04 | 0x08  # PL_Q_NODEBUG | PL_Q_CATCH_EXCEPTION
+    calls = 0  # queries run by all the instances (see metrics.py)
+
+    def __init__(self, name, arity):
+        """
+        Declare the query (nothing is created before its first call)
+
+        Args:
+            name: Predicate name
+            arity: Predicate arity
+        """
+        self.name = name
+        self.arity = arity
+        self.predicate = None
+        self.args = None
+
+    def __repr__(self):
+        return f'PreparedQuery({self.name}/{self.arity})'
+
+    def prepare(self):
+        """Look up the predicate and allocate the argument refs"""
+        core, _, _ = _pyswip()
+        self.predicate = core.PL_predicate(self.name, self.arity, None)
+        self.args = core.PL_new_term_refs(self.arity)
+
+    def solutions(self, args, limit=None):
+        """
+        Run the query and convert the argument bindings of each solution
+
+        Args:
+            args: Argument values, missing trailing ones and None are unbound
+            limit: Stop after this many solutions (None for all)
+
+        Returns:
+            list of tuples, one value per argument
+        """
+        if len(args) > self.arity:
+            raise TypeError(f"{self!r} called with {len(args)} arguments")
+        if self.predicate is None:
+            self.prepare()
+        core, easy, prolog = _pyswip()
+        PreparedQuery.calls += 1
+
+        frame = core.PL_open_foreign_frame()
+        results = []
+        try:
+            for i in range(self.arity):
+                put_value(self.args + i, args[i] if i < len(args) else None)
+
+            qid = core.PL_open_query(None, self.FLAGS, self.predicate, self.args)
+            try:
+                while limit is None or len(results) < limit:
+                    if not core.PL_next_solution(qid):
+                        error = core.PL_exception(qid)
+                        if error:
+                            raise prolog.PrologError(
+                                f'{self.name}/{self.arity}: '
+                                f'{to_python(easy.getTerm(error))}')
+                        break
+                    results.append(tuple(
+                        get_value(self.args + i) for i in range(self.arity)))
+            finally:
+                core.PL_close_query(qid)
+        finally:
+            core.PL_discard_foreign_frame(frame)
+            # the refs outlive the frame: leave no pointer into freed stacks
+            for i in range(self.arity):
+                core.PL_put_integer(self.args + i, 0)
+        return results
+
+    def once(self, *args):
+        """Argument values of the first solution, None if it fails"""
+        results = self.solutions(args, limit=1)
+        return results[0] if results else None
+
+    def value(self, *args):
+        """Last argument of the first solution (the usual output), or None"""
+        result = self.once(*args)
+        return result[-1] if result else None
+
+    def exists(self, *args):
+        """The query has a solution (stops at the first one)"""
+        return bool(self.solutions(args, limit=1))
+
+    # goals run for their side effects: succeeded?
+    call = exists
+
+    def all(self, *args):
+        """Argument values of every solution"""
+        return self.solutions(args)
+
+
+def predicate(name, arity):
+    """Shared PreparedQuery for name/arity"""
+    key = (name, arity)
+    if key not in _prepared:
+        _prepared[key] = PreparedQuery(name, arity)
+    return _prepared[key]
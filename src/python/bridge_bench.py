@@ -0,0 +1,75 @@
+"""
+Microbenchmark: prepared bridge queries against pyswip query strings
+Runs the per-frame queries of the pygame front end on a started game
+"""
+
+import argparse
+import time
+
+from bridge import predicate
+from engine import get_engine
+from game_session import GameSession
+
+
+def bench(function, calls):
+    """Microseconds per call"""
+    start = time.perf_counter()
+    for _ in range(calls):
+        function()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def cases(prolog):
+    """(name, string path, prepared path) for each benchmarked call"""
+    w_hunter = predicate('w_hunter', 3)
+    chest = predicate('chest', 4)
+    rock_pickup = predicate('rock_pickup', 2)
+    fog_boards = predicate('fog_boards', 2)
+    observation = predicate('observation', 11)
+    chest_id = (chest.once() or (1,))[0]
+
+    return [
+        ('w_hunter/3 once',
+         lambda: list(prolog.query("w_hunter( X, Y, Z)."))[0].values(),
+         lambda: w_hunter.once()),
+        ('chest/4 bound id',
+         lambda: list(prolog.query(f"chest({chest_id}, X, Y, _).")),
+         lambda: chest.once(chest_id)),
+        ('rock_pickup/2 exists',
+         lambda: bool(list(prolog.query("rock_pickup(2, 3)."))),
+         lambda: rock_pickup.exists(2, 3)),
+        ('fog_boards/2',
+         lambda: list(prolog.query("fog_boards(Revealed, Visible).")),
+         lambda: fog_boards.once()),
+        ('observation/11',
+         lambda: list(prolog.query(
+             "observation(X, Y, Facing, Sensors, Score, Arrows, Rocks, "
+             "Goal, Status, Cause, Stunned).")),
+         lambda: observation.once()),
+    ]
+
+
+def run(calls=20000, seed=7):
+    """Print the per-call time of both paths for each case"""
+    prolog = get_engine()
+    GameSession(prolog).new_game(seed=seed)
+
+    print(f"{'query':<24}{'string':>12}{'prepared':>12}{'speedup':>10}")
+    for name, string_path, prepared_path in cases(prolog):
+        # warm up both paths (predicate lookup, term refs)
+        string_path()
+        prepared_path()
+        string_time = bench(string_path, calls)
+        prepared_time = bench(prepared_path, calls)
+        print("{:<24}{:>10.1f}us{:>10.1f}us{:>9.1f}x".format(
+            name, string_time, prepared_time, string_time / prepared_time))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Prepared bridge queries vs query strings")
+    parser.add_argument('-calls', dest='calls', type=int, default=20000)
+    parser.add_argument('-seed', dest='seed', type=int, default=7)
+    args = parser.parse_args()
+
+    run(args.calls, args.seed)
@@ -0,0 +1,77 @@
+"""
+Benchmark: agent games with and without the decision cache on the same
+seeded maps. The cache stays opt-in (main.py -cache) unless it wins here
+"""
+
+import argparse
+import time
+
+from decision_cache import DecisionCache
+from engine import get_engine
+from game_session import GameSession
+
+
+def play(game, seeds, max_steps, size=None):
+    """
+    Play an agent game per seed
+
+    Returns:
+        (steps, seconds, outcomes) with one (status, score, steps) per game
+    """
+    steps = 0
+    outcomes = []
+    start = time.perf_counter()
+    for seed in seeds:
+        obs = game.new_game(seed=seed, size=size)
+        played = 0
+        while obs['status'] == 'playing' and played < max_steps:
+            obs = game.act('agent')
+            played += 1
+        steps += played
+        outcomes.append((obs['status'], obs['score'], played))
+    return steps, time.perf_counter() - start, outcomes
+
+
+def run(games=200, seed=0, max_steps=200, capacity=4096, passes=2, size=None):
+    """Print the step throughput without the cache, then cold and warm with it"""
+    prolog = get_engine()
+    game = GameSession(prolog)
+    cache = DecisionCache(prolog, capacity=capacity)
+    seeds = range(seed, seed + games)
+
+    cache.disable()
+    steps, seconds, baseline = play(game, seeds, max_steps, size)
+    base_rate = steps / seconds
+    print(f"{games} games, cache of {capacity} entries")
+    print(f"{'cache':<8}{'steps/s':>12}{'speedup':>10}{'hit rate':>10}{'mismatch':>10}")
+    print(f"{'off':<8}{base_rate:>12.0f}{1.0:>9.2f}x{'-':>10}{0:>10}")
+
+    cache.enable()
+    for index in range(passes):
+        before = cache.stats()
+        steps, seconds, outcomes = play(game, seeds, max_steps, size)
+        after = cache.stats()
+        lookups = (after['hits'] + after['misses']) - (before['hits'] + before['misses'])
+        hit_rate = (after['hits'] - before['hits']) / lookups if lookups else 0.0
+        # a cached decision must play exactly like the heuristic
+        mismatches = sum(a != b for a, b in zip(outcomes, baseline))
+        name = 'cold' if index == 0 else f'warm {index}'
+        print(f"{name:<8}{steps / seconds:>12.0f}{steps / seconds / base_rate:>9.2f}x"
+              f"{hit_rate:>10.1%}{mismatches:>10}")
+    cache.disable()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Agent step throughput with and without the decision cache")
+    parser.add_argument('-games', dest='games', type=int, default=200)
+    parser.add_argument('-seed', dest='seed', type=int, default=0)
+    parser.add_argument('-steps', dest='steps', type=int, default=200)
+    parser.add_argument('-capacity', dest='capacity', type=int, default=4096)
+    parser.add_argument('-passes', dest='passes', type=int, default=2,
+                        help="runs over the same maps with the cache (first one cold).")
+    parser.add_argument('-cave', dest='cave', type=int, nargs=2, default=None,
+                        metavar=('WIDTH', 'HEIGHT'))
+    args = parser.parse_args()
+
+    run(args.games, args.seed, args.steps, args.capacity, args.passes, args.cave)
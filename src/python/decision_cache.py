@@ -0,0 +1,60 @@
+"""
+Decision cache control for the Prolog agent
+Enables the transposition table and reports its hit rate
+"""
+
+from bridge import predicate
+
+ENABLE = predicate('decision_cache_enable', 1)
+DISABLE = predicate('decision_cache_disable', 0)
+CLEAR = predicate('decision_cache_clear', 0)
+STATS = predicate('decision_cache_stats', 4)
+
+
+class DecisionCache:
+    """Python handle on the agent decision cache kept in Prolog"""
+
+    def __init__(self, prolog_engine, capacity=4096):
+        """
+        Initialize the decision cache handle
+
+        Args:
+            prolog_engine: Prolog engine with main.pl consulted
+            capacity: Maximum number of cached decisions (LRU)
+        """
+        self.prolog = prolog_engine
+        self.capacity = capacity
+
+    def enable(self):
+        """Enable the cache (drops previous entries and counters)"""
+        ENABLE.call(int(self.capacity))
+
+    def disable(self):
+        """Disable the cache"""
+        DISABLE.call()
+
+    def clear(self):
+        """Drop cached decisions and reset counters"""
+        CLEAR.call()
+
+    def stats(self):
+        """Get cache counters from Prolog"""
+        result = STATS.once()
+        if result is None:
+            return {'hits': 0, 'misses': 0, 'evictions': 0, 'size': 0,
+                    'hit_rate': 0.0}
+
+        stats = dict(zip(('hits', 'misses', 'evictions', 'size'), result))
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    def report(self):
+        """Human readable hit rate summary"""
+        stats = self.stats()
+        return (
+            'Decision cache: {hits} hits / {misses} misses '
+            '({rate:.1%} hit rate), {size}/{capacity} entries, '
+            '{evictions} evictions'.format(
+                rate=stats['hit_rate'], capacity=self.capacity, **stats)
+        )
@@ -0,0 +1,201 @@
+"""
+Prolog engine setup shared by the game front ends and workers
+The knowledge base is loaded from a precompiled main.qlf when it is up to
+date (rebuilt automatically when main.pl changes)
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+PROLOG_PATH = os.path.join(os.path.dirname(
+    __file__), os.pardir, 'prolog', 'main.pl')
+
+_engine = None  # process-wide engine, see get_engine()
+
+
+def qlf_path(path: str = PROLOG_PATH):
+    """Quick load file compiled from a Prolog source file."""
+    return os.path.splitext(path)[0] + '.qlf'
+
+
+def qlf_is_stale(path: str = PROLOG_PATH):
+    """The .qlf is missing or older than its source."""
+    qlf = qlf_path(path)
+    return (not os.path.exists(qlf)
+            or os.path.getmtime(qlf) < os.path.getmtime(path))
+
+
+def prolog_atom(text):
+    """Quote a string as a Prolog atom."""
+    return "'" + text.replace('\\', '/').replace("'", "\\'") + "'"
+
+
+def load_knowledge_base(prolog, path: str = PROLOG_PATH, precompiled=True):
+    """
+    Load the game knowledge base in an engine
+
+    Args:
+        prolog: Prolog engine
+        path: Prolog source file
+        precompiled: Load the .qlf, rebuilding it first if it is stale
+
+    Returns:
+        How it was loaded: 'source', 'qlf' or 'qlf-rebuilt'
+    """
+    if not precompiled:
+        prolog.consult(path)
+        return 'source'
+
+    source = os.path.abspath(path)
+    if not qlf_is_stale(source):
+        try:
+            list(prolog.query(f"load_files({prolog_atom(qlf_path(source))}, [])."))
+            return 'qlf'
+        except Exception:
+            # corrupt or built by another SWI-Prolog version
+            prolog.consult(path)
+            return 'source'
+
+    # several processes may start at once: each one compiles a private copy
+    # of the source and renames the result onto the .qlf, so no process
+    # ever loads a half-written file
+    directory = None
+    loaded = False
+    try:
+        directory = tempfile.mkdtemp(prefix='.qlf-', dir=os.path.dirname(source))
+        copy = os.path.join(directory, os.path.basename(source))
+        shutil.copyfile(source, copy)
+        # compiles the .qlf and loads the source in the same pass
+        list(prolog.query(f"qcompile({prolog_atom(copy)})."))
+        loaded = True
+        os.replace(qlf_path(copy), qlf_path(source))
+    except Exception:
+        # read-only checkout or failed compilation: the source still loads
+        if not loaded:
+            prolog.consult(path)
+        return 'source'
+    finally:
+        if directory:
+            shutil.rmtree(directory, ignore_errors=True)
+    return 'qlf-rebuilt'
+
+
+def create_engine(path: str = PROLOG_PATH, precompiled=True):
+    """Create a Prolog engine with the game knowledge base consulted."""
+    from pyswip import Prolog
+
+    prolog = Prolog()
+    load_knowledge_base(prolog, path, precompiled)
+    return prolog
+
+
+def get_engine():
+    """
+    Process-wide engine, created on first use
+
+    A worker forked after the engine was loaded (see fork_context) gets it
+    without loading the knowledge base again.
+    """
+    global _engine
+    if _engine is None:
+        precompiled = os.environ.get('WUMPUS_QLF', '1') != '0'
+        _engine = create_engine(precompiled=precompiled)
+    return _engine
+
+
+class LazyEngine:
+    """Stand-in for a Prolog engine, the real one is created on first use"""
+
+    def __getattr__(self, name):
+        return getattr(get_engine(), name)
+
+
+def fork_context():
+    """
+    multiprocessing context whose workers inherit the loaded engine
+
+    The knowledge base is loaded in this process before forking. The
+    SWI-Prolog garbage collector thread is stopped first: only the forking
+    thread survives a fork and the children would inherit a dead collector.
+    """
+    import multiprocessing
+
+    prolog = get_engine()
+    list(prolog.query("set_prolog_gc_thread(false)."))
+    return multiprocessing.get_context('fork')
+
+
+def measure_cold_start(precompiled=True):
+    """
+    Time a cold start in this process (must not have loaded pyswip yet)
+
+    Returns:
+        dict with 'import', 'consult', 'first_game' and 'total' seconds
+        and 'loaded' (see load_knowledge_base)
+    """
+    start = time.perf_counter()
+    from pyswip import Prolog
+    imported = time.perf_counter()
+
+    prolog = Prolog()
+    loaded = load_knowledge_base(prolog, precompiled=precompiled)
+    consulted = time.perf_counter()
+
+    list(prolog.query("run(pygame)."))
+    first_game = time.perf_counter()
+
+    return {
+        'loaded': loaded,
+        'import': imported - start,
+        'consult': consulted - imported,
+        'first_game': first_game - consulted,
+        'total': first_game - start,
+    }
+
+
+def cold_start_report(runs=3):
+    """Measure cold starts from source and from the .qlf in fresh interpreters"""
+    script = ('import json, sys, engine; '
+              'print(json.dumps(engine.measure_cold_start(sys.argv[1] == "1")))')
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    print(f"{'mode':<12}{'import':>10}{'consult':>10}{'first run':>11}{'total':>10}")
+    for precompiled in (False, True):
+        for _ in range(runs):
+            output = subprocess.run(
+                [sys.executable, '-c', script, '1' if precompiled else '0'],
+                cwd=here, capture_output=True, text=True, check=True,
+            ).stdout
+            timing = last_json_line(output)
+            print("{:<12}{:>9.1f}ms{:>9.1f}ms{:>10.1f}ms{:>9.1f}ms".format(
+                timing['loaded'], timing['import'] * 1000,
+                timing['consult'] * 1000, timing['first_game'] * 1000,
+                timing['total'] * 1000))
+
+
+def last_json_line(output):
+    """Last JSON line of a process output (the knowledge base may print)"""
+    return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Precompile the knowledge base and report cold start time")
+    parser.add_argument('-compile', dest='compile', action='store_true',
+                        help="only rebuild main.qlf.")
+    parser.add_argument('-runs', dest='runs', type=int, default=3)
+    args = parser.parse_args()
+
+    if args.compile:
+        if os.path.exists(qlf_path()):
+            os.remove(qlf_path())
+        create_engine()
+        print(f'compiled {os.path.normpath(qlf_path())}')
+    else:
+        cold_start_report(args.runs)
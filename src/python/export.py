@@ -0,0 +1,187 @@
+"""
+Offscreen GIF/MP4 export of games, faster than real time
+Renders a live agent game or a recorded action log (see action_log.py)
+"""
+
+import argparse
+import queue
+import threading
+import time
+
+import imageio
+import pygame
+
+import main
+from action_log import read_action_log
+from date import FPS
+from game_session import GameSession
+from renderer import OffscreenRenderer
+from viewport import CameraView
+
+
+class FrameEncoder(threading.Thread):
+    """Background thread encoding frames while the game keeps rendering"""
+
+    def __init__(self, path, fps=FPS, queue_size=64):
+        """
+        Initialize the encoder
+
+        Args:
+            path: Output file (.gif or .mp4)
+            fps: Frames per second of the output
+            queue_size: Max frames waiting to be encoded (caps memory,
+                rendering blocks when the queue is full)
+        """
+        super().__init__(daemon=True)
+        self.path = path
+        self.fps = fps
+        self.frames = queue.Queue(maxsize=queue_size)
+        self.encoded = 0
+        self.error = None
+
+    def open_writer(self):
+        """imageio writer for the output format"""
+        if self.path.lower().endswith('.gif'):
+            return imageio.get_writer(
+                self.path, mode='I', duration=1000 / self.fps, loop=0)
+        return imageio.get_writer(self.path, fps=self.fps, macro_block_size=1)
+
+    def run(self):
+        try:
+            with self.open_writer() as writer:
+                while True:
+                    frame = self.frames.get()
+                    if frame is None:
+                        break
+                    writer.append_data(frame)
+                    self.encoded += 1
+        except Exception as error:  # reported by close()
+            self.error = error
+            # keep draining so the renderer never blocks on a dead encoder
+            while self.frames.get() is not None:
+                pass
+
+    def put(self, surface):
+        """Queue a copy of a surface (blocks while the queue is full)"""
+        frame = pygame.surfarray.array3d(surface).swapaxes(0, 1)
+        self.frames.put(frame)
+
+    def close(self):
+        """Flush the queue and wait for the encoder"""
+        self.frames.put(None)
+        self.join()
+        if self.error:
+            raise self.error
+
+
+def export_game(path, log=None, seed=None, traditional=False, size=None,
+                max_steps=200, frames_per_step=6, frame_skip=1, end_frames=45,
+                queue_size=64):
+    """
+    Render a game offscreen and encode it to a GIF/MP4 file
+
+    Args:
+        path: Output file (.gif or .mp4)
+        log: Action log to replay (agent game if None)
+        seed: Map seed for agent games
+        traditional: Use the traditional map for agent games
+        size: (W, H) of a generated cave for agent games
+        max_steps: Stop after this many actions
+        frames_per_step: Frames rendered between two actions
+        frame_skip: Encode one frame out of frame_skip
+        end_frames: Frames rendered after the game ended
+        queue_size: Max frames waiting to be encoded
+
+    Returns:
+        dict with frame counts and rendering speed
+    """
+    actions = None
+    if log:
+        header, actions = read_action_log(log)
+        seed = header['seed']
+        traditional = header['map'] == 'traditional'
+        size = header.get('size')  # older logs: 4x4 maps only
+
+    # no window: frames are rendered on an offscreen surface
+    surface = OffscreenRenderer().surface
+    game = GameSession(main.prolog)
+    game.new_game(traditional=traditional, seed=seed, size=size)
+    if size:
+        view = CameraView(surface, prolog_engine=main.prolog,
+                          end_screen=main.draw_end_screen)
+    else:
+        view = main.GameView()
+
+    frame_skip = max(1, frame_skip)
+    encoder = FrameEncoder(path, fps=FPS / frame_skip, queue_size=queue_size)
+    encoder.start()
+
+    rendered = 0
+    start = time.perf_counter()
+
+    def render():
+        nonlocal rendered
+        view.update()  # animations advance on skipped frames too
+        if rendered % frame_skip == 0:
+            view.draw(surface)
+            view.draw_end(surface)
+            encoder.put(surface)
+        rendered += 1
+
+    steps = iter(actions) if actions is not None else None
+    for _ in range(max_steps):
+        for _ in range(frames_per_step):
+            render()
+        if game.observe()['status'] != 'playing':
+            break
+
+        if steps is None:
+            game.act('agent')
+        else:
+            action = next(steps, None)
+            if action is None:
+                break
+            game.act(*action)
+        view.turn_indicator.increment_turn()
+
+    for _ in range(end_frames):
+        render()
+
+    encoder.close()
+    elapsed = time.perf_counter() - start
+    return {
+        'frames': rendered,
+        'encoded': encoder.encoded,
+        'seconds': elapsed,
+        'speedup': (rendered / FPS) / elapsed if elapsed else 0.0,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Export a Wumpus World game to GIF/MP4 (offscreen)")
+    parser.add_argument('output', help="output file (.gif or .mp4).")
+    parser.add_argument('-log', dest='log', default=None, metavar='FILE',
+                        help="action log to replay (agent game by default).")
+    parser.add_argument('-seed', dest='seed', type=int, default=None)
+    parser.add_argument('-map', dest='t_map', action='store_true',
+                        help="agent game on the traditional map.")
+    parser.add_argument('-cave', dest='cave', type=int, nargs=2, default=None,
+                        metavar=('WIDTH', 'HEIGHT'),
+                        help="agent game on a generated WxH cave.")
+    parser.add_argument('-steps', dest='steps', type=int, default=200)
+    parser.add_argument('-frames-per-step', dest='frames_per_step',
+                        type=int, default=6)
+    parser.add_argument('-frame-skip', dest='frame_skip', type=int, default=1,
+                        help="encode one frame out of N.")
+    parser.add_argument('-queue', dest='queue', type=int, default=64,
+                        help="max frames waiting for the encoder.")
+    args = parser.parse_args()
+
+    stats = export_game(
+        args.output, log=args.log, seed=args.seed, traditional=args.t_map,
+        size=args.cave, max_steps=args.steps, frames_per_step=args.frames_per_step,
+        frame_skip=args.frame_skip, queue_size=args.queue,
+    )
+    print('{frames} frames rendered, {encoded} encoded in {seconds:.2f}s '
+          '({speedup:.1f}x real time)'.format(**stats))
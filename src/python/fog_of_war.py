@@ -5,6 +5,11 @@ Manages visibility and exploration
 
 import pygame
 
+from bitboard import Bitboard
+from bridge import predicate
+
+FOG_BOARDS = predicate('fog_boards', 2)
+
 
 class FogOfWar:
     """Fog of War system - limits player vision to nearby cells"""
@@ -22,6 +27,11 @@ class FogOfWar:
         self.cell_size = cell_size
         self.prolog = prolog_engine
         
+        # Fog bitboards (see fog_boards/2 in main.pl)
+        self.board = Bitboard(grid_size, grid_size)
+        self.revealed = self.board.inside
+        self.visible = self.board.inside
+        
         # Visual surfaces
         self.fog_surface = pygame.Surface((cell_size, cell_size))
         self.fog_surface.fill((0, 0, 0))
@@ -31,19 +41,20 @@ class FogOfWar:
         self.dim_surface.fill((0, 0, 0))
         self.dim_surface.set_alpha(120)  # Semi-dark (previously explored)
     
-    def is_visible(self, grid_x, grid_y):
-        """Check if cell is currently visible (from Prolog)"""
+    def refresh(self):
+        """Fetch the revealed/visible bitboards from Prolog (one query)"""
         if self.prolog:
-            result = list(self.prolog.query(f"is_visible({grid_x}, {grid_y})."))
-            return len(result) > 0
-        return True  # Fallback: show everything
+            result = FOG_BOARDS.once()
+            if result:
+                self.revealed, self.visible = result
+    
+    def is_visible(self, grid_x, grid_y):
+        """Check if cell is currently visible (last refreshed boards)"""
+        return self.board.has(self.visible, grid_x, grid_y)
     
     def is_revealed(self, grid_x, grid_y):
-        """Check if cell has been revealed at some point (from Prolog)"""
-        if self.prolog:
-            result = list(self.prolog.query(f"is_revealed({grid_x}, {grid_y})."))
-            return len(result) > 0
-        return True  # Fallback: show everything
+        """Check if cell has been revealed at some point (last refreshed boards)"""
+        return self.board.has(self.revealed, grid_x, grid_y)
     
     def draw(self, surface, positions):
         """
@@ -53,6 +64,7 @@ class FogOfWar:
             surface: pygame surface to draw on
             positions: 2D array of cell positions [(x, y), ...]
         """
+        self.refresh()
         for row in range(self.grid_size):
             for col in range(self.grid_size):
                 grid_x = col + 1  # Prolog uses 1-indexed
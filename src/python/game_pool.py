@@ -0,0 +1,182 @@
+"""
+Agent games played concurrently on Prolog threads inside one engine
+The game state is thread_local (see GAME THREADS in main.pl): the knowledge
+base is loaded once for all the games instead of once per process
+"""
+
+import argparse
+import itertools
+import os
+import time
+
+from bridge import predicate
+from engine import fork_context, get_engine
+from game_session import GameSession, world_goal
+
+GAME_POOL_START = predicate('game_pool_start', 1)
+GAME_POOL_STOP = predicate('game_pool_stop', 0)
+GAME_POOL_SUBMIT = predicate('game_pool_submit', 4)
+GAME_POOL_RESULT = predicate('game_pool_result', 5)
+
+
+class GamePool:
+    """Pool of Prolog threads playing submitted agent games"""
+
+    def __init__(self, threads=4):
+        """
+        Start the worker threads (one pool per engine)
+
+        Args:
+            threads: Number of Prolog threads
+        """
+        get_engine()
+        if not GAME_POOL_START.call(threads):
+            raise ValueError(f"Invalid number of threads: {threads}")
+        self.threads = threads
+        self.ids = itertools.count(1)
+        self.pending = set()
+
+    def submit(self, seed, max_steps=200, traditional=False, size=None):
+        """
+        Queue an agent game
+
+        Args:
+            seed: Map seed
+            max_steps: Agent steps before the game counts as unfinished
+            traditional: Play the traditional map
+            size: (W, H) to play a generated cave
+
+        Returns:
+            Game id, see result
+        """
+        game_id = next(self.ids)
+        GAME_POOL_SUBMIT.call(game_id, seed, world_goal(traditional, size), max_steps)
+        self.pending.add(game_id)
+        return game_id
+
+    def result(self, game_id=None):
+        """
+        Wait for a game to finish
+
+        Args:
+            game_id: Game to wait for (None for the next finished one)
+
+        Returns:
+            (game id, dict with status, cause, score and steps). A game
+            that raised has status 'error' and the exception as cause
+        """
+        game_id, status, cause, score, steps = GAME_POOL_RESULT.once(game_id)
+        self.pending.discard(game_id)
+        return game_id, {
+            'status': status, 'cause': cause, 'score': score, 'steps': steps,
+        }
+
+    def as_completed(self):
+        """Results of all the pending games, in completion order"""
+        while self.pending:
+            yield self.result()
+
+    def map(self, seeds, max_steps=200, traditional=False, size=None):
+        """Play one game per seed, results in seed order (failed games included)"""
+        ids = [self.submit(seed, max_steps, traditional, size) for seed in seeds]
+        results = dict(self.as_completed())
+        return [results[game_id] for game_id in ids]
+
+    def close(self):
+        """Finish the queued games and stop the threads"""
+        GAME_POOL_STOP.call()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def memory_kb(pid='self'):
+    """
+    Proportional set size of a process in kB (shared pages are split
+    between the processes sharing them), resident size if not available
+    """
+    for path, field in ((f'/proc/{pid}/smaps_rollup', 'Pss:'),
+                        (f'/proc/{pid}/status', 'VmRSS:')):
+        try:
+            with open(path) as file:
+                for line in file:
+                    if line.startswith(field):
+                        return int(line.split()[1])
+        except OSError:
+            continue
+    return 0
+
+
+def play_process(task):
+    """Process pool worker: one agent game in this process's engine"""
+    seed, max_steps = task
+    game = GameSession(get_engine())
+    obs = game.new_game(seed=seed)
+    steps = 0
+    while obs['status'] == 'playing' and steps < max_steps:
+        obs = game.act('agent')
+        steps += 1
+    return os.getpid(), memory_kb(), obs['score']
+
+
+def compare(games=200, workers=4, max_steps=200, seed=0):
+    """
+    Throughput and memory of the same games on processes and on threads
+
+    Returns:
+        dict mode -> {'games_per_sec', 'memory_mb'}
+    """
+    seeds = list(range(seed, seed + games))
+    report = {}
+
+    # processes first: forking after Prolog threads ran is not safe
+    context = fork_context()
+    start = time.perf_counter()
+    worker_memory = {}
+    with context.Pool(workers) as pool:
+        for pid, memory, _ in pool.imap_unordered(
+                play_process, [(s, max_steps) for s in seeds], chunksize=4):
+            worker_memory[pid] = max(memory, worker_memory.get(pid, 0))
+    elapsed = time.perf_counter() - start
+    report['processes'] = {
+        'games_per_sec': games / elapsed,
+        'memory_mb': (memory_kb() + sum(worker_memory.values())) / 1024,
+    }
+
+    start = time.perf_counter()
+    with GamePool(workers) as pool:
+        results = pool.map(seeds, max_steps)
+        memory = memory_kb()  # threads still alive
+    elapsed = time.perf_counter() - start
+    report['threads'] = {
+        'games_per_sec': games / elapsed,
+        'memory_mb': memory / 1024,
+    }
+    failed = [(seed, result['cause']) for seed, result in zip(seeds, results)
+              if result['status'] == 'error']
+    if failed:
+        seed, cause = failed[0]
+        print(f"{len(failed)} thread games failed (seed {seed}: {cause})")
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Games on Prolog threads vs one engine process per worker")
+    parser.add_argument('-games', dest='games', type=int, default=200)
+    parser.add_argument('-workers', dest='workers', type=int,
+                        default=os.cpu_count() or 4,
+                        help="worker processes / Prolog threads.")
+    parser.add_argument('-steps', dest='steps', type=int, default=200)
+    parser.add_argument('-seed', dest='seed', type=int, default=0)
+    args = parser.parse_args()
+
+    report = compare(args.games, args.workers, args.steps, args.seed)
+    print(f"{args.games} games, {args.workers} workers")
+    print(f"{'mode':<12}{'games/s':>10}{'memory':>12}")
+    for mode, stats in report.items():
+        print("{:<12}{:>10.1f}{:>9.1f} MB".format(
+            mode, stats['games_per_sec'], stats['memory_mb']))
@@ -0,0 +1,207 @@
+"""
+Headless game session on top of the Prolog turn API
+Used by the server, workers and batch tools (no pygame involved)
+"""
+
+import time
+
+import metrics
+from bridge import Compound, PreparedQuery, predicate
+
+SET_RANDOM = predicate('set_random', 1)
+RUN = predicate('run', 1)
+AGENT_TURN = predicate('agent_turn', 0)
+PLAYER_TURN = predicate('player_turn', 1)
+OBSERVATION = predicate('observation', 11)
+GAME_STATUS = predicate('game_status', 2)
+BOARD_STATE = predicate('board_state', 8)
+GAME_SAVE = predicate('game_save', 1)
+GAME_LOAD = predicate('game_load', 1)
+GAME_DROP = predicate('game_drop', 1)
+LAST_ACTION = predicate('a_last_action', 1)
+PLAY_SCRIPT = predicate('play_script', 3)
+METRICS_ENABLE = predicate('metrics_enable', 0)
+METRICS_COLLECT = predicate('metrics_collect', 3)
+
+
+def world_goal(traditional=False, size=None):
+    """Argument of run/1 creating a random, traditional or size=(W, H) map"""
+    if size:
+        width, height = size
+        return Compound('pygameCave', int(width), int(height))
+    return 'pygameMap' if traditional else 'pygame'
+
+
+class GameSession:
+    """One game driven through player_turn/1, agent_turn/0 and observation/11"""
+
+    # Player actions (same rules as the pygame user controller) + agent step
+    ACTIONS = (
+        'move', 'left', 'right', 'shoot', 'grab',
+        'collect', 'throw', 'wait', 'agent'
+    )
+
+    def __init__(self, prolog_engine):
+        """
+        Initialize the game session
+
+        Args:
+            prolog_engine: Prolog engine with main.pl consulted
+        """
+        self.prolog = prolog_engine
+        self.turn = 0
+        if metrics.METRICS:
+            METRICS_ENABLE.call()
+
+    def new_game(self, traditional=False, seed=None, size=None):
+        """Start a new game (random, traditional or size=(W, H) cave) and observe it"""
+        if seed is not None:
+            SET_RANDOM.call(Compound('seed', int(seed)))
+
+        RUN.call(world_goal(traditional, size))
+        if metrics.METRICS:
+            metrics.METRICS.games_started.inc()
+
+        self.turn = 0
+        return self.observe()
+
+    def act(self, action, target=None):
+        """Play one turn and return the new observation"""
+        if action not in self.ACTIONS:
+            raise ValueError(f"Unknown action: {action}")
+
+        seconds = None
+        if action == 'agent':
+            start = time.perf_counter()
+            AGENT_TURN.call()
+            seconds = time.perf_counter() - start
+        elif action == 'throw':
+            if not target:
+                raise ValueError("Action 'throw' needs a target cell")
+            tx, ty = target
+            PLAYER_TURN.call(Compound('throw', int(tx), int(ty)))
+        else:
+            PLAYER_TURN.call(action)
+
+        self.turn += 1
+        if metrics.METRICS:
+            self.record_metrics(action, seconds)
+        return self.observe()
+
+    def record_metrics(self, action, seconds=None):
+        """Feed the metrics registry (metrics.enable) after a turn"""
+        samples, facts, ended = METRICS_COLLECT.once()
+        metrics.METRICS.record_turn(
+            action, seconds, samples, facts, ended, PreparedQuery.calls)
+
+    def observe(self):
+        """Current observation as a plain dict"""
+        obs = OBSERVATION.once()
+        if obs is None:
+            raise RuntimeError("No game running")
+
+        (x, y, facing, sensors, score, arrows, rocks,
+         goal, status, cause, stunned) = obs
+        stench, breeze, glitter = sensors
+        return {
+            'x': x,
+            'y': y,
+            'facing': facing,
+            'stench': stench,
+            'breeze': breeze,
+            'glitter': glitter,
+            'score': score,
+            'arrows': arrows,
+            'rocks': rocks,
+            'goal': goal,
+            'status': status,
+            'cause': None if cause == 'none' else cause,
+            'stunned': bool(stunned),
+        }
+
+    def play_script(self, actions):
+        """
+        Play many turns in one Prolog call (play_script/3), stops at the end
+        of the game
+
+        Args:
+            actions: Actions, or (action, target) pairs as in action logs
+
+        Returns:
+            One dict per played turn: pose, sensors, reward (score delta),
+            status and cause
+        """
+        script = []
+        for action in actions:
+            action, target = (action, None) if isinstance(action, str) else action
+            if action not in self.ACTIONS:
+                raise ValueError(f"Unknown action: {action}")
+            if action == 'throw':
+                if not target:
+                    raise ValueError("Action 'throw' needs a target cell")
+                tx, ty = target
+                script.append(Compound('throw', int(tx), int(ty)))
+            else:
+                script.append(action)
+
+        _, steps, _ = PLAY_SCRIPT.once(script)
+        self.turn += len(steps)
+        if metrics.METRICS:
+            for action in script[:len(steps)]:
+                if action == 'agent':
+                    metrics.METRICS.agent_steps.inc()
+            self.record_metrics(None)
+        return [
+            {
+                'x': x,
+                'y': y,
+                'facing': facing,
+                'stench': sensors[0],
+                'breeze': sensors[1],
+                'glitter': sensors[2],
+                'reward': delta,
+                'status': status,
+                'cause': None if cause == 'none' else cause,
+            }
+            for x, y, facing, sensors, delta, status, cause in steps
+        ]
+
+    def agent_action(self):
+        """Action chosen by the last agent turn (None if it played none)"""
+        return LAST_ACTION.value()
+
+    def status(self):
+        """Game status ('playing', 'won' or 'lost') and cause of death"""
+        status, cause = GAME_STATUS.once()
+        return status, None if cause == 'none' else cause
+
+    def board(self):
+        """Whole board state (no fog) as a plain dict of lists"""
+        state = BOARD_STATE.once()
+        if state is None:
+            raise RuntimeError("No game running")
+
+        hunter, wumpus, gold, pits, chests, rocks, score, status = state
+        return {
+            'hunter': tuple(hunter),
+            'wumpus': tuple(wumpus),
+            'gold': tuple(gold),
+            'pits': tuple(tuple(pit) for pit in pits),
+            'chests': tuple(tuple(chest) for chest in chests),
+            'rocks': tuple(tuple(rock) for rock in rocks),
+            'score': score,
+            'status': status,
+        }
+
+    def save(self, game_id):
+        """Save the running game inside the engine under game_id"""
+        GAME_SAVE.call(game_id)
+
+    def load(self, game_id):
+        """Make a saved game the running one"""
+        if not GAME_LOAD.call(game_id):
+            raise KeyError(f"Unknown game: {game_id}")
+
+    def drop(self, game_id):
+        """Forget a saved game"""
+        GAME_DROP.call(game_id)
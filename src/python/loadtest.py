@@ -0,0 +1,108 @@
+"""
+Load test client for the game server
+Reports actions/sec and latency percentiles
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+
+ACTIONS = ('move', 'move', 'left', 'right', 'grab', 'collect', 'agent')
+
+
+def percentile(values, q):
+    """q-th percentile (0-100) of a list, nearest rank"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+async def client(args, index, latencies, counters):
+    """One client: plays games with random actions until its quota is done"""
+    if args.unix:
+        reader, writer = await asyncio.open_unix_connection(args.unix)
+    else:
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+    rng = random.Random(args.seed + index)
+
+    async def call(message):
+        start = time.perf_counter()
+        writer.write(json.dumps(message).encode() + b'\n')
+        await writer.drain()
+        reply = json.loads(await reader.readline())
+        latencies.append(time.perf_counter() - start)
+        if not reply['ok']:
+            counters['busy' if reply['error'] == 'busy' else 'errors'] += 1
+        return reply
+
+    session = None
+    done = 0
+    while done < args.actions:
+        if session is None:
+            reply = await call({'op': 'new_game', 'seed': rng.randrange(1 << 30)})
+            if not reply['ok']:
+                await asyncio.sleep(0.01)
+                continue
+            session = reply['session']
+            counters['games'] += 1
+
+        reply = await call({
+            'op': 'action', 'session': session, 'action': rng.choice(ACTIONS)
+        })
+        if not reply['ok']:
+            if reply['error'] == 'busy':
+                await asyncio.sleep(0.01)
+            else:
+                session = None
+            continue
+
+        done += 1
+        counters['actions'] += 1
+        if reply['observation']['status'] != 'playing':
+            await call({'op': 'close', 'session': session})
+            session = None
+
+    if session is not None:
+        await call({'op': 'close', 'session': session})
+    writer.close()
+
+
+async def run(args):
+    """Run all clients concurrently and print the report"""
+    latencies = []
+    counters = {'actions': 0, 'games': 0, 'busy': 0, 'errors': 0}
+
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        client(args, i, latencies, counters) for i in range(args.clients)
+    ))
+    elapsed = time.perf_counter() - start
+
+    print(f"clients: {args.clients}  games: {counters['games']}  "
+          f"actions: {counters['actions']}  elapsed: {elapsed:.2f}s")
+    print(f"throughput: {counters['actions'] / elapsed:.1f} actions/sec")
+    print("latency: p50 {:.2f} ms  p99 {:.2f} ms  max {:.2f} ms".format(
+        percentile(latencies, 50) * 1000,
+        percentile(latencies, 99) * 1000,
+        max(latencies, default=0.0) * 1000,
+    ))
+    print(f"busy replies: {counters['busy']}  errors: {counters['errors']}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Load test for the Wumpus World game server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', default=None, metavar='PATH')
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--actions', type=int, default=200,
+                        help="actions per client.")
+    parser.add_argument('--seed', type=int, default=0)
+
+    asyncio.run(run(parser.parse_args()))
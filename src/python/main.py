@@ -1,35 +1,56 @@
+import os
 import sys
+import json
+import atexit
 import pygame
 import argparse
 import math
+import random
+import time
 
-from pyswip import Prolog
+import date  # sprites are loaded on first use (date.MAP, date.GOLD, ...)
 from utils import rotate
-from date import (
-    PROLOG_PATH, FPS, WIN, FONT,
-    MAP, LIGHT, WIDTH, HEIGHT, POSITIONS,
-    HUNTER_IDLE, HUNTER_MOVE, HUNTER_SHOOT,
-    WUMPUS_IDLE, WUMPUS_BLOOD, GOLD, PIT,
-    W_BS, W_BREEZE, W_STENCH, W_GOLD, EXIT
-)
+from date import FPS, FONT, POSITIONS
 
 # Import new UI components
 from fog_of_war import FogOfWar
 from ui_components import InventoryDisplay, RockAimingOverlay, TurnIndicator
-
-prolog = Prolog()
-prolog.consult(PROLOG_PATH)
+from decision_cache import DecisionCache
+from game_session import GameSession
+from action_log import ActionLog
+from viewport import CameraView
+from trajectory import TrajectoryRecorder
+from renderer import RENDERERS, create_renderer
+import metrics
+from tuner import set_agent_params
+from engine import LazyEngine
+from bridge import predicate
+
+prolog = LazyEngine()  # knowledge base loaded on the first query
+
+W_HUNTER = predicate('w_hunter', 3)
+W_WUMPUS = predicate('w_wumpus', 2)
+W_GOLD_AT = predicate('w_gold', 2)
+W_PIT = predicate('w_pit', 2)
+CHEST = predicate('chest', 4)
+CHEST_OPENED = predicate('chest_opened', 1)
+ROCK_PICKUP = predicate('rock_pickup', 2)
+H_SCORE = predicate('h_score', 1)
+GAME_STATUS = predicate('game_status', 2)
+GET_SENSORS = predicate('getSensors', 1)
+IS_PLAYER_STUNNED = predicate('is_player_stunned', 0)
 
 
 class element:
     """class to save element position and draw it"""
 
     def __init__(self, y, x):
+        self.cell = (y, x)  # grid (X, Y) as stored in prolog
         self.x, self.y = POSITIONS[x-1][y-1]
 
-    def draw(self):
+    def draw(self, surface):
         self.rect = self.image.get_rect(center=(self.x, self.y))
-        WIN.blit(self.image, self.rect)
+        surface.blit(self.image, self.rect)
 
 
 class Light():
@@ -37,8 +58,8 @@ class Light():
 
     def __init__(self):
         self.x, self.y = 0, 0
-        self.image = LIGHT
-        self.filter = pygame.surface.Surface((WIDTH, HEIGHT))
+        self.image = date.LIGHT
+        self.filter = pygame.surface.Surface((date.WIDTH, date.HEIGHT))
         self.filter.fill(pygame.color.Color('white'))
         self.visited = []
 
@@ -52,9 +73,9 @@ class Light():
         else:
             self.rect = pygame.Rect(-999, -999, 0, 0)
 
-    def draw(self):
+    def draw(self, surface):
         self.filter.blit(self.image, self.rect)
-        WIN.blit(self.filter, (0, 0), special_flags=pygame.BLEND_RGBA_SUB)
+        surface.blit(self.filter, (0, 0), special_flags=pygame.BLEND_RGBA_SUB)
 
 
 class Hunter(element, pygame.sprite.Sprite):
@@ -65,9 +86,9 @@ class Hunter(element, pygame.sprite.Sprite):
         pygame.sprite.Sprite.__init__(self)
         self.rotation = orientation
         self.sprites = {
-            'idle': HUNTER_IDLE,
-            'move': HUNTER_MOVE,
-            'shoot': HUNTER_SHOOT
+            'idle': date.HUNTER_IDLE,
+            'move': date.HUNTER_MOVE,
+            'shoot': date.HUNTER_SHOOT
         }
         self.anim_speed = 1
         self.current_sprite = 0
@@ -93,8 +114,7 @@ class Hunter(element, pygame.sprite.Sprite):
             self.current_sprite = 0
         self.image = self.sprites[self.current_state][int(self.current_sprite)]
 
-        new_pos = list(prolog.query("w_hunter( X, Y, Z)."))[0].values()
-        self.move(*new_pos)
+        self.move(*W_HUNTER.once())
 
 
 class Wumpus(element, pygame.sprite.Sprite):
@@ -104,8 +124,8 @@ class Wumpus(element, pygame.sprite.Sprite):
         element.__init__(self, x, y)
         pygame.sprite.Sprite.__init__(self)
         self.sprites = {
-            'idle': WUMPUS_IDLE,
-            'died': WUMPUS_BLOOD
+            'idle': date.WUMPUS_IDLE,
+            'died': date.WUMPUS_BLOOD
         }
         self.anim_speed = 1
         self.current_sprite = 0
@@ -116,7 +136,7 @@ class Wumpus(element, pygame.sprite.Sprite):
         self.rect.center = (self.x, self.y)
 
     def update(self):
-        if not list(prolog.query('w_wumpus(X,Y).')) and self.x != self.y != -999:
+        if not W_WUMPUS.exists() and self.x != self.y != -999:
             self.x, self.y = (-999, -999)
 
         self.current_sprite += self.anim_speed
@@ -133,7 +153,7 @@ class Pit(element, pygame.sprite.Sprite):
 
     def __init__(self, x, y):
         super().__init__(x, y)
-        self.image = PIT
+        self.image = date.PIT
 
 
 class Gold(element, pygame.sprite.Sprite):
@@ -141,18 +161,18 @@ class Gold(element, pygame.sprite.Sprite):
 
     def __init__(self, x, y):
         super().__init__(x, y)
-        self.image = GOLD
+        self.image = date.GOLD
 
     def update(self):
-        if list(prolog.query('w_gold(0,0).')) and self.x != self.y != -999:
+        if W_GOLD_AT.exists(0, 0) and self.x != self.y != -999:
             self.x, self.y = (-999, -999)
 
-    def draw(self):
+    def draw(self, surface):
         self.rect = self.image.get_rect(center=(self.x, self.y))
-        WIN.blit(self.image, self.rect)
+        surface.blit(self.image, self.rect)
 
         if self.x == self.y == -999:
-            WIN.blit(EXIT, (0, 0))
+            surface.blit(date.EXIT, (0, 0))
 
 
 class TreasureChest(element, pygame.sprite.Sprite):
@@ -164,8 +184,7 @@ class TreasureChest(element, pygame.sprite.Sprite):
         self.opened = False
         
         # Get type from Prolog
-        chest_info = list(prolog.query(f"chest({chest_id}, _, _, Type)."))
-        self.is_mimic = chest_info[0]['Type'] == 'mimic' if chest_info else False
+        self.is_mimic = CHEST.value(chest_id) == 'mimic'
         
         # Animation
         self.shake_timer = 0
@@ -202,8 +221,7 @@ class TreasureChest(element, pygame.sprite.Sprite):
     def update(self):
         """Update chest (shake for mimics)"""
         # Check if opened
-        opened_result = list(prolog.query(f"chest_opened({self.chest_id})."))
-        self.opened = len(opened_result) > 0
+        self.opened = CHEST_OPENED.exists(self.chest_id)
         
         if not self.opened and self.is_mimic:
             self.shake_timer += 0.1
@@ -212,17 +230,18 @@ class TreasureChest(element, pygame.sprite.Sprite):
             self.shake_offset = 0
         
         # Update position from Prolog (mimics can move)
-        chest_info = list(prolog.query(f"chest({self.chest_id}, X, Y, _)."))
+        chest_info = CHEST.once(self.chest_id)
         if chest_info:
-            new_x, new_y = chest_info[0]['X'], chest_info[0]['Y']
-            self.x, self.y = POSITIONS[new_x-1][new_y-1]
+            _, new_x, new_y, _ = chest_info
+            self.cell = (new_x, new_y)
+            self.x, self.y = POSITIONS[new_y-1][new_x-1]
             self.x += self.shake_offset
         
         self.create_chest_image()
     
-    def draw(self):
+    def draw(self, surface):
         self.rect = self.image.get_rect(center=(self.x, self.y))
-        WIN.blit(self.image, self.rect)
+        surface.blit(self.image, self.rect)
 
 
 class RockPickup(element, pygame.sprite.Sprite):
@@ -242,102 +261,83 @@ class RockPickup(element, pygame.sprite.Sprite):
     def update(self):
         """Check if collected"""
         # Check if still exists in Prolog
-        px = (self.x - POSITIONS[0][0][0]) // 147 + 1  # Convert back to grid
-        py = (self.y - POSITIONS[0][0][1]) // 147 + 1
+        px, py = self.cell
         
-        result = list(prolog.query(f"rock_pickup({px}, {py})."))
-        if not result:
+        if not ROCK_PICKUP.exists(px, py):
             self.collected = True
             self.x, self.y = (-999, -999)
 
 
-def valid_move(hunter_obj):
-    """avoid moving hunter into the wall before prolog do it"""
-    facing = hunter_obj.rotation
-    x, y = hunter_obj.x, hunter_obj.y
+def draw_text_screen(surface, text, score):
+    """draw an end of game message with the final score"""
+    font = pygame.font.Font(FONT, 30)
+    text_surface = font.render(text, True, pygame.color.Color('white'))
+    text_rect = text_surface.get_rect()
+    width, height = surface.get_size()
+    text_rect.center = (width/2, height/3)
+    surface.blit(text_surface, text_rect)
+
+    text = 'Your score: {} point(s).'.format(score)
+    text_surface = font.render(text, True, pygame.color.Color('white'))
+    text_rect = text_surface.get_rect()
+    text_rect.center = (width/2, height/3 + 40)
+    surface.blit(text_surface, text_rect)
+
+
+def draw_winner(surface):
+    """draw the winner message (without waiting)"""
+    score = H_SCORE.value()
+    draw_text_screen(
+        surface, 'WINNER: You managed to get the gold out!', score)
+
 
-    if (
-        (facing == 'right' and x == 695) or
-        (facing == 'left' and x == 107) or
-        (facing == 'up' and y == 107) or
-        (facing == 'down' and y == 670)
-    ):
+def draw_game_over(surface):
+    """draw the game over message if the hunter died, return if it did"""
+    status, cause = GAME_STATUS.once()
+    if status != 'lost':
         return False
-    return True
 
+    score = H_SCORE.value()
+    if cause == 'wumpus':
+        text = 'GAME OVER: Wumpus killed you!'
+    else:
+        text = 'GAME OVER: You fell into a pit!'
+    draw_text_screen(surface, text, score)
+    return True
 
-def winner():
-    """function to draw the winner screen"""
-    text = 'WINNER: You managed to get the gold out!'
 
-    font = pygame.font.Font(FONT, 30)
+def draw_restart_hint(surface):
+    """draw the restart/quit hint below the end of game message"""
+    font = pygame.font.Font(FONT, 20)
+    text = 'Press R to play again or ESC to quit.'
     text_surface = font.render(text, True, pygame.color.Color('white'))
     text_rect = text_surface.get_rect()
-    text_rect.center = (WIDTH/2, HEIGHT/3)
-    WIN.blit(text_surface, text_rect)
+    text_rect.center = (surface.get_width()/2, surface.get_height()/3 + 90)
+    surface.blit(text_surface, text_rect)
 
-    score = list(prolog.query("h_score(X)"))[0]['X']
-    text = 'Your score: {} point(s).'.format(score)
-    text_surface = font.render(text, True, pygame.color.Color('white'))
-    text_rect = text_surface.get_rect()
-    text_rect.center = (WIDTH/2, HEIGHT/3 + 40)
-    WIN.blit(text_surface, text_rect)
 
-    pygame.display.update()
-    while True:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                sys.exit()
-
-
-def game_over():
-    """function to draw the game over screen"""
-    hunter_pos = list(list(prolog.query("w_hunter(X,Y,_)."))[0].values())
-    query_params = f'({hunter_pos[0]},{hunter_pos[1]})'
-    wumpus_hit = list(prolog.query(f'w_wumpus{query_params}.')) == [{}]
-    pit_fall = list(prolog.query(f'w_pit{query_params}.')) == [{}]
-
-    if wumpus_hit or pit_fall:
-        score = list(prolog.query("h_score(X)"))[0]['X']
-        if wumpus_hit:
-            text = 'GAME OVER: Wumpus killed you!'
-        elif pit_fall:
-            text = 'GAME OVER: You fell into a pit!'
-
-        font = pygame.font.Font(FONT, 30)
-        text_surface = font.render(text, True, pygame.color.Color('white'))
-        text_rect = text_surface.get_rect()
-        text_rect.center = (WIDTH/2, HEIGHT/3)
-        WIN.blit(text_surface, text_rect)
-
-        text = 'Your score: {} point(s).'.format(score)
-        text_surface = font.render(text, True, pygame.color.Color('white'))
-        text_rect = text_surface.get_rect()
-        text_rect.center = (WIDTH/2, HEIGHT/3 + 40)
-        WIN.blit(text_surface, text_rect)
-
-        pygame.display.update()
-        while True:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    sys.exit()
+def draw_end_screen(surface):
+    """draw the win/lose message if the game is over, return if it is"""
+    if draw_game_over(surface):
+        return True
+    if GAME_STATUS.exists('won'):
+        draw_winner(surface)
+        return True
+    return False
 
 
-def update_elems(hunter_obj):
-    """update and draw the game elements"""
+def update_elems(surface, hunter_obj):
+    """draw the hunter perceptions"""
     x, y = hunter_obj.x + 20, hunter_obj.y - 75
-    sensors = list(prolog.query("getSensors(X)."))[0]['X']
-    stench, breeze, glitter = sensors
+    stench, breeze, glitter = GET_SENSORS.value()
     if glitter:
-        WIN.blit(W_GOLD, (x, y))
+        surface.blit(date.W_GOLD, (x, y))
     elif stench and breeze:
-        WIN.blit(W_BS, (x, y))
+        surface.blit(date.W_BS, (x, y))
     elif stench:
-        WIN.blit(W_STENCH, (x, y))
+        surface.blit(date.W_STENCH, (x, y))
     elif breeze:
-        WIN.blit(W_BREEZE, (x, y))
-
-    game_over()  # game's over?
+        surface.blit(date.W_BREEZE, (x, y))
 
 
 def update_objects(light, sprites, *elems):
@@ -347,22 +347,79 @@ def update_objects(light, sprites, *elems):
     light.update(sprites.sprites()[0])
 
 
-def draw_window(light, sprites, *elems):
-    """update the window"""
-    WIN.blit(MAP, (0, 0))
-    [el.draw() for el in elems]
-    sprites.draw(WIN)
-    light.draw()
-    update_elems(sprites.sprites()[0])
-    pygame.display.update()
+def draw_window(surface, light, sprites, *elems):
+    """draw the board, the elements and the hunter perceptions"""
+    surface.blit(date.MAP, (0, 0))
+    [el.draw(surface) for el in elems]
+    sprites.draw(surface)
+    light.draw(surface)
+    update_elems(surface, sprites.sprites()[0])
+
+
+class GameView:
+    """all the drawable objects of the game currently loaded in prolog"""
+
+    def __init__(self):
+        self.hunter = Hunter(*W_HUNTER.once())
+        self.wumpus = Wumpus(*W_WUMPUS.once())
+        self.light = Light()
+
+        self.moving_sprites = pygame.sprite.Group()
+        self.moving_sprites.add(self.hunter)
+        self.moving_sprites.add(self.wumpus)
+
+        self.gold = Gold(*W_GOLD_AT.once())
+        self.pits = [Pit(x, y) for x, y in W_PIT.all()]
+
+        self.chests = [
+            TreasureChest(chest_id, x, y) for chest_id, x, y, _ in CHEST.all()
+        ]
+        self.rocks = [RockPickup(x, y) for x, y in ROCK_PICKUP.all()]
 
+        self.fog_of_war = FogOfWar(grid_size=4, cell_size=147, prolog_engine=prolog)
+        self.inventory_ui = InventoryDisplay(FONT, prolog_engine=prolog)
+        self.rock_aiming_ui = RockAimingOverlay(POSITIONS, cell_size=147, prolog_engine=prolog, font_path=FONT)
+        self.turn_indicator = TurnIndicator(FONT, prolog_engine=prolog)
 
-def user_controller(event, hunter, rock_aiming=None, turn_indicator=None):
-    """user bindings to control the hunter"""
+    def update(self):
+        """update all the objects from prolog"""
+        update_objects(self.light, self.moving_sprites, *self.pits, self.gold)
+        for chest in self.chests:
+            chest.update()
+        for rock in self.rocks:
+            rock.update()
+
+    def draw(self, surface):
+        """draw a full frame (the display is not updated)"""
+        draw_window(surface, self.light, self.moving_sprites, *self.pits, self.gold)
+
+        for chest in self.chests:
+            chest.draw(surface)
+        for rock in self.rocks:
+            if not rock.collected:
+                rock.draw(surface)
+
+        self.fog_of_war.draw(surface, POSITIONS)
+
+        self.inventory_ui.draw(surface, position=(10, 10))
+        self.turn_indicator.draw(surface, position=(10, 650))
+        self.rock_aiming_ui.draw(surface, None)  # font parameter not used
+
+    def draw_end(self, surface):
+        """draw the win/lose message if the game is over, return if it is"""
+        return draw_end_screen(surface)
+
+    def handle_key(self, event):
+        """view keys (none on the fixed board), returns if the key was used"""
+        return False
+
+
+def user_controller(event, rock_aiming=None):
+    """user bindings to control the hunter, returns the action to play"""
     # Check if player is stunned
-    if list(prolog.query("is_player_stunned.")):
+    if IS_PLAYER_STUNNED.exists():
         print("⚠️ You are stunned! Cannot act this turn.")
-        return
+        return 'wait', None
     
     # Rock throwing mode
     if rock_aiming and rock_aiming.aiming:
@@ -375,158 +432,268 @@ def user_controller(event, hunter, rock_aiming=None, turn_indicator=None):
         elif event.key == pygame.K_DOWN:
             rock_aiming.cycle_target(4)   # Move down in grid
         elif event.key == pygame.K_SPACE:
-            if rock_aiming.confirm_throw():
-                # Process environment turn after throw
-                list(prolog.query("process_environment_turn."))
-                if turn_indicator:
-                    turn_indicator.increment_turn()
+            target = rock_aiming.selected_target
+            rock_aiming.cancel()
+            if target:
+                return 'throw', target
         elif event.key == pygame.K_ESCAPE:
             rock_aiming.cancel()
-        return
+        return None, None
     
     # Normal movement
-    if event.key == pygame.K_UP and valid_move(hunter):
-        list(prolog.query("move."))
-        list(prolog.query("process_environment_turn."))
-        if turn_indicator:
-            turn_indicator.increment_turn()
-    if event.key == pygame.K_LEFT:
-        list(prolog.query("left."))
-        list(prolog.query("process_environment_turn."))
-        if turn_indicator:
-            turn_indicator.increment_turn()
-    if event.key == pygame.K_RIGHT:
-        list(prolog.query("right."))
-        list(prolog.query("process_environment_turn."))
-        if turn_indicator:
-            turn_indicator.increment_turn()
-    if event.key == pygame.K_s:
-        list(prolog.query("shoot."))
-        list(prolog.query("process_environment_turn."))
-        if turn_indicator:
-            turn_indicator.increment_turn()
-    if event.key == pygame.K_g:
-        # Try to grab gold or open chest
-        hunter_pos = list(prolog.query("w_hunter(X,Y,_)."))[0]
-        hx, hy = hunter_pos['X'], hunter_pos['Y']
-        
-        # Check for chest at this position
-        chest_result = list(prolog.query(f"chest(_, {hx}, {hy}, _)."))
-        if chest_result:
-            list(prolog.query("open_chest."))
-        elif list(prolog.query('w_hunter(X,Y,_), w_gold(X,Y), w_goal(0).')):
-            list(prolog.query("grab(0)."))
-        
-        list(prolog.query("process_environment_turn."))
-        if turn_indicator:
-            turn_indicator.increment_turn()
-    if event.key == pygame.K_c:
-        # Try to collect rock
-        list(prolog.query("collect_rock."))
-        
-        # Climb if at exit
-        if list(prolog.query('w_hunter(1,1,_), w_goal(1).')):
-            list(prolog.query("climb(1)."))
-            winner()
+    keys = {
+        pygame.K_UP: 'move',
+        pygame.K_LEFT: 'left',
+        pygame.K_RIGHT: 'right',
+        pygame.K_s: 'shoot',
+        pygame.K_g: 'grab',     # grab gold or open chest
+        pygame.K_c: 'collect',  # collect rock or climb out at the exit
+    }
+    if event.key in keys:
+        return keys[event.key], None
     if event.key == pygame.K_r:
         # Start rock throwing mode
         if rock_aiming:
-            hunter_pos = list(prolog.query("w_hunter(X,Y,_)."))[0]
-            hx, hy = hunter_pos['X'], hunter_pos['Y']
+            hx, hy, _ = W_HUNTER.once()
             rock_aiming.start_aiming((hx, hy))
+    return None, None
+
+
+def create_view(args, surface):
+    """camera view for generated caves, the fixed 4x4 board otherwise"""
+    if args.cave:
+        return CameraView(surface, prolog_engine=prolog, lod=args.lod,
+                          end_screen=draw_end_screen)
+    return GameView()
+
+
+def open_action_log(args, game, seed):
+    """action log of the game-th game (numbered after the first one)"""
+    root, ext = os.path.splitext(args.log)
+    path = args.log if game == 1 else f'{root}-{game}{ext}'
+    return ActionLog(path, seed=seed, traditional=args.t_map, size=args.cave)
+
+
+def draw_frame(view, renderer):
+    """update, draw and present one frame (timed if metrics are enabled)"""
+    start = time.perf_counter()
+    view.update()
+    view.draw(renderer.surface)
+    renderer.present()
+    if metrics.METRICS:
+        metrics.METRICS.frame_seconds.observe(time.perf_counter() - start)
+
+
+def open_recorder(args):
+    """trajectory recorder of the played games (-record), or None"""
+    if not args.record:
+        return None
+    width, height = args.cave or (4, 4)
+    return TrajectoryRecorder(args.record, width, height,
+                              source='agent' if args.is_agent else 'user')
+
+
+def record_step(recorder, game, action, obs, target=None):
+    """record a played turn (the agent turns with the action it chose)"""
+    if recorder:
+        if action == 'agent':
+            action = game.agent_action()
+        recorder.step(action, obs, target)
+
+
+def headless(args, renderer):
+    """
+    agent games without a window, as fast as possible: every step is drawn
+    on the offscreen surface, or nothing is drawn (null renderer: no view,
+    no sprites loaded)
+    """
+    game = GameSession(prolog)
+    recorder = open_recorder(args)
+    for number in range(1, args.games + 1):
+        if args.seed is None:
+            seed = random.randrange(1 << 30)
+        else:
+            seed = args.seed + number - 1
+        obs = game.new_game(traditional=args.t_map, seed=seed, size=args.cave)
+        action_log = open_action_log(args, number, seed) if args.log else None
+        view = create_view(args, renderer.surface) if renderer.drawing else None
+        if recorder:
+            recorder.begin(obs)
+
+        start = time.perf_counter()
+        steps = 0
+        while obs['status'] == 'playing' and steps < args.steps:
+            obs = game.act('agent')
+            steps += 1
+            record_step(recorder, game, 'agent', obs)
+            if action_log:
+                action_log.write('agent')
+            if view:
+                view.turn_indicator.increment_turn()
+                draw_frame(view, renderer)
+        elapsed = time.perf_counter() - start
+
+        if action_log:
+            action_log.close()
+        print('game {} (seed {}): {}, score {}, {} steps in {:.3f}s'.format(
+            number, seed, obs['status'], obs['score'], steps, elapsed))
+
+    if recorder:
+        recorder.close()
+
+
+class SceneManager:
+    """play, win and lose scenes sharing one prolog engine"""
+
+    IDLE_WAIT = 1000         # ms, longest blocking wait when idle
+    IDLE_AFTER = FPS * 2     # frames animated after the last input
+    REDRAW_EVENTS = (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED)
+
+    def __init__(self, args, renderer):
+        self.args = args
+        self.renderer = renderer
+        self.surface = renderer.surface
+        self.game = GameSession(prolog)
+        self.clock = pygame.time.Clock()
+        self.cooldown = FPS * 6  # ms between two agent steps
+        self.games = 0
+        self.action_log = None
+        self.recorder = open_recorder(args)
+        self.scenes = {'play': self.play, 'win': self.end, 'lose': self.end}
+        self.restart()
+
+    def restart(self):
+        """start a new game in the loaded engine (no knowledge base reload)"""
+        args = self.args
+        if args.seed is None:
+            seed = random.randrange(1 << 30)
+        else:
+            seed = args.seed + self.games
+        obs = self.game.new_game(traditional=args.t_map, seed=seed, size=args.cave)
+        self.games += 1
+        if self.recorder:
+            self.recorder.begin(obs)
+
+        if args.log:
+            if self.action_log:
+                self.action_log.close()
+            self.action_log = open_action_log(args, self.games, seed)
+
+        self.view = create_view(args, self.surface)
+        self.scene = 'play'
+        self.idle_frames = 0
+        self.last_step = pygame.time.get_ticks()
+        self.dirty = True
+
+    def run(self):
+        """run the current scene forever"""
+        while True:
+            self.scenes[self.scene]()
+
+    def quit(self):
+        """close the log and the recording, and leave"""
+        if self.action_log:
+            self.action_log.close()
+        if self.recorder:
+            self.recorder.close()
+        sys.exit()
+
+    def act(self, action, target=None):
+        """play one turn"""
+        obs = self.game.act(action, target)
+        record_step(self.recorder, self.game, action, obs, target)
+        self.view.turn_indicator.increment_turn()
+        if self.action_log:
+            self.action_log.write(action, target)
+
+    def animating(self):
+        """agent games always animate, user games only after an input"""
+        return self.args.is_agent or self.idle_frames < self.IDLE_AFTER
+
+    def play(self):
+        """one frame of the game, or a blocking wait for input when idle"""
+        if self.animating():
+            self.clock.tick(FPS)
+            events = pygame.event.get()
+        else:
+            events = [pygame.event.wait(self.IDLE_WAIT)] + pygame.event.get()
 
-
-def main(args) -> None:
-    """Main function to run the simulation."""
-
-    if args.t_map:
-        list(prolog.query("run(pygameMap)."))
-    else:
-        list(prolog.query("run(pygame)."))
-
-    last = pygame.time.get_ticks()
-    cooldown = FPS * 6
-
-    hunter = Hunter(*list(prolog.query("w_hunter( X, Y, Z)."))[0].values())
-    wumpus = Wumpus(*list(prolog.query("w_wumpus( X, Y)."))[0].values())
-    light = Light()
-
-    moving_sprites = pygame.sprite.Group()
-    moving_sprites.add(hunter)
-    moving_sprites.add(wumpus)
-
-    gold = Gold(*list(prolog.query("w_gold( X, Y)."))[0].values())
-    pit_values = list(prolog.query("w_pit( X, Y)."))
-    pits = [Pit(*pit_val.values()) for pit_val in pit_values]
-    
-    # NEW: Load chests
-    chests = []
-    chest_values = list(prolog.query("chest(ID, X, Y, _)."))
-    for chest_val in chest_values:
-        chest = TreasureChest(chest_val['ID'], chest_val['X'], chest_val['Y'])
-        chests.append(chest)
-    
-    # NEW: Load rock pickups
-    rocks = []
-    rock_values = list(prolog.query("rock_pickup(X, Y)."))
-    for rock_val in rock_values:
-        rock = RockPickup(rock_val['X'], rock_val['Y'])
-        rocks.append(rock)
-    
-    # NEW: Initialize UI components
-    fog_of_war = FogOfWar(grid_size=4, cell_size=147, prolog_engine=prolog)
-    inventory_ui = InventoryDisplay(FONT, prolog_engine=prolog)
-    rock_aiming_ui = RockAimingOverlay(POSITIONS, cell_size=147, prolog_engine=prolog, font_path=FONT)
-    turn_indicator = TurnIndicator(FONT, prolog_engine=prolog)
-
-    clock = pygame.time.Clock()
-    while True:
-        clock.tick(FPS)
-        for event in pygame.event.get():
+        for event in events:
             if event.type == pygame.QUIT:
-                sys.exit()
+                self.quit()
             if event.type == pygame.MOUSEBUTTONDOWN:
                 print(pygame.mouse.get_pos())
-            if event.type == pygame.KEYDOWN:
-                if not args.is_agent:
-                    user_controller(event, hunter, rock_aiming_ui, turn_indicator)
+            if event.type in self.REDRAW_EVENTS and not self.animating():
+                self.idle_frames = self.IDLE_AFTER - 1  # redraw once
+            if event.type == pygame.KEYDOWN and self.view.handle_key(event):
+                self.idle_frames = 0
+            elif event.type == pygame.KEYDOWN and not self.args.is_agent:
+                self.idle_frames = 0
+                action, target = user_controller(event, self.view.rock_aiming_ui)
+                if action:
+                    self.act(action, target)
+
+        if not self.animating():
+            return  # woke up for nothing to draw
+        self.idle_frames += 1
+
+        draw_frame(self.view, self.renderer)
+
+        status, _ = self.game.status()
+        if status != 'playing':
+            self.scene = 'win' if status == 'won' else 'lose'
+            self.dirty = True
+            return
+
+        if self.args.is_agent:
+            now = pygame.time.get_ticks()
+            if now - self.last_step >= self.cooldown:
+                self.last_step = now
+                self.act('agent')
+
+    def end(self):
+        """win/lose screen: drawn once, then blocks until a key press"""
+        if self.dirty:
+            self.view.draw(self.surface)
+            self.view.draw_end(self.surface)
+            draw_restart_hint(self.surface)
+            self.renderer.present()
+            self.dirty = False
+
+        event = pygame.event.wait(self.IDLE_WAIT)
+        if event.type == pygame.QUIT:
+            self.quit()
+        elif event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_r:
+                self.restart()
+            elif event.key == pygame.K_ESCAPE:
+                self.quit()
+        elif event.type in self.REDRAW_EVENTS:
+            self.dirty = True
 
-        # Update objects
-        update_objects(light, moving_sprites, *pits, gold)
-        for chest in chests:
-            chest.update()
-        for rock in rocks:
-            rock.update()
-        
-        # Draw everything
-        draw_window(light, moving_sprites, *pits, gold)
-        
-        # Draw chests and rocks
-        for chest in chests:
-            chest.draw()
-        for rock in rocks:
-            if not rock.collected:
-                rock.draw()
-        
-        # NEW: Draw fog of war
-        fog_of_war.draw(WIN, POSITIONS)
-        
-        # NEW: Draw UI
-        inventory_ui.draw(WIN, position=(10, 10))
-        turn_indicator.draw(WIN, position=(10, 650))
-        rock_aiming_ui.draw(WIN, None)  # font parameter not used
 
-        pygame.display.update()
+def main(args) -> None:
+    """Main function to run the simulation."""
 
-        if list(prolog.query("w_hunter(1,1,_), w_goal(1).")):
-            winner()
+    if args.metrics:
+        metrics.enable(args.metrics)
 
-        if args.is_agent:
-            now = pygame.time.get_ticks()
-            if now - last >= cooldown:
-                last = now
-                list(prolog.query("runloop(-1)."))
-                turn_indicator.increment_turn()
+    if args.params:
+        with open(args.params) as file:
+            set_agent_params(json.load(file))
+
+    if args.cache:
+        decision_cache = DecisionCache(prolog, capacity=args.cache)
+        decision_cache.enable()
+        atexit.register(lambda: print(decision_cache.report()))
+
+    renderer = create_renderer(args.renderer)
+    if renderer.interactive:
+        SceneManager(args, renderer).run()
+    elif args.is_agent:
+        headless(args, renderer)
+    else:
+        sys.exit('-user needs the window renderer')
 
 
 if __name__ == '__main__':
@@ -549,6 +716,99 @@ if __name__ == '__main__':
         help="run simulation on traditional map.",
     )
 
+    parser.add_argument(
+        '-cache',
+        dest='cache',
+        type=int,
+        default=0,
+        metavar='SIZE',
+        help="cache agent decisions in an LRU table of SIZE entries.",
+    )
+
+    parser.add_argument(
+        '-seed',
+        dest='seed',
+        type=int,
+        default=None,
+        help="random seed of the map (random by default).",
+    )
+
+    parser.add_argument(
+        '-log',
+        dest='log',
+        default=None,
+        metavar='FILE',
+        help="record the game actions (JSON lines) for replays and exports.",
+    )
+
+    parser.add_argument(
+        '-params',
+        dest='params',
+        default=None,
+        metavar='FILE',
+        help="agent heuristic constants (JSON written by tuner.py -out).",
+    )
+
+    parser.add_argument(
+        '-cave',
+        dest='cave',
+        type=int,
+        nargs=2,
+        default=None,
+        metavar=('WIDTH', 'HEIGHT'),
+        help="play a generated cave of any size with a scrolling camera.",
+    )
+
+    parser.add_argument(
+        '-lod',
+        dest='lod',
+        action="store_true",
+        default=False,
+        help="draw flat tiles when zoomed far out (camera view, L toggles).",
+    )
+
+    parser.add_argument(
+        '-record',
+        dest='record',
+        default=None,
+        metavar='DIR',
+        help="record the steps as a trajectory dataset (see trajectory.py).",
+    )
+
+    parser.add_argument(
+        '-metrics',
+        dest='metrics',
+        type=int,
+        default=None,
+        metavar='PORT',
+        help="serve Prometheus metrics on http://127.0.0.1:PORT/metrics.",
+    )
+
+    parser.add_argument(
+        '-renderer',
+        dest='renderer',
+        choices=sorted(RENDERERS),
+        default=None,
+        help="window (default, or $WUMPUS_RENDERER), offscreen or null: "
+             "agent games without a window, drawn offscreen or not at all.",
+    )
+
+    parser.add_argument(
+        '-games',
+        dest='games',
+        type=int,
+        default=1,
+        help="agent games played without a window (offscreen/null).",
+    )
+
+    parser.add_argument(
+        '-steps',
+        dest='steps',
+        type=int,
+        default=200,
+        help="agent steps per game without a window (offscreen/null).",
+    )
+
     args = parser.parse_args()
 
     main(args)  # run main function
@@ -0,0 +1,258 @@
+"""
+Optional operational metrics, served in the Prometheus text format
+Nothing is measured until enable() is called: the hooks in the game code
+then cost a single check of METRICS
+"""
+
+import bisect
+import http.server
+import math
+import threading
+
+# seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+FRAME_BUCKETS = (0.002, 0.005, 0.01, 0.02, 0.033, 0.05, 0.1, 0.25)
+
+METRICS = None  # GameMetrics of this process once enabled
+
+
+def label_text(labels):
+    """{name="value",...} part of a sample line"""
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for name, value in labels.items())
+    return '{' + pairs + '}'
+
+
+def number_text(value):
+    """Sample value (Prometheus spells infinity +Inf)"""
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter, one value per label values tuple"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values = {}
+
+    def inc(self, amount=1, *label_values):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def samples(self):
+        values = self.values or ({} if self.labels else {(): 0})
+        for label_values, value in list(values.items()):
+            yield self.name, dict(zip(self.labels, label_values)), value
+
+    def drain(self):
+        values, self.values = self.values, {}
+        return values
+
+    def merge(self, values, part=None):
+        for label_values, value in values.items():
+            self.inc(value, *label_values)
+
+
+class Gauge(Counter):
+    """Current value, summed over the processes that report it"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, help, labels=()):
+        super().__init__(name, help, labels)
+        self.parts = {}  # reporting process -> its last values
+
+    def set(self, value, *label_values):
+        self.values[label_values] = value
+
+    def samples(self):
+        totals = dict(self.values)
+        for values in list(self.parts.values()):
+            for label_values, value in values.items():
+                totals[label_values] = totals.get(label_values, 0) + value
+        for label_values, value in totals.items():
+            yield self.name, dict(zip(self.labels, label_values)), value
+
+    def drain(self):
+        return dict(self.values)
+
+    def merge(self, values, part=None):
+        self.parts[part] = values
+
+
+class Histogram:
+    """Counts of observations per bucket, with their sum"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last one: +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def samples(self):
+        counts, total = list(self.counts), self.sum
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            yield self.name + '_bucket', {'le': number_text(bound)}, cumulative
+        yield self.name + '_sum', {}, total
+        yield self.name + '_count', {}, cumulative
+
+    def drain(self):
+        counts, total = self.counts, self.sum
+        self.counts, self.sum = [0] * len(counts), 0.0
+        return counts, total
+
+    def merge(self, values, part=None):
+        counts, total = values
+        for i, count in enumerate(counts):
+            self.counts[i] += count
+        self.sum += total
+
+
+class Registry:
+    """Named metrics, exposed as text or shipped to another process"""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def add(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def expose(self):
+        """Prometheus text exposition of all the metrics"""
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{label_text(labels)} {number_text(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def drain(self):
+        """Values since the last drain (counters and histograms restart at 0)"""
+        return {name: metric.drain() for name, metric in self.metrics.items()}
+
+    def merge(self, snapshot, part=None):
+        """Add a drained snapshot of another process (part names it for gauges)"""
+        for name, values in snapshot.items():
+            if name in self.metrics:
+                self.metrics[name].merge(values, part)
+
+
+class GameMetrics(Registry):
+    """Metrics of the games played in this process (or its workers)"""
+
+    def __init__(self):
+        super().__init__()
+        self.games_started = self.add(Counter(
+            'wumpus_games_started_total', 'Games started.'))
+        self.games_finished = self.add(Counter(
+            'wumpus_games_finished_total', 'Games won or lost, by cause.',
+            ('status', 'cause')))
+        self.stuns = self.add(Counter(
+            'wumpus_player_stuns_total', 'Hunter stunned by a mimic chest.'))
+        self.agent_steps = self.add(Counter(
+            'wumpus_agent_steps_total', 'Agent turns (runloop steps).'))
+        self.queries = self.add(Counter(
+            'wumpus_prolog_queries_total', 'Prepared Prolog queries run.'))
+        self.step_seconds = self.add(Histogram(
+            'wumpus_agent_step_seconds', 'Latency of one agent runloop step.'))
+        self.environment_seconds = self.add(Histogram(
+            'wumpus_environment_turn_seconds', 'Latency of process_environment_turn.'))
+        self.frame_seconds = self.add(Histogram(
+            'wumpus_frame_seconds', 'Time to update and draw a frame.', FRAME_BUCKETS))
+        self.facts = self.add(Gauge(
+            'wumpus_facts', 'Clauses of the dynamic game predicates.', ('predicate',)))
+        self.seen_queries = 0
+
+    def record_turn(self, action, seconds, samples, facts, ended, queries):
+        """
+        Record a played turn (see GameSession.record_metrics)
+
+        Args:
+            action: Action played ('agent' for an agent step)
+            seconds: Latency of the agent step (None if not measured)
+            samples: [name, value] pairs noted by prolog (metrics_collect/3)
+            facts: [predicate, clauses] pairs
+            ended: [status, cause] if the game just ended, else []
+            queries: Prepared queries run so far in this process
+        """
+        if action == 'agent':
+            self.agent_steps.inc()
+            if seconds is not None:
+                self.step_seconds.observe(seconds)
+        for name, value in samples:
+            if name == 'environment_turn':
+                self.environment_seconds.observe(value)
+            elif name == 'stun':
+                self.stuns.inc(value)
+        for name, count in facts:
+            self.facts.set(count, name)
+        if ended:
+            self.games_finished.inc(1, *ended)
+        self.queries.inc(queries - self.seen_queries)
+        self.seen_queries = queries
+
+
+class MetricsHandler(http.server.BaseHTTPRequestHandler):
+    """GET /metrics"""
+
+    registry = None
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = self.registry.expose().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # scrapes are not worth a log line
+
+
+def serve(registry, port, host='127.0.0.1'):
+    """Serve a registry over HTTP from a daemon thread, returns the server"""
+    handler = type('Handler', (MetricsHandler,), {'registry': registry})
+    server = http.server.ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def enable(port=None, host='127.0.0.1'):
+    """
+    Start measuring in this process (a new, empty registry)
+
+    Args:
+        port: Serve /metrics on this port (None: not served, e.g. in
+            workers whose values are merged by their parent)
+        host: Interface to listen on (local only by default)
+
+    Returns:
+        The GameMetrics registry
+    """
+    global METRICS
+    METRICS = GameMetrics()
+    if port is not None:
+        serve(METRICS, port, host)
+    return METRICS
@@ -0,0 +1,96 @@
+"""
+Benchmark of the monster next-hop table (PATHFINDING in main.pl)
+Many monsters walk to random targets on a large random map
+"""
+
+import argparse
+import random
+import time
+
+from bridge import Compound, predicate
+
+CLEAR_WORLD = predicate('clearWorld', 0)
+BUILD_WALLS = predicate('buildWalls', 2)
+ASSERTZ = predicate('assertz', 1)
+INIT_BOARDS = predicate('init_boards', 0)
+INIT_PATHS = predicate('init_paths', 1)
+MOVE_TOWARD = predicate('move_toward', 6)
+
+
+def create_map(width, height, pit_ratio, rng):
+    """Walls around a width x height map with random pits, returns free cells"""
+    CLEAR_WORLD.call()
+    BUILD_WALLS.call(width, height)
+    free = []
+    for x in range(1, width + 1):
+        for y in range(1, height + 1):
+            if rng.random() < pit_ratio:
+                ASSERTZ.call(Compound('w_pit', x, y))
+            else:
+                free.append((x, y))
+    INIT_BOARDS.call()
+    return free
+
+
+def simulate(free, monsters, steps, rng):
+    """
+    Move the monsters toward random targets, a new target once reached
+
+    Returns:
+        dict with moves, reached targets, blocked moves and seconds
+    """
+    positions = rng.sample(free, monsters)
+    targets = [rng.choice(free) for _ in range(monsters)]
+    reached = blocked = 0
+
+    start = time.perf_counter()
+    for _ in range(steps):
+        for i in range(monsters):
+            (x, y), (tx, ty) = positions[i], targets[i]
+            _, _, _, _, nx, ny = MOVE_TOWARD.once(x, y, tx, ty)
+            if (nx, ny) == (tx, ty):
+                reached += 1
+                targets[i] = rng.choice(free)
+            elif (nx, ny) == (x, y):
+                blocked += 1  # target walled in by pits
+                targets[i] = rng.choice(free)
+            positions[i] = (nx, ny)
+    elapsed = time.perf_counter() - start
+
+    return {'moves': monsters * steps, 'reached': reached,
+            'blocked': blocked, 'seconds': elapsed}
+
+
+def run(width, height, pit_ratio, monsters, steps, seed):
+    """Time the eager and the lazy table on the same map and walks"""
+    print(f"map {width}x{height}, {pit_ratio:.0%} pits, "
+          f"{monsters} monsters x {steps} steps")
+    print(f"{'mode':<8}{'build':>10}{'moves/s':>12}{'reached':>10}{'blocked':>10}")
+    for mode in ('eager', 'lazy'):
+        rng = random.Random(seed)
+        free = create_map(width, height, pit_ratio, rng)
+        start = time.perf_counter()
+        INIT_PATHS.call(mode)
+        build = time.perf_counter() - start
+
+        stats = simulate(free, min(monsters, len(free)), steps, rng)
+        print("{:<8}{:>9.2f}s{:>12.0f}{:>10}{:>10}".format(
+            mode, build, stats['moves'] / stats['seconds'],
+            stats['reached'], stats['blocked']))
+    CLEAR_WORLD.call()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Monster pathfinding benchmark on large maps")
+    parser.add_argument('-size', dest='size', type=int, nargs=2,
+                        default=(32, 32), metavar=('WIDTH', 'HEIGHT'))
+    parser.add_argument('-pits', dest='pits', type=float, default=0.2,
+                        help="ratio of pit cells.")
+    parser.add_argument('-monsters', dest='monsters', type=int, default=500)
+    parser.add_argument('-steps', dest='steps', type=int, default=50)
+    parser.add_argument('-seed', dest='seed', type=int, default=0)
+    args = parser.parse_args()
+
+    run(args.size[0], args.size[1], args.pits, args.monsters, args.steps,
+        args.seed)
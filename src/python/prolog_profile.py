@@ -0,0 +1,266 @@
+"""
+Predicate-level profile of the Prolog engine over batches of games
+Each batch runs under the SWI-Prolog profiler (profile_workload/4 in
+main.pl) in a worker process, the batches are merged, printed as a top-N
+table and written as collapsed stacks for flame graph tools
+(flamegraph.pl, inferno, speedscope)
+
+The profiler records caller/callee pairs, not whole stacks: the stacks
+are rebuilt by splitting the self time of each predicate over its
+callers in proportion to their calls
+"""
+
+import argparse
+import json
+import random
+import time
+
+from bridge import Compound, predicate
+from engine import fork_context
+from game_session import world_goal
+from script_bench import USER_ACTIONS
+
+PROFILE_WORKLOAD = predicate('profile_workload', 4)
+
+
+def workload(kind, seeds, map_goal, max_steps):
+    """
+    profile_run/1 argument of a batch
+
+    Args:
+        kind: 'agent' (agent games) or 'script' (random user actions, which
+            also run the environment turns: monsters, sounds, fog)
+        seeds: Map seeds, one game each
+        map_goal: Argument of run/1 (see game_session.world_goal)
+        max_steps: Turns per game
+    """
+    if kind == 'agent':
+        return Compound('agent', list(seeds), map_goal, max_steps)
+    games = []
+    for seed in seeds:
+        rng = random.Random(seed)
+        games.append([seed, [rng.choice(USER_ACTIONS) for _ in range(max_steps)]])
+    return Compound('scripts', games, map_goal)
+
+
+def profile_batch(task):
+    """
+    Pool worker: profile one batch of games
+
+    Args:
+        task: (kind, seeds, traditional, size, max_steps, clock)
+
+    Returns:
+        (totals dict, nodes list as reported by profile_workload/4)
+    """
+    kind, seeds, traditional, size, max_steps, clock = task
+    goal = workload(kind, seeds, world_goal(traditional, size), max_steps)
+    _, _, (seconds, ticks, inferences), nodes = PROFILE_WORKLOAD.once(goal, clock)
+    return {'seconds': seconds, 'ticks': ticks, 'inferences': inferences}, nodes
+
+
+class Profile:
+    """Per-predicate counts and times merged over batches"""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.inferences = 0
+        self.batches = 0
+        # predicate -> {'calls', 'redos', 'self', 'children', 'callers'}
+        self.nodes = {}
+        self.splits = {}  # (predicate, max_callers) -> caller fractions
+
+    def add(self, totals, nodes):
+        """Merge a batch (ticks become seconds with the batch tick length)"""
+        tick = totals['seconds'] / totals['ticks'] if totals['ticks'] else 0.0
+        self.seconds += totals['seconds']
+        self.inferences += totals['inferences']
+        self.batches += 1
+        self.splits = {}
+        for name, calls, redos, ticks_self, ticks_children, callers in nodes:
+            node = self.nodes.setdefault(name, {
+                'calls': 0, 'redos': 0, 'self': 0.0, 'children': 0.0, 'callers': {},
+            })
+            node['calls'] += calls
+            node['redos'] += redos
+            node['self'] += ticks_self * tick
+            node['children'] += ticks_children * tick
+            for caller, caller_calls, caller_ticks in callers:
+                edge = node['callers'].setdefault(caller, [0, 0.0])
+                edge[0] += caller_calls
+                edge[1] += caller_ticks * tick
+
+    def top(self, n=25, key='self'):
+        """
+        Hottest predicates
+
+        Args:
+            n: Rows returned
+            key: 'self' (own time), 'total' (own + callees) or 'calls'
+
+        Returns:
+            list of (predicate, row dict), hottest first
+        """
+        rows = [
+            (name, {
+                'calls': node['calls'],
+                'redos': node['redos'],
+                'self': node['self'],
+                'total': node['self'] + node['children'],
+            })
+            for name, node in self.nodes.items()
+        ]
+        rows.sort(key=lambda row: -row[1][key])
+        return rows[:n]
+
+    def stacks(self, max_depth=64, min_share=1e-4, max_callers=8):
+        """
+        Collapsed stacks: 'root;...;predicate' -> self seconds
+
+        Args:
+            max_depth: Longest rebuilt stack (deeper callers are cut)
+            min_share: Fraction of the profiled time below which a share
+                is no longer split (bounds the number of stacks)
+            max_callers: Callers a share is split over, the busiest ones
+        """
+        min_seconds = min_share * sum(node['self'] for node in self.nodes.values())
+        folded = {}
+        for name, node in self.nodes.items():
+            if node['self'] > 0:
+                self.unwind((name,), node['self'], folded, max_depth,
+                            min_seconds, max_callers)
+        return folded
+
+    def split(self, name, max_callers):
+        """
+        Caller distribution of a predicate: [(caller, fraction)], by calls
+        (by time if the ports were not counted), the busiest callers only
+        """
+        key = (name, max_callers)
+        if key not in self.splits:
+            # <spontaneous> and <recursive> are not nodes: they end the stack
+            callers = [
+                (caller, edge) for caller, edge in self.nodes[name]['callers'].items()
+                if caller in self.nodes and caller != name
+            ]
+            field = 0 if sum(edge[0] for _, edge in callers) else 1
+            callers = sorted(
+                ((caller, edge[field]) for caller, edge in callers if edge[field]),
+                key=lambda caller: -caller[1])[:max_callers]
+            total = sum(weight for _, weight in callers)
+            self.splits[key] = [(caller, weight / total) for caller, weight in callers]
+        return self.splits[key]
+
+    def unwind(self, path, seconds, folded, max_depth, min_seconds, max_callers):
+        """Split the time of the stack path over the callers of its root"""
+        callers = []
+        if len(path) < max_depth and seconds >= min_seconds:
+            # cycles end the stack too
+            callers = [
+                (caller, fraction)
+                for caller, fraction in self.split(path[0], max_callers)
+                if caller not in path
+            ]
+        total = sum(fraction for _, fraction in callers)
+        if not total:
+            stack = ';'.join(path)
+            folded[stack] = folded.get(stack, 0.0) + seconds
+            return
+        for caller, fraction in callers:
+            self.unwind((caller,) + path, seconds * fraction / total,
+                        folded, max_depth, min_seconds, max_callers)
+
+    def write_collapsed(self, path, max_depth=64):
+        """Write the stacks in the collapsed format (microseconds per line)"""
+        with open(path, 'w') as file:
+            for stack, seconds in sorted(self.stacks(max_depth).items()):
+                micros = round(seconds * 1e6)
+                if micros:
+                    file.write(f'{stack} {micros}\n')
+
+    def to_json(self):
+        """Merged profile as a JSON-able dict"""
+        return {
+            'seconds': self.seconds,
+            'inferences': self.inferences,
+            'batches': self.batches,
+            'nodes': self.nodes,
+        }
+
+
+def run(kind='agent', batches=8, games=25, seed=0, max_steps=200,
+        traditional=False, size=None, clock='cpu', workers=4):
+    """
+    Profile batches of games on a process pool
+
+    Returns:
+        (Profile, wall seconds)
+    """
+    tasks = [
+        (kind, range(seed + batch * games, seed + (batch + 1) * games),
+         traditional, size, max_steps, clock)
+        for batch in range(batches)
+    ]
+    profile = Profile()
+    start = time.perf_counter()
+    # workers are forked with the knowledge base already loaded
+    context = fork_context()
+    with context.Pool(workers) as pool:
+        for done, (totals, nodes) in enumerate(
+                pool.imap_unordered(profile_batch, tasks), 1):
+            profile.add(totals, nodes)
+            print(f'  {done}/{batches} batches')
+    return profile, time.perf_counter() - start
+
+
+def print_top(profile, n=25, key='self'):
+    """Top-N table of the merged profile"""
+    print(f"{profile.batches} batches, {profile.seconds:.2f}s profiled, "
+          f"{profile.inferences} inferences")
+    print(f"{'predicate':<44}{'calls':>12}{'redos':>10}{'self s':>10}"
+          f"{'self %':>8}{'total s':>10}")
+    for name, row in profile.top(n, key):
+        share = row['self'] / profile.seconds if profile.seconds else 0.0
+        print(f"{name[:43]:<44}{row['calls']:>12}{row['redos']:>10}"
+              f"{row['self']:>10.3f}{share:>8.1%}{row['total']:>10.3f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Predicate-level profile of the Prolog engine over batches of games")
+    parser.add_argument('-workload', dest='workload', choices=('agent', 'script'),
+                        default='agent',
+                        help="agent games, or random user actions (environment turns).")
+    parser.add_argument('-batches', dest='batches', type=int, default=8)
+    parser.add_argument('-games', dest='games', type=int, default=25,
+                        help="games per batch.")
+    parser.add_argument('-seed', dest='seed', type=int, default=0,
+                        help="first map seed (maps use seed, seed + 1, ...).")
+    parser.add_argument('-steps', dest='steps', type=int, default=200)
+    parser.add_argument('-map', dest='t_map', action='store_true',
+                        help="traditional map.")
+    parser.add_argument('-cave', dest='cave', type=int, nargs=2, default=None,
+                        metavar=('WIDTH', 'HEIGHT'))
+    parser.add_argument('-clock', dest='clock', choices=('cpu', 'wall'), default='cpu')
+    parser.add_argument('-workers', dest='workers', type=int, default=4)
+    parser.add_argument('-top', dest='top', type=int, default=25)
+    parser.add_argument('-sort', dest='sort', default='self',
+                        choices=('self', 'total', 'calls'))
+    parser.add_argument('-out', dest='out', default='prolog.folded', metavar='FILE',
+                        help="collapsed stacks (flamegraph.pl FILE > flame.svg).")
+    parser.add_argument('-json', dest='json', default=None, metavar='FILE',
+                        help="write the merged profile as JSON.")
+    args = parser.parse_args()
+
+    profile, elapsed = run(
+        args.workload, args.batches, args.games, args.seed, args.steps,
+        traditional=args.t_map, size=args.cave, clock=args.clock,
+        workers=args.workers)
+    print(f"profiled in {elapsed:.2f}s")
+    print_top(profile, args.top, args.sort)
+    if args.out:
+        profile.write_collapsed(args.out)
+        print(f"collapsed stacks written to {args.out}")
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(profile.to_json(), file, indent=2)
@@ -0,0 +1,168 @@
+"""
+Renderer backends, chosen at startup (nothing is created at import)
+window: the pygame display, offscreen: a plain surface for exports and
+tests, null: no surface at all, so no drawing and no sprite loading
+SpriteCache holds the sprites scaled for the spectator tiles and the camera
+"""
+
+import os
+
+import pygame
+
+from utils import rotate, scale
+
+CAPTION = 'Wumpus World CLI Game Interface'
+
+
+def board_size():
+    """Size of the 4x4 board image (loads the sprites)"""
+    import date
+
+    return date.WIDTH, date.HEIGHT
+
+
+class NullRenderer:
+    """Renderer that draws nothing (surface is None)"""
+
+    name = 'null'
+    interactive = False  # no window: no input events
+
+    def __init__(self, size=None):
+        self.surface = None
+        self.frames = 0
+
+    @property
+    def drawing(self):
+        """Frames are drawn (views only need to be built if so)"""
+        return self.surface is not None
+
+    def present(self, rects=None):
+        """Show the frame drawn on the surface"""
+        self.frames += 1
+
+    def close(self):
+        """Release the backend"""
+
+
+class OffscreenRenderer(NullRenderer):
+    """Frames drawn on a surface that is never shown"""
+
+    name = 'offscreen'
+
+    def __init__(self, size=None):
+        """
+        Create the surface (no display needed)
+
+        Args:
+            size: Surface size in pixels, the board size by default
+        """
+        super().__init__()
+        pygame.font.init()
+        self.surface = pygame.Surface(size or board_size())
+
+    def snapshot(self):
+        """Current frame as an (height, width, 3) array"""
+        return pygame.surfarray.array3d(self.surface).swapaxes(0, 1)
+
+
+class WindowRenderer(NullRenderer):
+    """Frames shown in the pygame window"""
+
+    name = 'window'
+    interactive = True
+
+    def __init__(self, size=None, caption=CAPTION):
+        """
+        Open the window
+
+        Args:
+            size: Window size in pixels, the board size by default
+            caption: Window title
+        """
+        super().__init__()
+        pygame.init()
+        self.surface = pygame.display.set_mode(size or board_size())
+        pygame.display.set_caption(caption)
+
+    def present(self, rects=None):
+        """Update the whole window, or only the given rects"""
+        if rects:
+            pygame.display.update(rects)
+        else:
+            pygame.display.flip()  # display.update(None) updates nothing
+        self.frames += 1
+
+    def close(self):
+        pygame.display.quit()
+
+
+class SpriteCache:
+    """Sprites scaled once for one cell size and shared by all the tiles"""
+
+    FACING_ANGLE = {'right': 0, 'up': 90, 'left': 180, 'down': -90}
+
+    def __init__(self, cell):
+        """
+        Pre-scale all the sprites
+
+        Args:
+            cell: Cell size in pixels
+        """
+        from date import HUNTER_IDLE, WUMPUS_IDLE, PIT, GOLD
+
+        self.cell = cell
+        hunter = self.fit(HUNTER_IDLE[0])
+        self.hunter = {
+            facing: rotate(hunter, angle)
+            for facing, angle in self.FACING_ANGLE.items()
+        }
+        self.wumpus = self.fit(WUMPUS_IDLE[0])
+        self.pit = self.fit(PIT)
+        self.gold = self.fit(GOLD, 0.6)
+
+        self.chests = {}
+        for chest_type in ('treasure', 'mimic'):
+            for opened in (0, 1):
+                image = pygame.Surface((cell, cell), pygame.SRCALPHA)
+                pad = cell // 5
+                color = (139, 69, 19) if chest_type == 'treasure' or opened else (160, 50, 30)
+                height = cell // 4 if opened else cell // 2
+                pygame.draw.rect(image, color, (pad, cell - pad - height, cell - 2 * pad, height))
+                self.chests[(chest_type, opened)] = image
+
+        self.rock = pygame.Surface((cell, cell), pygame.SRCALPHA)
+        pygame.draw.circle(self.rock, (150, 150, 150), (cell // 2, cell // 2), max(2, cell // 6))
+
+    def fit(self, image, ratio=0.9):
+        """Scale an image to fit in a cell, keeping its aspect ratio"""
+        size = self.cell * ratio
+        factor = size / max(image.get_width(), image.get_height())
+        return scale(
+            image,
+            width=max(1, int(image.get_width() * factor)),
+            height=max(1, int(image.get_height() * factor))
+        )
+
+
+RENDERERS = {
+    renderer.name: renderer
+    for renderer in (WindowRenderer, OffscreenRenderer, NullRenderer)
+}
+
+
+def create_renderer(name=None, size=None):
+    """
+    Create a renderer backend
+
+    Args:
+        name: 'window', 'offscreen' or 'null' (WUMPUS_RENDERER environment
+            variable if None, 'window' by default)
+        size: Surface size in pixels, the board size by default
+
+    Returns:
+        The renderer
+    """
+    name = name or os.environ.get('WUMPUS_RENDERER', 'window')
+    if name not in RENDERERS:
+        raise ValueError(f"Unknown renderer {name!r}, expected one of {sorted(RENDERERS)}")
+    return RENDERERS[name](size)
@@ -0,0 +1,79 @@
+"""
+Benchmark: action scripts in one play_script/3 call against one query
+(plus an observation) per turn, on the same seeded maps and scripts
+"""
+
+import argparse
+import random
+import time
+
+from engine import get_engine
+from game_session import GameSession
+
+# turns of random user scripts (no rock throws: they need a target)
+USER_ACTIONS = ('move', 'move', 'move', 'left', 'right', 'grab', 'collect', 'wait')
+
+
+def per_query(game, seed, script):
+    """Turn by turn through GameSession.act, returns (turns, score, seconds)"""
+    game.new_game(seed=seed)
+    turns = 0
+    start = time.perf_counter()
+    for action in script:
+        obs = game.act(action)
+        turns += 1
+        if obs['status'] != 'playing':
+            break
+    elapsed = time.perf_counter() - start
+    return turns, game.observe()['score'], elapsed
+
+
+def batched(game, seed, script):
+    """Whole script through GameSession.play_script, returns (turns, score, seconds)"""
+    game.new_game(seed=seed)
+    start = time.perf_counter()
+    steps = game.play_script(script)
+    elapsed = time.perf_counter() - start
+    return len(steps), game.observe()['score'], elapsed
+
+
+def run(games=200, length=100, seed=0):
+    """Print the turn throughput of both paths for user and agent scripts"""
+    game = GameSession(get_engine())
+    rng = random.Random(seed)
+    scripts = {
+        'user': [[rng.choice(USER_ACTIONS) for _ in range(length)] for _ in range(games)],
+        'agent': [['agent'] * length for _ in range(games)],
+    }
+
+    print(f"{games} games, scripts of {length} turns")
+    print(f"{'script':<8}{'per query':>14}{'batched':>14}{'speedup':>10}{'mismatch':>10}")
+    for name, corpus in scripts.items():
+        totals = {'per query': [0, 0.0], 'batched': [0, 0.0]}
+        mismatches = 0
+        for index, script in enumerate(corpus):
+            results = {}
+            for path, play in (('per query', per_query), ('batched', batched)):
+                turns, score, elapsed = play(game, seed + index, script)
+                totals[path][0] += turns
+                totals[path][1] += elapsed
+                results[path] = (turns, score)
+            # same seed and same actions: both paths must end the same way
+            mismatches += results['per query'] != results['batched']
+
+        rates = {path: turns / seconds for path, (turns, seconds) in totals.items()}
+        print("{:<8}{:>10.0f}/s{:>12.0f}/s{:>9.1f}x{:>10}".format(
+            name, rates['per query'], rates['batched'],
+            rates['batched'] / rates['per query'], mismatches))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Action scripts in one Prolog call vs one query per turn")
+    parser.add_argument('-games', dest='games', type=int, default=200)
+    parser.add_argument('-length', dest='length', type=int, default=100,
+                        help="turns per script.")
+    parser.add_argument('-seed', dest='seed', type=int, default=0)
+    args = parser.parse_args()
+
+    run(args.games, args.length, args.seed)
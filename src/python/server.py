@@ -0,0 +1,352 @@
+"""
+Asyncio game server hosting many concurrent Wumpus World sessions
+JSON-lines protocol over TCP or a Unix socket
+
+Requests (one JSON object per line):
+    {"op": "new_game", "map": "random" | "traditional", "seed": 7}
+    {"op": "action", "session": "...", "action": "move", "target": [x, y]}
+    {"op": "observe", "session": "..."}
+    {"op": "close", "session": "..."}
+
+Replies: {"ok": true, "session": "...", "observation": {...}} or
+{"ok": false, "error": "..."}. A reply with "error": "busy" means the
+engine worker of the session has too many queued requests, retry later.
+"worker died" means its engine process exited: its sessions are lost.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import time
+import uuid
+
+import metrics
+from engine import fork_context
+from game_session import GameSession
+
+
+def worker_main(conn, measure=False):
+    """Prolog engine worker process: plays the sessions pinned to it"""
+    from engine import get_engine
+
+    if measure:
+        metrics.enable()  # shipped with each reply, served by the parent
+    game = GameSession(get_engine())  # inherited when forked after load
+    active = None  # session currently loaded in the engine
+
+    while True:
+        request = conn.recv()
+        if request is None:
+            break
+
+        op = request['op']
+        session_id = request.get('session')
+        reply = {'ok': True}
+        try:
+            if op == 'drop':
+                game.drop(session_id)
+                if active == session_id:
+                    active = None
+            else:
+                if active is not None and active != session_id:
+                    game.save(active)
+
+                if op == 'new_game':
+                    reply['observation'] = game.new_game(
+                        traditional=request.get('map') == 'traditional',
+                        seed=request.get('seed'),
+                    )
+                elif active != session_id:
+                    game.load(session_id)
+
+                active = session_id
+                if op == 'action':
+                    reply['observation'] = game.act(
+                        request['action'], request.get('target'))
+                elif op == 'observe':
+                    reply['observation'] = game.observe()
+        except Exception as error:
+            reply = {'ok': False, 'error': str(error)}
+
+        if measure:
+            reply['metrics'] = metrics.METRICS.drain()
+        conn.send(reply)
+
+
+class EngineWorker:
+    """Handle on one engine worker process"""
+
+    def __init__(self, index, queue_limit=64, context=multiprocessing,
+                 registry=None):
+        """
+        Start the worker process
+
+        Args:
+            index: Worker number (for logs)
+            queue_limit: Max requests waiting for this worker (backpressure)
+            context: multiprocessing context the worker is started with
+            registry: Metrics registry the worker metrics are merged into
+        """
+        self.index = index
+        self.registry = registry
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=worker_main, args=(child_conn, registry is not None),
+            daemon=True)
+        self.process.start()
+        child_conn.close()
+
+        self.lock = asyncio.Lock()
+        self.queue_limit = queue_limit
+        self.pending = 0
+        self.sessions = set()
+        self.dead = False  # the process exited or its pipe broke
+
+    @property
+    def busy(self):
+        """Too many queued requests for this worker"""
+        return self.pending >= self.queue_limit
+
+    async def request(self, message):
+        """Send a request to the worker and wait for its reply"""
+        if self.dead:
+            return {'ok': False, 'error': 'worker died'}
+        self.pending += 1
+        try:
+            async with self.lock:
+                loop = asyncio.get_running_loop()
+                self.conn.send(message)
+                reply = await loop.run_in_executor(None, self.conn.recv)
+        except (EOFError, OSError):
+            self.dead = True
+            return {'ok': False, 'error': 'worker died'}
+        finally:
+            self.pending -= 1
+
+        snapshot = reply.pop('metrics', None)
+        if snapshot and self.registry:
+            self.registry.merge(snapshot, part=self.index)
+        return reply
+
+    def close(self):
+        """Stop the worker process"""
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=2)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+class GameServer:
+    """JSON-lines game server with sessions pinned to engine workers"""
+
+    def __init__(self, workers=4, idle_timeout=300.0, queue_limit=64,
+                 max_sessions=10000, preload=False, metrics_port=None):
+        """
+        Initialize the server
+
+        Args:
+            workers: Number of Prolog engine worker processes
+            idle_timeout: Seconds before an unused session is evicted
+            queue_limit: Max queued requests per worker before replying busy
+            max_sessions: Max live sessions over all workers
+            preload: Load the knowledge base once here and fork the
+                workers from this process
+            metrics_port: Serve the metrics of all the workers on this
+                port (None: not measured)
+        """
+        self.n_workers = workers
+        self.idle_timeout = idle_timeout
+        self.queue_limit = queue_limit
+        self.max_sessions = max_sessions
+        self.preload = preload
+        self.metrics_port = metrics_port
+        self.workers = []
+        self.sessions = {}  # session id -> [worker, last used]
+        self.server = None
+        self.evictor = None
+
+    async def start(self, host='127.0.0.1', port=8765, unix_path=None):
+        """Start the workers and listen for clients"""
+        context = fork_context() if self.preload else multiprocessing
+        registry = None
+        if self.metrics_port is not None:
+            registry = metrics.enable(self.metrics_port, host)
+        self.workers = [
+            EngineWorker(i, self.queue_limit, context, registry)
+            for i in range(self.n_workers)
+        ]
+        if unix_path:
+            self.server = await asyncio.start_unix_server(
+                self.handle_client, path=unix_path)
+        else:
+            self.server = await asyncio.start_server(
+                self.handle_client, host, port)
+        self.evictor = asyncio.create_task(self.evict_idle())
+        return self.server
+
+    async def handle_client(self, reader, writer):
+        """Serve one client connection, one request at a time"""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    reply = await self.dispatch(json.loads(line))
+                except (ValueError, KeyError, TypeError) as error:
+                    reply = {'ok': False, 'error': f'bad request: {error}'}
+
+                writer.write(json.dumps(reply).encode() + b'\n')
+                await writer.drain()  # slow readers slow down their sessions
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, message):
+        """Route a request to the worker owning the session"""
+        op = message['op']
+
+        if op == 'new_game':
+            if len(self.sessions) >= self.max_sessions:
+                return {'ok': False, 'error': 'too many sessions'}
+            alive = [worker for worker in self.workers if not worker.dead]
+            if not alive:
+                return {'ok': False, 'error': 'no workers'}
+            worker = min(alive, key=lambda w: len(w.sessions))
+            if worker.busy:
+                return {'ok': False, 'error': 'busy'}
+            session_id = 's' + uuid.uuid4().hex
+            reply = await worker.request({
+                'op': 'new_game',
+                'session': session_id,
+                'map': message.get('map', 'random'),
+                'seed': message.get('seed'),
+            })
+            if worker.dead:
+                self.forget_worker(worker)
+            if reply['ok']:
+                worker.sessions.add(session_id)
+                self.sessions[session_id] = [worker, time.monotonic()]
+                reply['session'] = session_id
+            return reply
+
+        session_id = message['session']
+        if session_id not in self.sessions:
+            return {'ok': False, 'error': 'unknown session'}
+        worker = self.sessions[session_id][0]
+
+        if op == 'close':
+            await self.close_session(session_id)
+            return {'ok': True, 'session': session_id}
+
+        if op not in ('action', 'observe'):
+            return {'ok': False, 'error': f'unknown op: {op}'}
+        if worker.busy:
+            return {'ok': False, 'error': 'busy'}
+
+        self.sessions[session_id][1] = time.monotonic()
+        request = {'op': op, 'session': session_id}
+        if op == 'action':
+            request['action'] = message['action']
+            request['target'] = message.get('target')
+        reply = await worker.request(request)
+        if worker.dead:
+            self.forget_worker(worker)
+        reply['session'] = session_id
+        return reply
+
+    async def close_session(self, session_id):
+        """Forget a session and free its saved game in the worker"""
+        worker, _ = self.sessions.pop(session_id)
+        worker.sessions.discard(session_id)
+        await worker.request({'op': 'drop', 'session': session_id})
+        if worker.dead:
+            self.forget_worker(worker)
+
+    def forget_worker(self, worker):
+        """Drop the sessions of a dead worker (their games died with it)"""
+        if worker.sessions:
+            print(f'worker {worker.index} died, {len(worker.sessions)} sessions lost')
+        for session_id in worker.sessions:
+            self.sessions.pop(session_id, None)
+        worker.sessions.clear()
+
+    async def evict_idle(self):
+        """Periodically evict sessions idle for longer than idle_timeout"""
+        while True:
+            await asyncio.sleep(max(1.0, self.idle_timeout / 4))
+            deadline = time.monotonic() - self.idle_timeout
+            idle = [
+                session_id
+                for session_id, (_, last_used) in self.sessions.items()
+                if last_used < deadline
+            ]
+            for session_id in idle:
+                if session_id in self.sessions:
+                    try:
+                        await self.close_session(session_id)
+                    except Exception as error:  # keep evicting the others
+                        print(f'evicting {session_id} failed: {error!r}')
+
+    async def serve_forever(self):
+        """Run until cancelled"""
+        async with self.server:
+            await self.server.serve_forever()
+
+    def close(self):
+        """Stop listening and stop the workers"""
+        if self.evictor:
+            self.evictor.cancel()
+        if self.server:
+            self.server.close()
+        for worker in self.workers:
+            worker.close()
+
+
+async def run_server(args):
+    """Start the server with the command line options"""
+    server = GameServer(
+        workers=args.workers,
+        idle_timeout=args.idle_timeout,
+        queue_limit=args.queue_limit,
+        max_sessions=args.max_sessions,
+        preload=args.preload,
+        metrics_port=args.metrics,
+    )
+    await server.start(args.host, args.port, args.unix)
+    where = args.unix or f'{args.host}:{args.port}'
+    print(f'Wumpus World server on {where} ({args.workers} workers)')
+    try:
+        await server.serve_forever()
+    finally:
+        server.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Wumpus World game server (JSON lines)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', default=None, metavar='PATH',
+                        help="listen on a Unix socket instead of TCP.")
+    parser.add_argument('--workers', type=int, default=4,
+                        help="number of Prolog engine processes.")
+    parser.add_argument('--idle-timeout', type=float, default=300.0,
+                        help="seconds before an idle session is evicted.")
+    parser.add_argument('--queue-limit', type=int, default=64,
+                        help="queued requests per worker before replying busy.")
+    parser.add_argument('--max-sessions', type=int, default=10000)
+    parser.add_argument('--preload', action='store_true',
+                        help="load the knowledge base once, fork the workers after.")
+    parser.add_argument('--metrics', type=int, default=None, metavar='PORT',
+                        help="serve Prometheus metrics on PORT (/metrics).")
+
+    try:
+        asyncio.run(run_server(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,248 @@
+"""
+Tiled spectator view: watch many agent games at once in one window
+Each game runs in its own Prolog engine process and streams state deltas
+"""
+
+import argparse
+import math
+import multiprocessing
+import time
+
+from game_session import GameSession
+from renderer import SpriteCache
+
+BOARD_SIZE = 4  # cells per side
+HEADER = 18     # pixels for the score line of a tile
+
+
+def simulate(index, conn, seed, step_delay, max_steps):
+    """
+    Worker process: plays agent games forever, sends state deltas
+
+    Args:
+        index: Tile index of this game
+        conn: Sending end of a pipe to the spectator
+        seed: Seed of the first game (None for random maps)
+        step_delay: Seconds between two agent steps
+        max_steps: Steps before a game is stopped (status 'timeout')
+
+    A game that raises is reported with status 'crashed' before the worker
+    exits
+    """
+    from engine import get_engine
+
+    sent = {}
+    games = 0
+    try:
+        game = GameSession(get_engine())
+        while True:
+            game.new_game(seed=None if seed is None else seed + games)
+            games += 1
+            for step in range(max_steps + 1):
+                state = game.board()
+                state['game'] = games
+                if step == max_steps and state['status'] == 'playing':
+                    state['status'] = 'timeout'
+
+                # only the fields that changed since the last message
+                delta = {
+                    key: value for key, value in state.items()
+                    if sent.get(key) != value
+                }
+                if delta:
+                    conn.send((index, delta))
+                    sent.update(delta)
+
+                if state['status'] != 'playing':
+                    break
+                time.sleep(step_delay)
+                game.act('agent')
+
+            time.sleep(step_delay * 10)  # keep the end visible for a moment
+    except (BrokenPipeError, EOFError, KeyboardInterrupt):
+        pass  # spectator window closed
+    except Exception as error:
+        try:
+            conn.send((index, {'status': 'crashed', 'error': str(error)}))
+        except (BrokenPipeError, OSError):
+            pass
+
+
+class Tile:
+    """One downscaled board, redrawn only when its game state changed"""
+
+    STATUS_COLOR = {
+        'playing': (90, 90, 90),
+        'won': (40, 200, 40),
+        'lost': (200, 40, 40),
+        'timeout': (200, 160, 40),
+        'crashed': (200, 40, 200),
+    }
+
+    def __init__(self, rect, cell):
+        import pygame
+
+        self.rect = rect
+        self.cell = cell
+        self.state = {}
+        self.dirty = True
+        self.surface = pygame.Surface(rect.size)
+
+    def apply(self, delta):
+        """Apply a state delta received from the worker"""
+        self.state.update(delta)
+        self.dirty = True
+
+    def crash(self):
+        """The worker is gone: show it (its last board stays visible)"""
+        if self.state.get('status') != 'crashed':
+            self.state['status'] = 'crashed'
+            self.dirty = True
+
+    def cell_rect(self, x, y):
+        """Top-left pixel of a grid cell inside the tile"""
+        return ((x - 1) * self.cell + 2, HEADER + (BOARD_SIZE - y) * self.cell)
+
+    def render(self, sprites, font):
+        """Redraw the tile surface"""
+        import pygame
+
+        state = self.state
+        self.surface.fill((20, 20, 20))
+        border = self.STATUS_COLOR.get(state.get('status'), (90, 90, 90))
+        pygame.draw.rect(self.surface, border, self.surface.get_rect(), 2)
+
+        for x in range(1, BOARD_SIZE + 1):
+            for y in range(1, BOARD_SIZE + 1):
+                left, top = self.cell_rect(x, y)
+                pygame.draw.rect(self.surface, (45, 40, 35), (left, top, self.cell - 1, self.cell - 1))
+
+        def blit_center(image, x, y):
+            left, top = self.cell_rect(x, y)
+            rect = image.get_rect(center=(left + self.cell // 2, top + self.cell // 2))
+            self.surface.blit(image, rect)
+
+        for x, y in state.get('pits', ()):
+            blit_center(sprites.pit, x, y)
+        for x, y in state.get('rocks', ()):
+            blit_center(sprites.rock, x, y)
+        for _, x, y, chest_type, opened in state.get('chests', ()):
+            blit_center(sprites.chests[(chest_type, opened)], x, y)
+        if state.get('gold'):
+            blit_center(sprites.gold, *state['gold'])
+        if state.get('wumpus'):
+            blit_center(sprites.wumpus, *state['wumpus'])
+        if state.get('hunter'):
+            x, y, facing = state['hunter']
+            blit_center(sprites.hunter[facing], x, y)
+
+        text = '#{}  score {}  {}'.format(
+            state.get('game', 0), state.get('score', 0), state.get('status', '...'))
+        if state.get('error'):
+            text += '  ' + state['error']
+        self.surface.blit(font.render(text, True, (230, 230, 230)), (4, 2))
+        self.dirty = False
+
+
+def run_spectator(games=16, seed=None, step_delay=0.1, max_steps=200,
+                  width=1024, height=1024):
+    """
+    Open the spectator window and the game workers
+
+    Args:
+        games: Number of games shown (4-64)
+        seed: Seed of the first map of game 0 (None for random maps)
+        step_delay: Seconds between two agent steps in every worker
+        max_steps: Steps before a game is stopped
+        width, height: Window size
+    """
+    import pygame
+    from date import FPS, FONT
+    from renderer import WindowRenderer
+
+    cols = math.ceil(math.sqrt(games))
+    rows = math.ceil(games / cols)
+    tile_w, tile_h = width // cols, height // rows
+    cell = max(4, min(tile_w - 4, tile_h - HEADER - 2) // BOARD_SIZE)
+
+    window = WindowRenderer((width, height), caption=f'Wumpus World spectator ({games} games)')
+    screen = window.surface
+    font = pygame.font.Font(FONT, max(9, HEADER - 6))
+    sprites = SpriteCache(cell)
+    tiles = [
+        Tile(pygame.Rect((i % cols) * tile_w, (i // cols) * tile_h, tile_w, tile_h), cell)
+        for i in range(games)
+    ]
+
+    # spawn: workers must not inherit the pygame window of this process
+    context = multiprocessing.get_context('spawn')
+    pipes, workers = [], []
+    for i in range(games):
+        receiver, sender = context.Pipe(duplex=False)
+        game_seed = None if seed is None else seed + i * 100000
+        worker = context.Process(
+            target=simulate, args=(i, sender, game_seed, step_delay, max_steps),
+            daemon=True)
+        worker.start()
+        sender.close()
+        pipes.append((i, receiver))
+        workers.append(worker)
+
+    clock = pygame.time.Clock()
+    screen.fill((0, 0, 0))
+    window.present()
+    try:
+        running = True
+        while running:
+            clock.tick(FPS)
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+
+            # drain whatever arrived, never wait for a slow simulation
+            for pipe in list(pipes):
+                index, conn = pipe
+                try:
+                    while conn.poll():
+                        tiles[index].apply(conn.recv()[1])
+                except EOFError:
+                    # the worker exited: stop polling its pipe (it stays
+                    # readable at EOF and would fail on every frame)
+                    pipes.remove(pipe)
+                    conn.close()
+                    tiles[index].crash()
+
+            dirty = []
+            for tile in tiles:
+                if tile.dirty:
+                    tile.render(sprites, font)
+                    screen.blit(tile.surface, tile.rect)
+                    dirty.append(tile.rect)
+            if dirty:
+                window.present(dirty)
+    finally:
+        for _, conn in pipes:
+            conn.close()
+        for worker in workers:
+            worker.terminate()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Watch many Wumpus World agent games at once")
+    parser.add_argument('-games', dest='games', type=int, default=16,
+                        help="number of games (4-64).")
+    parser.add_argument('-seed', dest='seed', type=int, default=None)
+    parser.add_argument('-delay', dest='delay', type=float, default=0.1,
+                        help="seconds between two agent steps.")
+    parser.add_argument('-steps', dest='steps', type=int, default=200,
+                        help="steps before a game is stopped.")
+    parser.add_argument('-size', dest='size', type=int, nargs=2,
+                        default=(1024, 1024), metavar=('WIDTH', 'HEIGHT'))
+    args = parser.parse_args()
+
+    run_spectator(
+        games=max(1, min(64, args.games)), seed=args.seed,
+        step_delay=args.delay, max_steps=args.steps,
+        width=args.size[0], height=args.size[1],
+    )
@@ -0,0 +1,281 @@
+"""
+Paired tournament: agent variants play exactly the same seeded maps
+Results are cached per (agent, seed) in a JSON-lines file, so an
+interrupted tournament resumes where it stopped
+
+Agents:
+    heuristic             the Prolog agent with the default constants
+    params=FILE           the Prolog agent with tuned constants (tuner.py -out)
+    rules=FILE            the Prolog agent with predicates redefined by a .pl file
+    python=MODULE:NAME    a Python agent, NAME(game, obs) returns an action
+                          or (action, target) for GameSession.act
+"""
+
+import argparse
+import hashlib
+import importlib
+import json
+import os
+
+from bridge import predicate
+from engine import fork_context, get_engine
+from game_session import GameSession
+from tuner import mean_ci, set_agent_params, wilson_ci
+
+RESET_AGENT_PARAMS = predicate('reset_agent_params', 0)
+
+_agent = None  # (spec, turn function) set up in this worker process
+
+
+def fingerprint(spec):
+    """Cache key of an agent: the spec and the content of its file"""
+    kind, _, value = spec.partition('=')
+    if kind in ('params', 'rules'):
+        with open(value, 'rb') as file:
+            return f'{spec}#{hashlib.sha1(file.read()).hexdigest()[:12]}'
+    return spec
+
+
+def load_agent(spec):
+    """
+    Set up an agent in this process's engine
+
+    Returns:
+        function(game, obs) playing one turn and returning the observation
+    """
+    kind, _, value = spec.partition('=')
+    if kind == 'python':
+        module, _, name = value.partition(':')
+        choose = getattr(importlib.import_module(module), name)
+
+        def turn(game, obs):
+            action = choose(game, obs)
+            if isinstance(action, str):
+                return game.act(action)
+            return game.act(*action)
+        return turn
+
+    RESET_AGENT_PARAMS.call()
+    if kind == 'params':
+        with open(value) as file:
+            set_agent_params(json.load(file))
+    elif kind == 'rules':
+        get_engine().consult(os.path.abspath(value))
+    elif kind != 'heuristic':
+        raise ValueError(f"Unknown agent: {spec}")
+    return lambda game, obs: game.act('agent')
+
+
+def play(task):
+    """
+    Pool worker: play one game with an agent
+
+    Args:
+        task: (agent spec, seed, max_steps, traditional)
+
+    Returns:
+        (agent spec, seed, result dict)
+    """
+    global _agent
+    spec, seed, max_steps, traditional = task
+    if _agent is None or _agent[0] != spec:
+        _agent = (spec, load_agent(spec))
+
+    game = GameSession(get_engine())
+    obs = game.new_game(traditional=traditional, seed=seed)
+    steps = 0
+    while obs['status'] == 'playing' and steps < max_steps:
+        obs = _agent[1](game, obs)
+        steps += 1
+
+    return spec, seed, {
+        'score': obs['score'],
+        'won': obs['status'] == 'won',
+        'status': obs['status'],
+        'cause': obs['cause'],
+        'steps': steps,
+    }
+
+
+class Tournament:
+    """Agents x seeds games on a process pool, cached and resumable"""
+
+    def __init__(self, agents, seeds, max_steps=200, traditional=False,
+                 workers=4, cache_path='tournament_cache.jsonl'):
+        """
+        Initialize the tournament
+
+        Args:
+            agents: Agent specs, the first one is the baseline
+            seeds: Map seeds played by every agent
+            max_steps: Turns before a game counts as unfinished
+            traditional: Play the traditional map (same for every seed)
+            workers: Process pool size
+            cache_path: JSON-lines cache of (agent, seed) results
+        """
+        self.agents = list(agents)
+        self.keys = {spec: fingerprint(spec) for spec in self.agents}
+        self.seeds = list(seeds)
+        self.max_steps = max_steps
+        self.traditional = traditional
+        self.workers = workers
+        self.cache_path = cache_path
+        self.cache = {}
+        self.load_cache()
+
+    def load_cache(self):
+        """Read the results of previous (possibly interrupted) runs"""
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        with open(self.cache_path) as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # last line cut by an interruption
+                if (entry['max_steps'], entry['traditional']) == (
+                        self.max_steps, self.traditional):
+                    self.cache[(entry['agent'], entry['seed'])] = entry['result']
+
+    def run(self):
+        """Play every missing game, one pool per agent"""
+        cache_file = open(self.cache_path, 'a') if self.cache_path else None
+        try:
+            for spec in self.agents:
+                tasks = [
+                    (spec, seed, self.max_steps, self.traditional)
+                    for seed in self.seeds
+                    if (self.keys[spec], seed) not in self.cache
+                ]
+                if not tasks:
+                    continue
+                print(f'{spec}: {len(tasks)} games')
+
+                # a fresh fork per agent: redefined rules never leak into
+                # the games of another agent
+                context = fork_context()
+                with context.Pool(self.workers) as pool:
+                    for spec, seed, result in pool.imap_unordered(
+                            play, tasks, chunksize=4):
+                        key = self.keys[spec]
+                        self.cache[(key, seed)] = result
+                        if cache_file:
+                            cache_file.write(json.dumps({
+                                'agent': key, 'seed': seed,
+                                'max_steps': self.max_steps,
+                                'traditional': self.traditional,
+                                'result': result,
+                            }) + '\n')
+                            cache_file.flush()
+        finally:
+            if cache_file:
+                cache_file.close()
+
+    def results(self, spec):
+        """Results of an agent, in seed order"""
+        return [self.cache[(self.keys[spec], seed)] for seed in self.seeds]
+
+    def summary(self, spec):
+        """Win rate, score and steps of an agent, paired against the baseline"""
+        results = self.results(spec)
+        base = self.results(self.agents[0])
+        wins = sum(result['won'] for result in results)
+        summary = {
+            'agent': spec,
+            'games': len(results),
+            'win_rate': wins / len(results),
+            'win_ci': wilson_ci(wins, len(results)),
+            'score': mean_ci([result['score'] for result in results]),
+            'steps': mean_ci([result['steps'] for result in results]),
+        }
+        # same maps for both agents: paired differences
+        for field in ('won', 'score', 'steps'):
+            summary[f'delta_{field}'] = mean_ci([
+                float(result[field]) - float(other[field])
+                for result, other in zip(results, base)
+            ])
+        summary['disagreements'] = self.disagreements(spec)
+        return summary
+
+    def disagreements(self, spec):
+        """
+        Maps where the agent and the baseline disagree on the outcome
+
+        Returns:
+            list of (seed, agent status, baseline status, score difference),
+            biggest score differences first
+        """
+        base = self.agents[0]
+        pairs = zip(self.seeds, self.results(spec), self.results(base))
+        return sorted((
+            (seed, result['status'], other['status'], result['score'] - other['score'])
+            for seed, result, other in pairs
+            if result['status'] != other['status']
+        ), key=lambda disagreement: -abs(disagreement[3]))
+
+
+def print_summaries(summaries, disagreements=10):
+    """Summary table, then the maps each agent and the baseline disagree on"""
+    baseline = summaries[0]['agent']
+    print(f"{'agent':<28}{'win rate':>22}{'score':>16}{'steps':>14}"
+          f"{'d win':>16}{'d score':>16}")
+    for summary in summaries:
+        low, high = summary['win_ci']
+        print("{:<28}{:>7.1%} [{:.1%}, {:.1%}]{:>8.1f} +-{:>5.1f}{:>7.1f} +-{:>4.1f}"
+              "{:>+9.1%} +-{:>4.1%}{:>+9.1f} +-{:>5.1f}".format(
+                  summary['agent'][:27], summary['win_rate'], low, high,
+                  *summary['score'], *summary['steps'],
+                  *summary['delta_won'], *summary['delta_score']))
+
+    for summary in summaries[1:]:
+        listed = summary['disagreements']
+        if not listed:
+            continue
+        won = sum(status == 'won' for _, status, _, _ in listed)
+        lost = sum(other == 'won' for _, _, other, _ in listed)
+        print(f"\n{summary['agent']} vs {baseline}: {len(listed)} maps disagree "
+              f"({won} won only by {summary['agent']}, {lost} only by {baseline})")
+        for seed, status, other, delta in listed[:disagreements]:
+            print(f"  seed {seed:<8}{status:>8} vs {other:<8}{delta:>+6} points")
+
+
+def read_seeds(path):
+    """Seed corpus file: one integer per line (# comments allowed)"""
+    with open(path) as file:
+        return [int(line.split('#')[0]) for line in file if line.split('#')[0].strip()]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Paired tournament of agents on the same seeded maps")
+    parser.add_argument('agents', nargs='+',
+                        help="agent specs, the first one is the baseline "
+                             "(heuristic, params=FILE, rules=FILE, python=MODULE:NAME).")
+    parser.add_argument('-maps', dest='maps', type=int, default=200)
+    parser.add_argument('-seed', dest='seed', type=int, default=0,
+                        help="first map seed (maps use seed, seed + 1, ...).")
+    parser.add_argument('-seeds', dest='seeds', default=None, metavar='FILE',
+                        help="seed corpus (one seed per line) instead of -maps/-seed.")
+    parser.add_argument('-map', dest='t_map', action='store_true',
+                        help="traditional map.")
+    parser.add_argument('-steps', dest='steps', type=int, default=200)
+    parser.add_argument('-workers', dest='workers', type=int,
+                        default=os.cpu_count() or 4)
+    parser.add_argument('-cache', dest='cache', default='tournament_cache.jsonl',
+                        metavar='FILE')
+    parser.add_argument('-disagreements', dest='disagreements', type=int, default=10,
+                        help="maps listed per agent.")
+    parser.add_argument('-out', dest='out', default=None, metavar='FILE',
+                        help="write the summaries as JSON.")
+    args = parser.parse_args()
+
+    seeds = read_seeds(args.seeds) if args.seeds else range(args.seed, args.seed + args.maps)
+    tournament = Tournament(args.agents, seeds, max_steps=args.steps,
+                            traditional=args.t_map, workers=args.workers,
+                            cache_path=args.cache)
+    tournament.run()
+    summaries = [tournament.summary(spec) for spec in tournament.agents]
+    print_summaries(summaries, args.disagreements)
+    if args.out:
+        with open(args.out, 'w') as file:
+            json.dump(summaries, file, indent=2)
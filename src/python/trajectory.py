@@ -0,0 +1,353 @@
+"""
+Trajectory datasets for offline learning
+Agent or human games are recorded step by step into .npy shards by a
+background writer, and loaded back memory-mapped for random minibatches
+"""
+
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from bitboard import Bitboard
+from fog_of_war import FOG_BOARDS
+
+META = 'meta.json'
+FACINGS = ('right', 'up', 'left', 'down')
+# user actions (GameSession.ACTIONS) and the agent ones (action/2 in main.pl)
+ACTIONS = (
+    'none', 'move', 'left', 'right', 'shoot', 'grab',
+    'collect', 'throw', 'wait', 'climb',
+)
+
+
+def step_dtype(width, height):
+    """Row of one step: the observation, then the action played from it"""
+    return np.dtype([
+        ('episode', np.int32),
+        ('step', np.int32),
+        ('sensors', np.uint8, (3,)),     # stench, breeze, glitter
+        ('pose', np.int16, (3,)),        # x, y, FACINGS index
+        ('inventory', np.int16, (4,)),   # arrows, rocks, goal, stunned
+        ('fog', np.uint8, ((width * height + 7) // 8,)),  # revealed cells, packed
+        ('action', np.uint8),            # ACTIONS index
+        ('target', np.int16, (2,)),      # rock throw target, -1 otherwise
+        ('reward', np.int32),            # score delta
+        ('done', np.bool_),              # the action ended the game
+    ])
+
+
+def read_meta(directory):
+    """Dataset description (None if the directory holds no dataset)"""
+    path = os.path.join(directory, META)
+    if not os.path.exists(path):
+        return None
+    with open(path) as file:
+        return json.load(file)
+
+
+class ShardWriter(threading.Thread):
+    """Background thread saving chunks of rows as .npy shards"""
+
+    def __init__(self, directory, first_shard=0, buffer_chunks=4):
+        """
+        Initialize the writer
+
+        Args:
+            directory: Dataset directory
+            first_shard: Number of the first shard written
+            buffer_chunks: Max chunks waiting to be written (caps memory,
+                recording blocks when the queue is full)
+        """
+        super().__init__(daemon=True)
+        self.directory = directory
+        self.next_shard = first_shard
+        self.chunks = queue.Queue(maxsize=buffer_chunks)
+        self.written = []  # (file name, rows)
+        self.error = None
+
+    def run(self):
+        try:
+            while True:
+                chunk = self.chunks.get()
+                if chunk is None:
+                    break
+                name = f'shard-{self.next_shard:05d}.npy'
+                path = os.path.join(self.directory, name)
+                # readers never see a partial shard
+                with open(path + '.tmp', 'wb') as file:
+                    np.save(file, chunk)
+                os.replace(path + '.tmp', path)
+                self.written.append((name, len(chunk)))
+                self.next_shard += 1
+        except Exception as error:  # reported by close()
+            self.error = error
+            # keep draining so the recorder never blocks on a dead writer
+            while self.chunks.get() is not None:
+                pass
+
+    def put(self, chunk):
+        """Queue a chunk (blocks while the queue is full)"""
+        self.chunks.put(chunk)
+
+    def close(self):
+        """Flush the queue and wait for the writer"""
+        self.chunks.put(None)
+        self.join()
+        if self.error:
+            raise self.error
+
+
+class TrajectoryRecorder:
+    """Steps of the games played in the engine, appended to a dataset"""
+
+    def __init__(self, directory, width=4, height=4, chunk_size=4096,
+                 buffer_chunks=4, source='agent'):
+        """
+        Open a dataset (new, or an existing one to append to)
+
+        Args:
+            directory: Dataset directory
+            width, height: Map size (every game of a dataset has the same)
+            chunk_size: Rows per shard
+            buffer_chunks: Max full chunks waiting for the writer
+            source: Who plays the recorded games ('agent', 'user', ...)
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.meta = read_meta(directory) or {
+            'width': width, 'height': height, 'source': source,
+            'actions': ACTIONS, 'facings': FACINGS,
+            'episodes': 0, 'shards': [],
+        }
+        if (self.meta['width'], self.meta['height']) != (width, height):
+            raise ValueError(
+                f"{directory} holds {self.meta['width']}x{self.meta['height']} games")
+
+        self.dtype = step_dtype(width, height)
+        self.chunk_size = chunk_size
+        self.chunk = np.empty(chunk_size, self.dtype)
+        self.rows = 0
+
+        # bits of the inside cells in the fog bitboards, row by row
+        board = Bitboard(width, height)
+        self.fog_bytes = (board.stride * (height + 2) + 7) // 8
+        self.fog_bits = np.array([
+            y * board.stride + x
+            for y in range(1, height + 1) for x in range(1, width + 1)
+        ])
+
+        self.writer = ShardWriter(
+            directory, first_shard=len(self.meta['shards']),
+            buffer_chunks=buffer_chunks)
+        self.writer.start()
+        self.episode = self.meta['episodes']
+        self.last = None
+
+    def fog(self):
+        """Revealed cells of the current game, packed bits"""
+        revealed, _ = FOG_BOARDS.once()
+        bits = np.unpackbits(
+            np.frombuffer(revealed.to_bytes(self.fog_bytes, 'little'), np.uint8),
+            bitorder='little')
+        return np.packbits(bits[self.fog_bits])
+
+    def begin(self, obs):
+        """Start an episode from the first observation of a game"""
+        if self.last is not None:
+            self.end()
+        self.last = (obs, self.fog())
+        self.steps = 0
+
+    def step(self, action, obs, target=None):
+        """
+        Record the previous observation with the action played from it
+
+        Args:
+            action: Action played (see ACTIONS, None if nothing was played)
+            obs: Observation after the action (GameSession.observe)
+            target: Rock throw target cell
+        """
+        if self.last is None:
+            return  # turn played after the end of the game
+        prev, fog = self.last
+        done = obs['status'] != 'playing'
+        self.chunk[self.rows] = (
+            self.episode,
+            self.steps,
+            (prev['stench'], prev['breeze'], prev['glitter']),
+            (prev['x'], prev['y'], FACINGS.index(prev['facing'])),
+            (prev['arrows'], prev['rocks'], prev['goal'], prev['stunned']),
+            fog,
+            ACTIONS.index(action or 'none'),
+            target or (-1, -1),
+            obs['score'] - prev['score'],
+            done,
+        )
+        self.rows += 1
+        self.steps += 1
+        if self.rows == self.chunk_size:
+            self.flush()
+
+        if done:
+            self.end()
+        else:
+            self.last = (obs, self.fog())
+
+    def end(self):
+        """Close the episode (unfinished games end without a done row)"""
+        if self.last is not None:
+            self.episode += 1
+            self.last = None
+
+    def flush(self):
+        """Hand the current chunk to the writer"""
+        if self.rows:
+            self.writer.put(self.chunk[:self.rows])
+            self.chunk = np.empty(self.chunk_size, self.dtype)
+            self.rows = 0
+
+    def close(self):
+        """Write the last chunk and the dataset description"""
+        self.end()
+        self.flush()
+        self.writer.close()
+        self.meta['episodes'] = self.episode
+        self.meta['shards'] += [
+            {'file': name, 'rows': rows} for name, rows in self.writer.written
+        ]
+        with open(os.path.join(self.directory, META), 'w') as file:
+            json.dump(self.meta, file, indent=2)
+
+
+class TrajectoryDataset:
+    """Recorded steps, memory-mapped from the shards (read on access)"""
+
+    def __init__(self, directory):
+        """
+        Map the shards of a dataset
+
+        Args:
+            directory: Dataset directory (see TrajectoryRecorder)
+        """
+        self.meta = read_meta(directory)
+        if self.meta is None:
+            raise FileNotFoundError(f"No dataset in {directory}")
+        self.width, self.height = self.meta['width'], self.meta['height']
+        self.shards = [
+            np.load(os.path.join(directory, shard['file']), mmap_mode='r')
+            for shard in self.meta['shards']
+        ]
+        self.offsets = np.cumsum([0] + [len(shard) for shard in self.shards])
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def rows(self, start, stop):
+        """Consecutive rows: a view of the mapped file if in one shard"""
+        shard = int(np.searchsorted(self.offsets, start, side='right')) - 1
+        offset = self.offsets[shard]
+        if stop <= self.offsets[shard + 1]:
+            return self.shards[shard][start - offset:stop - offset]
+        return self.batch(np.arange(start, stop))
+
+    def batch(self, indices):
+        """Rows at arbitrary indices (only these rows are read)"""
+        indices = np.asarray(indices)
+        shards = np.searchsorted(self.offsets, indices, side='right') - 1
+        batch = np.empty(len(indices), self.shards[0].dtype)
+        for shard in np.unique(shards):
+            selected = shards == shard
+            batch[selected] = self.shards[shard][indices[selected] - self.offsets[shard]]
+        return batch
+
+    def sample(self, batch_size, rng=None):
+        """Uniform random minibatch"""
+        rng = rng or np.random.default_rng()
+        return self.batch(rng.integers(len(self), size=batch_size))
+
+    def fog_masks(self, rows):
+        """Revealed cells of rows as (n, height, width) booleans"""
+        cells = self.width * self.height
+        bits = np.unpackbits(rows['fog'], axis=1, count=cells)
+        return bits.reshape(-1, self.height, self.width).astype(bool)
+
+
+def record_agent_games(directory, games=100, seed=0, max_steps=200,
+                       traditional=False, size=None, chunk_size=4096):
+    """
+    Record agent games into a dataset
+
+    Returns:
+        dict with episode and step counts and seconds
+    """
+    from engine import get_engine
+    from game_session import GameSession
+
+    width, height = size or (4, 4)
+    recorder = TrajectoryRecorder(directory, width, height, chunk_size=chunk_size)
+    game = GameSession(get_engine())
+    steps = 0
+    start = time.perf_counter()
+    for map_seed in range(seed, seed + games):
+        obs = game.new_game(traditional=traditional, seed=map_seed, size=size)
+        recorder.begin(obs)
+        for _ in range(max_steps):
+            obs = game.act('agent')
+            recorder.step(game.agent_action(), obs)
+            steps += 1
+            if obs['status'] != 'playing':
+                break
+    recorder.close()
+    return {'episodes': games, 'steps': steps,
+            'seconds': time.perf_counter() - start}
+
+
+def describe(directory, batch_size=256, batches=200):
+    """Print the dataset size, outcome and minibatch throughput"""
+    dataset = TrajectoryDataset(directory)
+    if not len(dataset):
+        print("empty dataset")
+        return
+    rows = dataset.rows(0, len(dataset))
+    print(f"{len(dataset)} steps, {dataset.meta['episodes']} episodes, "
+          f"{len(dataset.shards)} shards ({dataset.meta['source']})")
+    print(f"done rows: {int(rows['done'].sum())}, "
+          f"mean reward: {float(rows['reward'].mean()):.2f}")
+
+    rng = np.random.default_rng(0)
+    start = time.perf_counter()
+    for _ in range(batches):
+        batch = dataset.sample(batch_size, rng)
+        dataset.fog_masks(batch)
+    elapsed = time.perf_counter() - start
+    print(f"minibatches of {batch_size}: {batches / elapsed:.0f}/s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Record agent games as a memory-mapped trajectory dataset")
+    parser.add_argument('directory', help="dataset directory (appended to).")
+    parser.add_argument('-games', dest='games', type=int, default=100,
+                        help="agent games to record (0: only describe).")
+    parser.add_argument('-seed', dest='seed', type=int, default=0)
+    parser.add_argument('-steps', dest='steps', type=int, default=200)
+    parser.add_argument('-map', dest='t_map', action='store_true',
+                        help="traditional map.")
+    parser.add_argument('-cave', dest='cave', type=int, nargs=2, default=None,
+                        metavar=('WIDTH', 'HEIGHT'))
+    parser.add_argument('-chunk', dest='chunk', type=int, default=4096,
+                        help="steps per shard.")
+    parser.add_argument('-batch', dest='batch', type=int, default=256)
+    args = parser.parse_args()
+
+    if args.games:
+        stats = record_agent_games(
+            args.directory, args.games, args.seed, args.steps,
+            traditional=args.t_map, size=args.cave, chunk_size=args.chunk)
+        print('{episodes} episodes, {steps} steps recorded in {seconds:.2f}s'.format(**stats))
+    describe(args.directory, args.batch)
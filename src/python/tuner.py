@@ -0,0 +1,235 @@
+"""
+Parallel random-search tuner for the agent heuristic constants
+Every candidate setting plays the same seeded maps (see AGENT PARAMETERS
+in main.pl), results are cached per (setting, seed) in a JSON-lines file
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import statistics
+
+from bridge import Compound, predicate
+from engine import fork_context, get_engine
+from game_session import GameSession
+
+SET_AGENT_PARAMS = predicate('set_agent_params', 1)
+RESET_AGENT_PARAMS = predicate('reset_agent_params', 0)
+AGENT_PARAM = predicate('agent_param', 2)
+
+# Search range of each parameter (defaults in main.pl)
+SEARCH_SPACE = {
+    'pit_sure': (200, 3000),
+    'pit_maybe': (20, 600),
+    'wumpus_sure': (200, 3000),
+    'wumpus_maybe': (20, 600),
+    'none': (0, 100),
+    'unsafe_sentinel': (500, 20000),
+    'visit_penalty': (0, 100),
+    'turn_discount': (0, 100),
+}
+def set_agent_params(params):
+    """Supply a setting (dict name -> value) to the agent"""
+    if not SET_AGENT_PARAMS.call(
+            [Compound('=', name, value) for name, value in params.items()]):
+        raise ValueError(f"Invalid agent parameters: {params}")
+
+
+def default_params():
+    """Default setting of the agent, as defined in main.pl (resets the engine setting)"""
+    RESET_AGENT_PARAMS.call()
+    # the pairs of agent_params/1, as [name, value] rows instead of = terms
+    return {name: value for name, value in AGENT_PARAM.all()}
+
+
+def play(task):
+    """
+    Pool worker: play one agent game with a setting
+
+    Args:
+        task: (params, seed, max_steps), params a sorted tuple of pairs
+
+    Returns:
+        (params, seed, result dict)
+    """
+    params, seed, max_steps = task
+    set_agent_params(dict(params))
+
+    game = GameSession(get_engine())
+    obs = game.new_game(seed=seed)
+    steps = 0
+    while obs['status'] == 'playing' and steps < max_steps:
+        obs = game.act('agent')
+        steps += 1
+
+    return params, seed, {
+        'score': obs['score'],
+        'won': obs['status'] == 'won',
+        'steps': steps,
+    }
+
+
+def mean_ci(values, z=1.96):
+    """Mean and half width of its normal confidence interval"""
+    if len(values) < 2:
+        return (values[0] if values else 0.0), float('inf')
+    return statistics.mean(values), z * statistics.stdev(values) / math.sqrt(len(values))
+
+
+def wilson_ci(successes, n, z=1.96):
+    """Wilson score interval of a rate"""
+    if n == 0:
+        return 0.0, 1.0
+    rate = successes / n
+    center = (rate + z * z / (2 * n)) / (1 + z * z / n)
+    half = z * math.sqrt(rate * (1 - rate) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+class Tuner:
+    """Random search over SEARCH_SPACE on a fixed set of seeded maps"""
+
+    def __init__(self, maps=50, seed=0, max_steps=200, workers=4,
+                 cache_path='tuner_cache.jsonl'):
+        """
+        Initialize the tuner
+
+        Args:
+            maps: Number of seeded maps every setting plays
+            seed: First map seed (maps use seed, seed + 1, ...)
+            max_steps: Agent steps before a game counts as unfinished
+            workers: Process pool size
+            cache_path: JSON-lines cache of (setting, seed) results
+        """
+        self.seeds = list(range(seed, seed + maps))
+        self.max_steps = max_steps
+        self.workers = workers
+        self.cache_path = cache_path
+        self.cache = {}
+        self.load_cache()
+
+    @staticmethod
+    def key(params):
+        """Hashable form of a setting: pairs sorted by name"""
+        return tuple(sorted(params.items()))
+
+    def load_cache(self):
+        """Read the results of previous runs"""
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        with open(self.cache_path) as file:
+            for line in file:
+                entry = json.loads(line)
+                if entry['max_steps'] == self.max_steps:
+                    params = self.key(entry['params'])
+                    self.cache[(params, entry['seed'])] = entry['result']
+
+    def evaluate(self, candidates):
+        """Play every missing (setting, seed) game on the process pool"""
+        tasks = [
+            (self.key(params), seed, self.max_steps)
+            for params in candidates for seed in self.seeds
+            if (self.key(params), seed) not in self.cache
+        ]
+        if not tasks:
+            return
+
+        # workers are forked with the knowledge base already loaded
+        context = fork_context()
+        cache_file = open(self.cache_path, 'a') if self.cache_path else None
+        try:
+            with context.Pool(self.workers) as pool:
+                for done, (params, seed, result) in enumerate(
+                        pool.imap_unordered(play, tasks, chunksize=4), 1):
+                    self.cache[(params, seed)] = result
+                    if cache_file:
+                        cache_file.write(json.dumps({
+                            'params': dict(params), 'seed': seed,
+                            'max_steps': self.max_steps, 'result': result,
+                        }) + '\n')
+                    if done % 100 == 0 or done == len(tasks):
+                        print(f'  {done}/{len(tasks)} games')
+        finally:
+            if cache_file:
+                cache_file.close()
+
+    def summary(self, params, baseline=None):
+        """Score and win rate with confidence intervals over the map set"""
+        results = [self.cache[(self.key(params), seed)] for seed in self.seeds]
+        scores = [result['score'] for result in results]
+        wins = sum(result['won'] for result in results)
+        summary = {
+            'params': params,
+            'score': mean_ci(scores),
+            'win_rate': wins / len(results),
+            'win_ci': wilson_ci(wins, len(results)),
+        }
+        if baseline is not None:
+            # same maps for both settings: paired differences
+            base = [self.cache[(self.key(baseline), seed)]['score']
+                    for seed in self.seeds]
+            summary['delta'] = mean_ci([s - b for s, b in zip(scores, base)])
+        return summary
+
+    def search(self, candidates=32, rng_seed=0):
+        """
+        Random search, the default setting is always evaluated first
+
+        Returns:
+            Summaries of all the settings, best mean score first
+        """
+        rng = random.Random(rng_seed)
+        defaults = default_params()
+        settings = [defaults] + [
+            {name: rng.randint(low, high) for name, (low, high) in SEARCH_SPACE.items()}
+            for _ in range(candidates)
+        ]
+        self.evaluate(settings)
+        summaries = [self.summary(params, defaults) for params in settings]
+        summaries.sort(key=lambda summary: summary['score'][0], reverse=True)
+        return summaries
+
+
+def print_summaries(summaries, top=5):
+    """Table of the best settings"""
+    print(f"{'#':<4}{'score':>18}{'vs default':>18}{'win rate':>22}")
+    for rank, summary in enumerate(summaries[:top], 1):
+        score, score_ci = summary['score']
+        delta, delta_ci = summary['delta']
+        low, high = summary['win_ci']
+        print("{:<4}{:>9.1f} +-{:>6.1f}{:>+9.1f} +-{:>6.1f}{:>8.1%} [{:.1%}, {:.1%}]".format(
+            rank, score, score_ci, delta, delta_ci, summary['win_rate'], low, high))
+
+    best = summaries[0]['params']
+    print('best setting:', json.dumps(best))
+    print('set_agent_params([{}]).'.format(
+        ', '.join(f'{name}={value}' for name, value in sorted(best.items()))))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Tune the agent heuristic constants (random search)")
+    parser.add_argument('-candidates', dest='candidates', type=int, default=32)
+    parser.add_argument('-maps', dest='maps', type=int, default=50,
+                        help="seeded maps played by every setting.")
+    parser.add_argument('-seed', dest='seed', type=int, default=0,
+                        help="first map seed (also seeds the search).")
+    parser.add_argument('-steps', dest='steps', type=int, default=200)
+    parser.add_argument('-workers', dest='workers', type=int,
+                        default=os.cpu_count() or 4)
+    parser.add_argument('-cache', dest='cache', default='tuner_cache.jsonl',
+                        metavar='FILE')
+    parser.add_argument('-top', dest='top', type=int, default=5)
+    parser.add_argument('-out', dest='out', default=None, metavar='FILE',
+                        help="write the best setting as JSON.")
+    args = parser.parse_args()
+
+    tuner = Tuner(maps=args.maps, seed=args.seed, max_steps=args.steps,
+                  workers=args.workers, cache_path=args.cache)
+    summaries = tuner.search(candidates=args.candidates, rng_seed=args.seed)
+    print_summaries(summaries, args.top)
+    if args.out:
+        with open(args.out, 'w') as file:
+            json.dump(summaries[0]['params'], file, indent=2)
@@ -5,6 +5,15 @@ UI Components for Enhanced Turn-based Wumpus World
 import pygame
 import os
 
+from bridge import predicate
+
+H_ARROW = predicate('h_arrow', 1)
+H_ROCKS = predicate('h_rocks', 1)
+H_SCORE = predicate('h_score', 1)
+THROW_ROCK = predicate('throw_rock', 2)
+WUMPUS_STATE = predicate('wumpus_state', 2)
+IS_PLAYER_STUNNED = predicate('is_player_stunned', 0)
+
 
 class InventoryDisplay:
     """Display player inventory (arrows, rocks, health)"""
@@ -39,15 +48,11 @@ class InventoryDisplay:
             return {'arrows': 1, 'rocks': 2, 'health': 100}
         
         try:
-            arrows_result = list(self.prolog.query("h_arrow(A)."))
-            arrows = arrows_result[0]['A'] if arrows_result else 0
-            
-            rocks_result = list(self.prolog.query("h_rocks(R)."))
-            rocks = rocks_result[0]['R'] if rocks_result else 0
+            arrows = H_ARROW.value() or 0
+            rocks = H_ROCKS.value() or 0
             
             # Health is represented by score penalties (simplified)
-            score_result = list(self.prolog.query("h_score(S)."))
-            score = score_result[0]['S'] if score_result else 0
+            score = H_SCORE.value() or 0
             
             return {'arrows': arrows, 'rocks': rocks, 'score': score}
         except:
@@ -140,7 +145,7 @@ class RockAimingOverlay:
         # Execute throw in Prolog
         if self.prolog:
             try:
-                list(self.prolog.query(f"throw_rock({tx}, {ty})."))
+                THROW_ROCK.call(tx, ty)
                 self.aiming = False
                 return True
             except:
@@ -235,9 +240,9 @@ class TurnIndicator:
             return "Unknown"
         
         try:
-            result = list(self.prolog.query("wumpus_state(1, State)."))
-            if result:
-                return result[0]['State']
+            state = WUMPUS_STATE.value(1)
+            if state:
+                return state
         except:
             pass
         
@@ -249,8 +254,7 @@ class TurnIndicator:
             return False
         
         try:
-            result = list(self.prolog.query("is_player_stunned."))
-            return len(result) > 0
+            return IS_PLAYER_STUNNED.exists()
         except:
             return False
     
@@ -0,0 +1,353 @@
+"""
+Scrolling camera for large caves (see createCave/2 in main.pl)
+Only the cells inside the viewport are drawn, with a minimap and an
+optional level-of-detail mode when zoomed far out
+"""
+
+import argparse
+import math
+import time
+
+import pygame
+
+from bitboard import Bitboard
+from bridge import predicate
+from fog_of_war import FOG_BOARDS
+from renderer import SpriteCache
+
+W_SIZE = predicate('w_size', 2)
+W_PIT = predicate('w_pit', 2)
+W_HUNTER = predicate('w_hunter', 3)
+W_WUMPUS = predicate('w_wumpus', 2)
+W_GOLD = predicate('w_gold', 2)
+CHEST = predicate('chest', 4)
+CHEST_OPENED = predicate('chest_opened', 1)
+ROCK_PICKUP = predicate('rock_pickup', 2)
+GET_SENSORS = predicate('getSensors', 1)
+
+ZOOM_LEVELS = (147, 96, 64, 40, 24, 12, 6)  # cell sizes in pixels
+LOD_CELL = 24  # smaller cells are drawn as flat colors in LOD mode
+
+COLORS = {
+    'background': (10, 10, 10),
+    'floor': (45, 40, 35),
+    'pit': (15, 15, 25),
+    'hunter': (60, 160, 255),
+    'wumpus': (200, 40, 40),
+    'gold': (255, 215, 0),
+    'treasure': (139, 69, 19),
+    'mimic': (160, 50, 30),
+    'rock': (150, 150, 150),
+}
+
+
+class Camera:
+    """Viewport onto the grid, centred on a smoothly followed cell"""
+
+    def __init__(self, width, height, world_width, world_height, cell=147):
+        """
+        Initialize the camera
+
+        Args:
+            width, height: Viewport size in pixels
+            world_width, world_height: Map size in cells (without walls)
+            cell: Cell size in pixels
+        """
+        self.width = width
+        self.height = height
+        self.world_width = world_width
+        self.world_height = world_height
+        self.cell = cell
+        self.cx, self.cy = 1.0, 1.0  # cell at the centre of the viewport
+
+    def follow(self, x, y, smoothing=0.25):
+        """Move the centre toward a cell (1 jumps straight to it)"""
+        self.cx += (x - self.cx) * smoothing
+        self.cy += (y - self.cy) * smoothing
+        self.clamp()
+
+    def clamp(self):
+        """Keep the viewport on the map (centred if the map is smaller)"""
+        def axis(center, size, pixels):
+            half = pixels / 2 / self.cell
+            if size <= 2 * half:
+                return (size + 1) / 2
+            return min(max(center, 0.5 + half), size + 0.5 - half)
+
+        self.cx = axis(self.cx, self.world_width, self.width)
+        self.cy = axis(self.cy, self.world_height, self.height)
+
+    def to_screen(self, x, y):
+        """Pixel centre of a cell"""
+        return (
+            self.width / 2 + (x - self.cx) * self.cell,
+            self.height / 2 - (y - self.cy) * self.cell,
+        )
+
+    def cell_rect(self, x, y):
+        """Pixel rect of a cell"""
+        px, py = self.to_screen(x, y)
+        half = self.cell / 2
+        return pygame.Rect(int(px - half), int(py - half), self.cell, self.cell)
+
+    def visible_cells(self):
+        """x and y ranges of the cells intersecting the viewport"""
+        half_x = self.width / 2 / self.cell + 0.5
+        half_y = self.height / 2 / self.cell + 0.5
+        return (
+            range(max(1, math.floor(self.cx - half_x)),
+                  min(self.world_width, math.ceil(self.cx + half_x)) + 1),
+            range(max(1, math.floor(self.cy - half_y)),
+                  min(self.world_height, math.ceil(self.cy + half_y)) + 1),
+        )
+
+
+class Minimap:
+    """Whole map at a few pixels per cell, revealed cells drawn once"""
+
+    def __init__(self, width, height, max_size=160):
+        """
+        Initialize the minimap
+
+        Args:
+            width, height: Map size in cells
+            max_size: Longest side of the minimap in pixels
+        """
+        self.board = Bitboard(width, height)
+        self.scale = max(1, max_size // max(width, height))
+        self.surface = pygame.Surface((width * self.scale, height * self.scale))
+        self.surface.fill(COLORS['background'])
+        self.revealed = 0
+
+    def cell_rect(self, x, y):
+        """Minimap rect of a cell"""
+        return pygame.Rect(
+            (x - 1) * self.scale,
+            (self.board.height - y) * self.scale,
+            self.scale, self.scale)
+
+    def reveal(self, revealed, pits):
+        """Draw the cells revealed since the last call"""
+        new = revealed & ~self.revealed
+        for x, y in self.board.cells(new):
+            color = COLORS['pit'] if (x, y) in pits else COLORS['floor']
+            self.surface.fill(color, self.cell_rect(x, y))
+        self.revealed = revealed
+
+    def draw(self, surface, camera, hunter, position):
+        """Blit the minimap with the hunter and the viewport outline"""
+        left, top = position
+        surface.blit(self.surface, position)
+        rect = self.cell_rect(*hunter).move(left, top)
+        surface.fill(COLORS['hunter'], rect.inflate(2, 2))
+
+        xs, ys = camera.visible_cells()
+        view = self.cell_rect(xs.start, ys.stop - 1).union(
+            self.cell_rect(xs.stop - 1, ys.start)).move(left, top)
+        pygame.draw.rect(surface, (230, 230, 230), view, 1)
+        pygame.draw.rect(surface, (90, 90, 90), self.surface.get_rect(topleft=position), 1)
+
+
+class CameraView:
+    """All the drawable state of the game loaded in prolog, for any map size"""
+
+    def __init__(self, surface, prolog_engine=None, lod=False, end_screen=None):
+        """
+        Read the static layout and set up the camera
+
+        Args:
+            surface: Surface the view is drawn on (its size is the viewport)
+            prolog_engine: Prolog engine for the HUD components
+            lod: Draw flat colors instead of sprites when zoomed far out
+            end_screen: Function drawing the win/lose message on a surface,
+                returns if the game is over
+        """
+        from date import FONT
+        from ui_components import InventoryDisplay, TurnIndicator
+
+        width, height = W_SIZE.once()
+        self.board = Bitboard(width, height)
+        self.pits = set(W_PIT.all())  # pits never move: read once
+
+        view_w, view_h = surface.get_size()
+        fits = [cell for cell in ZOOM_LEVELS
+                if cell * width <= view_w and cell * height <= view_h]
+        self.zoom = ZOOM_LEVELS.index(fits[0] if fits else 64)
+        self.camera = Camera(view_w, view_h, width, height, ZOOM_LEVELS[self.zoom])
+        self.lod = lod
+        self.sprites = {}  # cell size -> SpriteCache
+        self.dim = {}      # cell size -> dim fog surface
+
+        self.minimap = Minimap(width, height)
+        self.show_minimap = max(width, height) > 4
+        self.end_screen = end_screen
+
+        self.font = pygame.font.Font(FONT, 18)
+        self.inventory_ui = InventoryDisplay(FONT, prolog_engine=prolog_engine)
+        self.turn_indicator = TurnIndicator(FONT, prolog_engine=prolog_engine)
+        self.rock_aiming_ui = None  # rock aiming needs the fixed 4x4 layout
+
+        self.hunter = None
+        self.revealed = self.visible = 0
+        self.update()
+        self.camera.follow(*self.hunter[:2], smoothing=1)
+
+    def sprite_cache(self, cell):
+        """Sprites scaled for a cell size (built once per zoom level)"""
+        if cell not in self.sprites:
+            self.sprites[cell] = SpriteCache(cell)
+            dim = pygame.Surface((cell, cell))
+            dim.set_alpha(120)
+            self.dim[cell] = dim
+        return self.sprites[cell]
+
+    def handle_key(self, event):
+        """Camera keys: +/- zoom, m minimap, l level of detail"""
+        if event.key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+            self.zoom = max(0, self.zoom - 1)
+        elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+            self.zoom = min(len(ZOOM_LEVELS) - 1, self.zoom + 1)
+        elif event.key == pygame.K_m:
+            self.show_minimap = not self.show_minimap
+            return True
+        elif event.key == pygame.K_l:
+            self.lod = not self.lod
+            return True
+        else:
+            return False
+        self.camera.cell = ZOOM_LEVELS[self.zoom]
+        self.camera.clamp()
+        return True
+
+    def update(self):
+        """Read the moving elements from prolog and follow the hunter"""
+        hunter = W_HUNTER.once()
+        if hunter != self.hunter:
+            # the fog only changes when the hunter moves or turns
+            self.revealed, self.visible = FOG_BOARDS.once()
+            self.minimap.reveal(self.revealed, self.pits)
+        self.hunter = hunter
+
+        self.wumpus = W_WUMPUS.once()
+        gold = W_GOLD.once()
+        self.gold = gold if gold != (0, 0) else None
+        opened = {chest_id for chest_id, in CHEST_OPENED.all()}
+        self.chests = [
+            (x, y, 'treasure' if chest_type == 'treasure' or chest_id in opened
+             else 'mimic', int(chest_id in opened))
+            for chest_id, x, y, chest_type in CHEST.all()
+        ]
+        self.rocks = ROCK_PICKUP.all()
+        self.sensors = GET_SENSORS.value()
+        self.camera.follow(*hunter[:2])
+
+    def entities(self):
+        """(x, y, kind, detail) of the moving elements, bottom layer first"""
+        for x, y in self.rocks:
+            yield x, y, 'rock', None
+        for x, y, chest_type, opened in self.chests:
+            yield x, y, chest_type, opened
+        if self.gold:
+            yield self.gold[0], self.gold[1], 'gold', None
+        if self.wumpus:
+            yield self.wumpus[0], self.wumpus[1], 'wumpus', None
+        yield self.hunter[0], self.hunter[1], 'hunter', self.hunter[2]
+
+    def draw(self, surface):
+        """Draw the cells and elements inside the viewport, then the HUD"""
+        camera = self.camera
+        cell = camera.cell
+        lod = self.lod and cell < LOD_CELL
+        sprites = None if lod else self.sprite_cache(cell)
+        board = self.board
+        xs, ys = camera.visible_cells()
+
+        surface.fill(COLORS['background'])
+        for x in xs:
+            for y in ys:
+                if not board.has(self.revealed, x, y):
+                    continue  # never seen: stays dark
+                rect = camera.cell_rect(x, y)
+                surface.fill(COLORS['floor'], rect.inflate(-1, -1))
+                if (x, y) in self.pits:
+                    if lod:
+                        surface.fill(COLORS['pit'], rect)
+                    else:
+                        surface.blit(sprites.pit, sprites.pit.get_rect(center=rect.center))
+
+        for x, y, kind, detail in self.entities():
+            if x not in xs or y not in ys or not board.has(self.revealed, x, y):
+                continue
+            rect = camera.cell_rect(x, y)
+            if lod:
+                surface.fill(COLORS[kind], rect.inflate(-cell // 3, -cell // 3))
+                continue
+            if kind == 'hunter':
+                image = sprites.hunter[detail]
+            elif kind in ('treasure', 'mimic'):
+                image = sprites.chests[(kind, detail)]
+            else:
+                image = getattr(sprites, kind)
+            surface.blit(image, image.get_rect(center=rect.center))
+
+        if not lod:
+            dim = self.dim[cell]
+            for x in xs:
+                for y in ys:
+                    if (board.has(self.revealed, x, y)
+                            and not board.has(self.visible, x, y)):
+                        surface.blit(dim, camera.cell_rect(x, y))
+
+        self.draw_hud(surface)
+
+    def draw_hud(self, surface):
+        """Inventory, turn, perceptions and minimap"""
+        self.inventory_ui.draw(surface, position=(10, 10))
+        self.turn_indicator.draw(surface, position=(10, surface.get_height() - 90))
+
+        names = [name for name, on in zip(('stench', 'breeze', 'glitter'), self.sensors) if on]
+        if names:
+            text = self.font.render(' '.join(names), True, (255, 255, 255))
+            surface.blit(text, (10, surface.get_height() - 120))
+
+        if self.show_minimap:
+            left = surface.get_width() - self.minimap.surface.get_width() - 10
+            self.minimap.draw(surface, self.camera, self.hunter[:2], (left, 10))
+
+    def draw_end(self, surface):
+        """Draw the win/lose message if the game is over, return if it is"""
+        return self.end_screen(surface) if self.end_screen else False
+
+
+def frame_bench(sizes=(4, 16, 64, 128), frames=200, seed=0):
+    """Frame time of the camera view for growing caves (flat if culled)"""
+    from engine import get_engine
+    from game_session import GameSession
+    from renderer import OffscreenRenderer
+
+    surface = OffscreenRenderer().surface
+
+    game = GameSession(get_engine())
+    print(f"{'cave':>10}{'pits':>8}{'ms/frame':>10}")
+    for size in sizes:
+        game.new_game(seed=seed, size=(size, size))
+        view = CameraView(surface, prolog_engine=get_engine(), lod=True)
+        view.draw(surface)  # sprite cache
+        start = time.perf_counter()
+        for _ in range(frames):
+            view.update()
+            view.draw(surface)
+        elapsed = (time.perf_counter() - start) / frames
+        print(f"{size}x{size:<6}{len(view.pits):>8}{elapsed * 1000:>10.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Camera view frame time on growing caves (offscreen)")
+    parser.add_argument('-sizes', dest='sizes', type=int, nargs='+',
+                        default=[4, 16, 64, 128])
+    parser.add_argument('-frames', dest='frames', type=int, default=200)
+    parser.add_argument('-seed', dest='seed', type=int, default=0)
+    args = parser.parse_args()
+
+    frame_bench(args.sizes, args.frames, args.seed)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the game modules are flat scripts in src/python
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, 'src', 'python'))
@@ -0,0 +1,119 @@
+import urllib.request
+
+import pytest
+
+import metrics
+from metrics import Counter, Gauge, GameMetrics, Histogram, Registry
+
+
+def sample_lines(text):
+    return [line for line in text.splitlines() if not line.startswith('#')]
+
+
+def test_expose_counters_and_labels():
+    registry = Registry()
+    plain = registry.add(Counter('games_total', 'Games.'))
+    labelled = registry.add(Counter('ends_total', 'Ends.', ('status', 'cause')))
+    assert sample_lines(registry.expose()) == ['games_total 0']
+
+    plain.inc()
+    plain.inc(2)
+    labelled.inc(1, 'lost', 'pit')
+    labelled.inc(1, 'lost', 'say "hi"')
+    text = registry.expose()
+    assert '# HELP games_total Games.' in text
+    assert '# TYPE ends_total counter' in text
+    assert sample_lines(text) == [
+        'games_total 3',
+        'ends_total{status="lost",cause="pit"} 1',
+        'ends_total{status="lost",cause="say \\"hi\\""} 1',
+    ]
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    histogram = registry.add(Histogram('latency_seconds', 'Latency.', (0.1, 1.0)))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+    assert sample_lines(registry.expose()) == [
+        'latency_seconds_bucket{le="0.1"} 2',
+        'latency_seconds_bucket{le="1.0"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        'latency_seconds_sum 2.65',
+        'latency_seconds_count 4',
+    ]
+
+
+def test_drain_restarts_counters_and_histograms():
+    registry = Registry()
+    counter = registry.add(Counter('steps_total', 'Steps.'))
+    histogram = registry.add(Histogram('latency_seconds', 'Latency.', (1.0,)))
+    gauge = registry.add(Gauge('facts', 'Facts.', ('predicate',)))
+    counter.inc(5)
+    histogram.observe(0.5)
+    gauge.set(7, 'a_costs')
+
+    snapshot = registry.drain()
+    assert snapshot == {
+        'steps_total': {(): 5},
+        'latency_seconds': ([1, 0], 0.5),
+        'facts': {('a_costs',): 7},
+    }
+    # gauges keep their value, the rest starts over
+    assert registry.drain() == {
+        'steps_total': {},
+        'latency_seconds': ([0, 0], 0.0),
+        'facts': {('a_costs',): 7},
+    }
+
+
+def test_merge_adds_counters_and_keeps_one_gauge_value_per_part():
+    def worker(steps, facts):
+        registry = GameMetrics()
+        registry.agent_steps.inc(steps)
+        registry.step_seconds.observe(0.002)
+        registry.facts.set(facts, 'fog_revealed')
+        return registry.drain()
+
+    server = GameMetrics()
+    server.merge(worker(3, 10), part=0)
+    server.merge(worker(4, 20), part=1)
+    server.merge(worker(1, 12), part=0)  # replaces the gauge of part 0
+
+    lines = sample_lines(server.expose())
+    assert 'wumpus_agent_steps_total 8' in lines
+    assert 'wumpus_agent_step_seconds_count 3' in lines
+    assert 'wumpus_facts{predicate="fog_revealed"} 32' in lines
+
+
+def test_record_turn():
+    registry = GameMetrics()
+    registry.record_turn('agent', 0.003, [['environment_turn', 0.0004], ['stun', 1]],
+                         [['a_costs', 9]], ['lost', 'pit'], queries=5)
+    registry.record_turn('move', None, [], [['a_costs', 11]], [], queries=8)
+    lines = sample_lines(registry.expose())
+    assert 'wumpus_agent_steps_total 1' in lines
+    assert 'wumpus_player_stuns_total 1' in lines
+    assert 'wumpus_games_finished_total{status="lost",cause="pit"} 1' in lines
+    assert 'wumpus_prolog_queries_total 8' in lines
+    assert 'wumpus_environment_turn_seconds_count 1' in lines
+    assert 'wumpus_agent_step_seconds_count 1' in lines
+    assert 'wumpus_facts{predicate="a_costs"} 11' in lines
+
+
+@pytest.fixture
+def served():
+    registry = GameMetrics()
+    server = metrics.serve(registry, 0)
+    yield registry, server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+def test_http_endpoint(served):
+    registry, port = served
+    registry.games_started.inc()
+    with urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics') as reply:
+        assert reply.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+        body = reply.read().decode()
+    assert 'wumpus_games_started_total 1' in body
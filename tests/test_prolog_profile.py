@@ -0,0 +1,104 @@
+import pytest
+
+from prolog_profile import Profile
+
+
+def batch(seconds, ticks, nodes):
+    return {'seconds': seconds, 'ticks': ticks, 'inferences': 1000}, nodes
+
+
+# main calls a and b, both call leaf (3 calls from a, 1 from b), leaf is
+# also recursive. 100 ticks of 0.01s
+NODES = [
+    ['main/0', 1, 0, 10, 90, [['<spontaneous>', 0, 0]]],
+    ['a/0', 3, 0, 20, 30, [['main/0', 3, 20]]],
+    ['b/0', 1, 0, 0, 10, [['main/0', 1, 0]]],
+    ['leaf/1', 4, 2, 40, 0, [['a/0', 3, 30], ['b/0', 1, 10], ['leaf/1', 5, 0]]],
+]
+
+
+@pytest.fixture
+def profile():
+    profile = Profile()
+    profile.add(*batch(1.0, 100, NODES))
+    return profile
+
+
+def test_add_merges_batches(profile):
+    profile.add(*batch(2.0, 100, NODES))  # ticks twice as long
+    assert profile.batches == 2
+    assert profile.seconds == 3.0
+    assert profile.inferences == 2000
+    leaf = profile.nodes['leaf/1']
+    assert (leaf['calls'], leaf['redos']) == (8, 4)
+    assert leaf['self'] == pytest.approx(1.2)
+    assert leaf['callers']['a/0'] == [6, pytest.approx(0.9)]
+
+
+def test_top(profile):
+    names = [name for name, _ in profile.top(2)]
+    assert names == ['leaf/1', 'a/0']
+    row = dict(profile.top(n=10, key='total'))['main/0']
+    assert row['total'] == pytest.approx(1.0)
+    assert [name for name, _ in profile.top(n=1, key='calls')] == ['leaf/1']
+
+
+def test_stacks_split_self_time_by_calls(profile):
+    stacks = profile.stacks()
+    assert stacks == {
+        'main/0': pytest.approx(0.1),
+        'main/0;a/0': pytest.approx(0.2),
+        'main/0;a/0;leaf/1': pytest.approx(0.3),
+        'main/0;b/0;leaf/1': pytest.approx(0.1),
+    }
+    # the time is split, never created or lost
+    assert sum(stacks.values()) == pytest.approx(0.7)
+
+
+def test_stacks_fall_back_to_ticks_without_port_counts():
+    nodes = [
+        ['main/0', 0, 0, 0, 10, [['<spontaneous>', 0, 0]]],
+        ['other/0', 0, 0, 0, 10, [['<spontaneous>', 0, 0]]],
+        ['leaf/0', 0, 0, 40, 0, [['main/0', 0, 30], ['other/0', 0, 10]]],
+    ]
+    profile = Profile()
+    profile.add(*batch(1.0, 100, nodes))
+    assert profile.stacks() == {
+        'main/0;leaf/0': pytest.approx(0.3),
+        'other/0;leaf/0': pytest.approx(0.1),
+    }
+
+
+def test_stacks_stop_on_cycles_and_depth():
+    nodes = [
+        ['p/0', 1, 0, 10, 0, [['q/0', 1, 0]]],
+        ['q/0', 1, 0, 0, 0, [['p/0', 1, 0]]],
+    ]
+    profile = Profile()
+    profile.add(*batch(1.0, 100, nodes))
+    # p is not repeated above q
+    assert profile.stacks() == {'q/0;p/0': pytest.approx(0.1)}
+    assert profile.stacks(max_depth=1) == {'p/0': pytest.approx(0.1)}
+
+
+def test_stacks_cut_small_shares_and_callers():
+    callers = [[f'c{i}/0', 1, 0] for i in range(20)]
+    nodes = [['leaf/0', 20, 0, 100, 0, callers]]
+    nodes += [[f'c{i}/0', 1, 0, 0, 0, [['<spontaneous>', 0, 0]]] for i in range(20)]
+    profile = Profile()
+    profile.add(*batch(1.0, 100, nodes))
+    assert len(profile.stacks(max_callers=5)) == 5
+    assert sum(profile.stacks(max_callers=5).values()) == pytest.approx(1.0)
+    # a share under min_share of the profile is not split
+    assert profile.stacks(min_share=2.0) == {'leaf/0': pytest.approx(1.0)}
+
+
+def test_write_collapsed(profile, tmp_path):
+    path = tmp_path / 'prolog.folded'
+    profile.write_collapsed(str(path))
+    assert path.read_text().splitlines() == [
+        'main/0 100000',
+        'main/0;a/0 200000',
+        'main/0;a/0;leaf/1 300000',
+        'main/0;b/0;leaf/1 100000',
+    ]
@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+import trajectory
+from bitboard import Bitboard
+from trajectory import ACTIONS, TrajectoryDataset, TrajectoryRecorder
+
+WIDTH, HEIGHT = 4, 3
+
+
+class FakeFogBoards:
+    """fog_boards/2 stand-in: reveals one more cell per call"""
+
+    def __init__(self):
+        self.board = Bitboard(WIDTH, HEIGHT)
+        self.cells = [(x, y) for y in range(1, HEIGHT + 1) for x in range(1, WIDTH + 1)]
+        self.calls = 0
+
+    def once(self):
+        revealed = 0
+        for x, y in self.cells[:self.calls % len(self.cells) + 1]:
+            revealed |= self.board.bit(x, y)
+        self.calls += 1
+        return revealed, 0
+
+
+def observation(step, status='playing'):
+    return {
+        'x': 1 + step % WIDTH, 'y': 1, 'facing': 'right',
+        'stench': step % 2, 'breeze': 0, 'glitter': 0,
+        'arrows': 1, 'rocks': 0, 'goal': 0, 'stunned': 0,
+        'score': -step, 'status': status,
+    }
+
+
+@pytest.fixture
+def dataset_dir(tmp_path, monkeypatch):
+    """Dataset of 3 episodes of 5 steps in shards of 4 rows"""
+    monkeypatch.setattr(trajectory, 'FOG_BOARDS', FakeFogBoards())
+    recorder = TrajectoryRecorder(str(tmp_path), WIDTH, HEIGHT, chunk_size=4)
+    for _ in range(3):
+        recorder.begin(observation(0))
+        for step in range(1, 6):
+            status = 'won' if step == 5 else 'playing'
+            recorder.step('move', observation(step, status))
+    recorder.close()
+    return str(tmp_path)
+
+
+def test_shards_and_meta(dataset_dir):
+    dataset = TrajectoryDataset(dataset_dir)
+    assert len(dataset) == 15
+    assert dataset.meta['episodes'] == 3
+    assert [shard['rows'] for shard in dataset.meta['shards']] == [4, 4, 4, 3]
+
+
+def test_rows_across_shard_boundaries(dataset_dir):
+    dataset = TrajectoryDataset(dataset_dir)
+    rows = dataset.rows(0, len(dataset))
+    assert list(rows['episode']) == [0] * 5 + [1] * 5 + [2] * 5
+    assert list(rows['step']) == list(range(5)) * 3
+    assert list(rows['done']) == [False] * 4 + [True] + [False] * 4 + [True] + [False] * 4 + [True]
+    assert set(rows['action']) == {ACTIONS.index('move')}
+    assert list(rows['reward']) == [-1] * 15
+
+    # inside one shard: a view of the mapped file, across shards: a copy
+    assert np.array_equal(dataset.rows(1, 3), rows[1:3])
+    assert np.array_equal(dataset.rows(3, 9), rows[3:9])
+
+
+def test_batch_at_arbitrary_indices(dataset_dir):
+    dataset = TrajectoryDataset(dataset_dir)
+    rows = dataset.rows(0, len(dataset))
+    indices = [14, 0, 7, 3, 4, 12, 7]
+    assert np.array_equal(dataset.batch(indices), rows[indices])
+
+
+def test_fog_masks(dataset_dir):
+    dataset = TrajectoryDataset(dataset_dir)
+    masks = dataset.fog_masks(dataset.rows(0, len(dataset)))
+    assert masks.shape == (15, HEIGHT, WIDTH)
+    # the fake reveals the cells row by row, one more per observation
+    first = masks[0]
+    assert first[0, 0] and first.sum() == 1
+    assert masks[1].sum() == 2 and masks[1][0, :2].all()
+
+
+def test_append_to_existing_dataset(dataset_dir, monkeypatch):
+    monkeypatch.setattr(trajectory, 'FOG_BOARDS', FakeFogBoards())
+    recorder = TrajectoryRecorder(dataset_dir, WIDTH, HEIGHT, chunk_size=4)
+    recorder.begin(observation(0))
+    recorder.step('wait', observation(1, 'lost'))
+    recorder.close()
+
+    dataset = TrajectoryDataset(dataset_dir)
+    assert len(dataset) == 16
+    assert dataset.meta['episodes'] == 4
+    last = dataset.rows(15, 16)[0]
+    assert (last['episode'], last['action'], last['done']) == (3, ACTIONS.index('wait'), True)
+
+
+def test_other_map_size_is_refused(dataset_dir):
+    with pytest.raises(ValueError):
+        TrajectoryRecorder(dataset_dir, 8, 8)